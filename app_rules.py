@@ -0,0 +1,299 @@
+"""
+App Classification Rules
+Decides which processes count as apps and what they are called, and which
+apps a window title mentions. Rules come from built-in defaults plus an
+optional JSON rules file, compiled once into sets, dicts and one regex.
+"""
+
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+# Common system processes to exclude
+DEFAULT_EXCLUDED = {
+    'svchost.exe', 'explorer.exe', 'dwm.exe', 'winlogon.exe',
+    'csrss.exe', 'smss.exe', 'services.exe', 'lsass.exe',
+    'spoolsv.exe', 'taskhost.exe', 'taskhostw.exe', 'conhost.exe',
+    'dllhost.exe', 'audiodg.exe', 'sihost.exe', 'runtimebroker.exe',
+    'searchindexer.exe', 'searchprotocolhost.exe', 'searchfilterhost.exe',
+    'wmiprvse.exe', 'msmpeng.exe', 'securityhealthservice.exe',
+    'chrome.exe', 'msedge.exe', 'firefox.exe',  # Browsers (we'll get them separately)
+}
+
+# Names that look like system processes (prefixes of the name without extension)
+DEFAULT_EXCLUDED_PREFIXES = ('dll', 'ms')
+
+# Common application names to look for (without .exe); also searched for in window titles
+DEFAULT_KNOWN_APPS = {
+    'steam', 'epicgameslauncher', 'origin', 'uplay', 'battlenet',
+    'discord', 'teamspeak', 'mumble', 'obs64', 'obs32', 'streamlabs',
+    'spotify', 'vlc', 'chrome', 'firefox', 'msedge',
+    'notepad++', 'code', 'pycharm', 'intellij',
+    'counter-strike', 'csgo', 'cs2', 'valorant', 'league of legends',
+    'fortnite', 'apex', 'overwatch', 'minecraft', 'roblox'
+}
+
+
+def format_app_name(name: str) -> str:
+    """Format a lowercase executable name for display (capitalize first letter)"""
+    return name.capitalize().replace('_', ' ')
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over lowercase keywords.
+
+    Finds every keyword in a text (overlapping ones included) in one pass
+    over its characters, however many keywords there are.
+    """
+
+    def __init__(self, keywords: Dict[str, str]):
+        """
+        Build the automaton.
+
+        Args:
+            keywords: Lowercase keyword -> value reported when it is found
+        """
+        self._goto = [{}]       # state -> {character: next state}
+        self._fail = [0]        # state -> longest proper suffix state
+        outputs = [set()]       # state -> values of the keywords ending here
+        for keyword, value in keywords.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                    self._goto[state][char] = next_state
+                state = next_state
+            outputs[state].add(value)
+
+        # Breadth-first, so a state's failure link is final before its children need it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state] |= outputs[self._fail[next_state]]
+        self._outputs = [tuple(values) for values in outputs]
+
+    def find(self, text: str) -> Set[str]:
+        """Values of every keyword that occurs in text (text must be lowercase)"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class AppRules:
+    """
+    Compiled classification rules.
+
+    Process names are matched with one dict lookup for aliases, one set
+    lookup for exclusions and one str.startswith(tuple) for excluded
+    prefixes. Known app names are found in window titles by one
+    Aho-Corasick automaton and explicit title patterns by one combined
+    regex, so a title is scanned once instead of once per app.
+    """
+
+    def __init__(self, exclude: Iterable[str] = (), exclude_prefixes: Iterable[str] = (),
+                 known_apps: Iterable[str] = (), aliases: Optional[Dict[str, str]] = None,
+                 title_patterns: Optional[Dict[str, str]] = None, defaults: bool = True):
+        """
+        Compile a rule set.
+
+        Args:
+            exclude: Executable names that are never apps (e.g. "svchost.exe")
+            exclude_prefixes: Names starting with these are never apps, unless known
+            known_apps: Names (without extension) that are always apps and are
+                        also looked for in window titles
+            aliases: Executable name (with or without extension) -> display name,
+                     e.g. {"cs2.exe": "Counter-Strike 2"}; beats every other rule
+            title_patterns: Display name -> regular expression searched for in
+                            window titles (case-insensitive); replaces the
+                            known-app pattern with the same display name.
+                            Patterns are combined into one alternation, so
+                            they can't use named groups or group references,
+                            and where two match at the same place in a title
+                            only the first one listed is found
+            defaults: Start from the built-in rules (the arguments add to them)
+
+        Raises:
+            ValueError: If a title pattern uses a named group
+            re.error: If a title pattern is not a valid regular expression
+        """
+        self.excluded = frozenset(name.lower() for name in
+                                  (DEFAULT_EXCLUDED if defaults else set()) | set(exclude))
+        self.exclude_prefixes = tuple(prefix.lower() for prefix in
+                                      (DEFAULT_EXCLUDED_PREFIXES if defaults else ()) + tuple(exclude_prefixes))
+        self.known_apps = frozenset(name.lower() for name in
+                                    (DEFAULT_KNOWN_APPS if defaults else set()) | set(known_apps))
+        self.aliases = {name.lower(): display for name, display in (aliases or {}).items()}
+
+        # Known apps are found in titles by name, under their alias if they
+        # have one; an explicit pattern replaces the names of the app it is
+        # for (display names compared ignoring case)
+        title_patterns = title_patterns or {}
+        replaced = {display.casefold() for display in title_patterns}
+        keywords = {}
+        for name in self.known_apps:
+            display = self.aliases.get(name) or self.aliases.get(name + ".exe") or format_app_name(name)
+            if display.casefold() not in replaced:
+                keywords[name] = display
+        self.title_keywords = KeywordMatcher(keywords)
+
+        for display, pattern in title_patterns.items():
+            if re.compile(pattern).groupindex:
+                raise ValueError(f"Title pattern for {display} must not use named groups")
+        # Group name -> display name of the app whose pattern it wraps
+        self.title_groups = {f"g{i}": display for i, display in enumerate(title_patterns)}
+        self.title_regex = None
+        if title_patterns:
+            alternatives = "|".join(f"(?P<g{i}>{pattern})" for i, pattern in enumerate(title_patterns.values()))
+            self.title_regex = re.compile(alternatives, re.IGNORECASE)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AppRules":
+        """
+        Build rules from the layout of a rules file.
+
+        Raises:
+            ValueError: If the data is not a valid rule set
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Rules must be a JSON object")
+        unknown = set(data) - {"defaults", "exclude", "exclude_prefixes", "known_apps",
+                               "aliases", "title_patterns"}
+        if unknown:
+            raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+        try:
+            return cls(exclude=data.get("exclude", ()),
+                       exclude_prefixes=data.get("exclude_prefixes", ()),
+                       known_apps=data.get("known_apps", ()),
+                       aliases=data.get("aliases"),
+                       title_patterns=data.get("title_patterns"),
+                       defaults=data.get("defaults", True))
+        except re.error as e:
+            raise ValueError(f"Invalid title pattern: {e}")
+
+    def classify(self, process_name: str, executable_suffix: str = "") -> Optional[str]:
+        """
+        Map an executable name to an app name.
+
+        Args:
+            process_name: Executable name as the OS reports it
+            executable_suffix: Extension executables carry (".exe" on Windows);
+                               names without it are not apps
+
+        Returns:
+            Display name, or None if the process is not an app
+        """
+        name = process_name.lower()
+        alias = self.aliases.get(name)
+        if alias is not None:
+            return alias
+        if name in self.excluded:
+            return None
+
+        if executable_suffix:
+            if not name.endswith(executable_suffix):
+                return None
+            name = name[:-len(executable_suffix)]
+            alias = self.aliases.get(name)
+            if alias is not None:
+                return alias
+
+        # Only include if it's a known app or looks like user software
+        # (not a random system process)
+        if name in self.known_apps or (len(name) > 2 and not name.startswith(self.exclude_prefixes)):
+            return format_app_name(name)
+        return None
+
+    def apps_in_title(self, title: str) -> List[str]:
+        """Display names of the apps a window title mentions"""
+        apps = self.title_keywords.find(title.lower())
+        if self.title_regex is not None:
+            apps.update(self.title_groups[match.lastgroup] for match in self.title_regex.finditer(title))
+        return list(apps)
+
+
+def load_rules(path: str) -> AppRules:
+    """
+    Load and compile a JSON rules file.
+
+    Args:
+        path: Path to the rules file
+
+    Returns:
+        AppRules instance
+
+    Raises:
+        ValueError: If the file is not valid JSON or not a valid rule set
+        OSError: If the file can't be read
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {path}: {e}")
+    return AppRules.from_dict(data)
+
+
+class RulesFile:
+    """
+    A rules file that is recompiled when it changes on disk.
+
+    The file's modification time is checked at most every check_interval
+    seconds. A file that fails to load keeps the previous rules in use.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5.0):
+        """
+        Load the rules file.
+
+        Args:
+            path: Path to the JSON rules file
+            check_interval: Seconds between modification time checks
+
+        Raises:
+            ValueError, OSError: If the file can't be loaded the first time
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime = os.stat(path).st_mtime
+        self.rules = load_rules(path)
+        self._checked_at = time.monotonic()
+
+    def current(self) -> AppRules:
+        """Get the rules, reloading the file first if it changed"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self.rules
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime != self._mtime:
+                self._mtime = mtime
+                self.rules = load_rules(self.path)
+                print(f"[INFO] Reloaded app rules from {self.path}")
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not reload app rules, keeping the previous ones: {e}")
+        return self.rules
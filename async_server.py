@@ -0,0 +1,214 @@
+"""
+Asyncio server backend
+Serves the same endpoints as LoggingServerHandler, but holds every client
+connection as a coroutine on one event loop instead of one thread each.
+"""
+
+import asyncio
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from events import EventStream
+from log_writer import access_level
+
+# Limits for a single request
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Close keep-alive connections that stay silent this long (seconds)
+IDLE_TIMEOUT = 120
+
+STATUS_REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 413: "Payload Too Large",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error", 501: "Not Implemented",
+    415: "Unsupported Media Type", 503: "Service Unavailable",
+}
+
+
+class AsyncLoggingServer:
+    """
+    HTTP/1.1 server on asyncio with keep-alive connections.
+
+    Mirrors the socketserver API used by LoggingServer (serve_forever,
+    shutdown, server_close, server_address), so it can be swapped in for
+    the threaded servers.
+    """
+
+    def __init__(self, server_address: Tuple[str, int], router, backlog: int = 1024, readers: int = 4):
+        """
+        Bind the listening socket.
+
+        Args:
+            server_address: (host, port) tuple to bind to
+            router: RequestRouter that handles parsed requests
+            backlog: Listen backlog for pending connections
+            readers: Threads that answer GET requests
+        """
+        self.router = router
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(server_address)
+        self.socket.listen(backlog)
+        self.server_address = self.socket.getsockname()
+        self._connections = {}  # connection task -> stream writer
+        self.loop = None
+        self._server = None
+        self._stopped = threading.Event()
+        # Requests that change state run here, one at a time, so file
+        # writes in PCLogger never stall the event loop
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        # GETs wait for PCLogger.lock or the history database too (/logs
+        # rebuilds, /history queries), so they stay off the loop as well
+        self._readers = ThreadPoolExecutor(max_workers=readers)
+
+    def serve_forever(self):
+        """Run the event loop until shutdown() is called"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._stopped.clear()
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_connection, sock=self.socket, limit=MAX_HEADER_BYTES))
+            self.loop.run_forever()
+        finally:
+            try:
+                self._server.close()
+                # Drop idle keep-alive connections so their handlers see EOF and finish
+                for writer in self._connections.values():
+                    writer.transport.abort()
+                if self._connections:
+                    self.loop.run_until_complete(
+                        asyncio.gather(*self._connections, return_exceptions=True))
+                self.loop.run_until_complete(self._server.wait_closed())
+            finally:
+                self._stopped.set()
+
+    def shutdown(self):
+        """Stop serve_forever from another thread and wait for it"""
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._stopped.wait()
+
+    def server_close(self):
+        """Release the socket, the loop and the worker threads"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.close()
+        self.socket.close()
+
+    def log_message(self, request_line: str, status: int, size: int):
+        """Queue one access log line in the same format as LoggingServerHandler (or print it)"""
+        log_writer = self.router.log_writer
+        if log_writer is not None:
+            log_writer.log(access_level(status), '"%s" %s %s', request_line, status, size,
+                           routine=status < 400)
+            return
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f'[{timestamp}] "{request_line}" {status} {size}')
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        """
+        Read one request from the connection.
+
+        Returns:
+            (method, path, version, headers, body) or None when the client closed the connection
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+
+        lines = head.decode('latin-1').split("\r\n")
+        method, path, version = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        content_length = int(headers.get('content-length', 0))
+        if content_length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        try:
+            body = await reader.readexactly(content_length) if content_length else b""
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None  # client went away mid-body
+        return method, path, version, headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes"""
+        task = asyncio.current_task() if hasattr(asyncio, 'current_task') else asyncio.Task.current_task()
+        self._connections[task] = writer
+        self.router.connections.inc()
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except asyncio.LimitOverrunError:
+                    await self._write_response(writer, "HTTP/1.1", 431, {}, b"", keep_alive=False)
+                    return
+                except ValueError:
+                    await self._write_response(writer, "HTTP/1.1", 400, {}, b"Bad Request", keep_alive=False)
+                    return
+                if request is None:
+                    return
+
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                if version == "HTTP/1.1":
+                    keep_alive = connection != "close"
+                else:
+                    keep_alive = connection == "keep-alive"
+
+                executor = self._readers if method == 'GET' else self._writer
+                status, response_headers, response_body = await self.loop.run_in_executor(
+                    executor, self.router.handle, method, path, headers, body)
+
+                if isinstance(response_body, EventStream):
+                    self.log_message(f"{method} {path} {version}", status, 0)
+                    await self._write_stream(writer, version, status, response_headers, response_body)
+                    return
+
+                self.log_message(f"{method} {path} {version}", status, len(response_body))
+                await self._write_response(writer, version, status, response_headers, response_body, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self.router.connections.dec()
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _write_response(self, writer: asyncio.StreamWriter, version: str, status: int,
+                              headers: Dict[str, str], body: bytes, keep_alive: bool):
+        """Write status line, headers and body"""
+        lines = [f"{version} {status} {STATUS_REASONS.get(status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        if not keep_alive:
+            lines.append("Connection: close")
+        elif version != "HTTP/1.1":
+            lines.append("Connection: keep-alive")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, version: str, status: int,
+                            headers: Dict[str, str], stream: EventStream):
+        """Write headers, then stream chunks until the stream ends or the client goes away"""
+        lines = [f"{version} {status} {STATUS_REASONS.get(status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        # No Content-Length: the body ends when the connection closes
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+        async for chunk in stream:
+            if writer.transport.is_closing():
+                return
+            writer.write(chunk)
+            await writer.drain()
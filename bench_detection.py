@@ -0,0 +1,86 @@
+"""
+Software Detection Benchmark
+Measures the cost of one detection sample with each process provider
+available on this machine, plus tasklist CSV parsing on synthetic output
+"""
+
+import argparse
+import os
+import platform
+import sys
+import time
+import timeit
+
+from detect_software import (ProcFSProvider, SoftwareDetector, TasklistProvider, ToolhelpProvider,
+                             parse_tasklist_csv)
+
+
+def available_providers() -> list:
+    """Providers that work on this platform, fastest expected first"""
+    if platform.system() == 'Windows':
+        providers = []
+        try:
+            providers.append(ToolhelpProvider())
+        except (AttributeError, OSError) as e:
+            print(f"[WARNING] Toolhelp API unavailable: {e}")
+        providers.append(TasklistProvider())
+        return providers
+    if os.path.isdir("/proc"):
+        return [ProcFSProvider()]
+    return []
+
+
+def sample_tasklist_csv(processes: int) -> str:
+    """tasklist /FO CSV /NH output with the given number of processes"""
+    lines = [f'"app{i:04d}.exe","{1000 + i}","Console","1","{(i % 900) + 10:,} K"' for i in range(processes)]
+    return "\n".join(lines) + "\n"
+
+
+def time_samples(detector: SoftwareDetector, samples: int) -> tuple:
+    """
+    Time detect() calls.
+
+    Returns:
+        (ms of the first sample, mean ms of the following ones, CPU ms per sample)
+    """
+    start = time.perf_counter()
+    detector.detect()
+    first = (time.perf_counter() - start) * 1000
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for _ in range(samples):
+        detector.detect()
+    wall = (time.perf_counter() - start) * 1000 / samples
+    cpu = (time.process_time() - cpu_start) * 1000 / samples
+    return first, wall, cpu
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Software detection benchmark')
+    parser.add_argument('--samples', type=int, default=20,
+                       help='Detection samples per provider (default: 20)')
+    parser.add_argument('--processes', nargs='+', type=int, default=[100, 300],
+                       help='Process counts for the CSV parsing test (default: 100 300)')
+
+    args = parser.parse_args()
+
+    print("="*60)
+    print("SOFTWARE DETECTION")
+    print("="*60)
+    print(f"{'provider':<12}{'apps':>6}{'first ms':>10}{'mean ms':>10}{'cpu ms':>9}")
+    for provider in available_providers():
+        detector = SoftwareDetector(provider)
+        apps = len(detector.detect())
+        first, wall, cpu = time_samples(detector, args.samples)
+        print(f"{provider.name:<12}{apps:>6}{first:>10.1f}{wall:>10.1f}{cpu:>9.1f}")
+        detector.close()
+
+    print()
+    print(f"{'processes':>9}  {'parse_tasklist_csv us':>22}")
+    for processes in args.processes:
+        text = sample_tasklist_csv(processes)
+        number = 2000
+        seconds = timeit.timeit(lambda: parse_tasklist_csv(text), number=number)
+        print(f"{processes:>9}  {seconds / number * 1e6:>22.1f}")
+    sys.exit(0)
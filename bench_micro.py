@@ -0,0 +1,166 @@
+"""
+Micro-benchmarks - Hot paths timed in isolation
+PCLogger.log_pc_with_software, PCLogger._save_logs per storage type, and
+tasklist parsing/classification on recorded tasklist output (bench_fixtures),
+so detection regressions show up on any OS. Results can be saved and
+compared against a baseline to fail on regressions.
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from detect_software import ProcessProvider, SoftwareDetector, parse_tasklist_csv
+from pc_logger import PCLogger
+from storage import STORAGE_TYPES
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_fixtures")
+
+SOFTWARE = ["Steam", "Discord", "Counter-Strike 2", "Spotify", "Chrome", "Obs64", "Valorant", "Minecraft"]
+
+
+class FixtureProvider(ProcessProvider):
+    """Replays recorded tasklist /FO CSV /NH output instead of running tasklist"""
+
+    name = "fixture"
+    executable_suffix = ".exe"
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def processes(self):
+        return parse_tasklist_csv(self.text)
+
+
+def best_us(function, number: int, repeat: int = 5) -> float:
+    """Fastest of repeat runs, in microseconds per call"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_log_pc(pcs: int, number: int) -> dict:
+    """Heartbeats with changing software into an in-memory fleet"""
+    logger = PCLogger(os.devnull, storage="memory", flush_every=0)
+    names = [f"BENCH-PC-{i:04d}" for i in range(pcs)]
+    for i, name in enumerate(names):
+        logger.log_pc_with_software(name, SOFTWARE[:1 + i % len(SOFTWARE)])
+    state = {"i": 0}
+
+    def same():
+        # The list each PC was seeded with, so nothing changes
+        i = state["i"] = state["i"] + 1
+        logger.log_pc_with_software(names[i % pcs], SOFTWARE[:1 + (i % pcs) % len(SOFTWARE)])
+
+    def changed():
+        i = state["i"] = state["i"] + 1
+        logger.log_pc_with_software(names[i % pcs], SOFTWARE[i % 3:1 + i % len(SOFTWARE)])
+
+    results = {"log_pc_with_software.unchanged": best_us(same, number),
+               "log_pc_with_software.changed": best_us(changed, number)}
+    logger.close()
+    return results
+
+
+def bench_save_logs(storage: str, pcs: int, number: int) -> dict:
+    """Full snapshot and one-PC saves for a fleet of pcs PCs"""
+    work_dir = tempfile.mkdtemp(prefix="pc_micro_")
+    try:
+        logger = PCLogger(os.path.join(work_dir, "pc_logs.json"), storage=storage, flush_every=0)
+        for i in range(pcs):
+            logger.log_pc_with_software(f"BENCH-PC-{i:04d}", SOFTWARE[:1 + i % len(SOFTWARE)])
+        logger.flush()
+        results = {f"_save_logs.{storage}.full": best_us(lambda: logger._save_logs(), max(1, number // 10))}
+        if logger.backend.incremental:
+            results[f"_save_logs.{storage}.one_pc"] = best_us(lambda: logger._save_logs(["BENCH-PC-0000"]), number)
+        logger.close()
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bench_fixture(path: str, number: int) -> dict:
+    """Parse and classify one recorded tasklist output"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    name = os.path.splitext(os.path.basename(path))[0]
+    processes = parse_tasklist_csv(text)
+    lines = sum(1 for line in text.splitlines() if line.strip())
+    if len(processes) != lines:
+        print(f"[ERROR] {name}: parsed {len(processes)} processes from {lines} lines")
+
+    detector = SoftwareDetector(FixtureProvider(text))
+    first_us = best_us(lambda: SoftwareDetector(FixtureProvider(text)).detect(), max(1, number // 10))
+    detector.detect()
+    return {f"parse_tasklist_csv.{name}": best_us(lambda: parse_tasklist_csv(text), number),
+            f"detect.{name}.first": first_us,
+            f"detect.{name}.steady": best_us(detector.detect, number)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Names of the benchmarks more than tolerance slower than the baseline"""
+    return [name for name, us in results.items()
+            if name in baseline and us > baseline[name] * (1 + tolerance)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PC Logging micro-benchmarks')
+    parser.add_argument('--pcs', type=int, default=500,
+                       help='PCs in the fleet for the logger benchmarks (default: 500)')
+    parser.add_argument('--number', type=int, default=2000,
+                       help='Calls per timing run (default: 2000)')
+    parser.add_argument('--storage', nargs='+', choices=STORAGE_TYPES, default=list(STORAGE_TYPES),
+                       help='Storage types for _save_logs (default: all)')
+    parser.add_argument('--fixtures', default=os.path.join(FIXTURE_DIR, "*.csv"),
+                       help='Recorded tasklist CSV files (default: bench_fixtures/*.csv)')
+    parser.add_argument('--save', metavar='FILE',
+                       help='Save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                       help='Compare against a saved baseline and exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                       help='Allowed slowdown against the baseline (default: 0.5 = 50%%)')
+
+    args = parser.parse_args()
+
+    results = {}
+    # PCLogger reports every update
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results.update(bench_log_pc(args.pcs, args.number))
+        for storage in args.storage:
+            results.update(bench_save_logs(storage, args.pcs, args.number))
+    fixtures = sorted(glob.glob(args.fixtures))
+    if not fixtures:
+        print(f"[WARNING] No tasklist fixtures match {args.fixtures}")
+    for path in fixtures:
+        results.update(bench_fixture(path, args.number))
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("="*60)
+    print("PC LOGGING - MICRO-BENCHMARKS")
+    print("="*60)
+    print(f"{'benchmark':<44}{'us':>10}{'baseline':>10}")
+    for name, us in results.items():
+        base = f"{baseline[name]:.1f}" if name in baseline else "-"
+        print(f"{name:<44}{us:>10.1f}{base:>10}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"[OK] Saved results to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance)
+        for name in regressions:
+            print(f"[ERROR] {name} regressed: {results[name]:.1f}us vs {baseline[name]:.1f}us")
+        if regressions:
+            sys.exit(1)
+        print(f"[OK] No regressions beyond {args.tolerance:.0%}")
+    sys.exit(0)
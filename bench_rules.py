@@ -0,0 +1,102 @@
+"""
+App Rules Benchmark
+Classifies thousands of synthetic processes and window titles against
+thousands of rules, compiled (app_rules.AppRules) vs a plain loop over
+every rule like the original detection code
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from app_rules import AppRules, format_app_name
+
+
+def build_rules(count: int) -> dict:
+    """Rules file data with count exclusions, known apps and aliases each"""
+    return {
+        "defaults": False,
+        "exclude_prefixes": ["dll", "ms"],
+        "exclude": [f"service{i:05d}.exe" for i in range(count)],
+        "known_apps": [f"game{i:05d}" for i in range(count)],
+        "aliases": {f"launcher{i:05d}.exe": f"Launcher {i}" for i in range(count)},
+    }
+
+
+def build_samples(rules: dict, processes: int, titles: int, seed: int = 7) -> tuple:
+    """Process names (a mix of excluded, known, aliased and unknown) and window titles"""
+    rng = random.Random(seed)
+    pools = [rules["exclude"], [f"{name}.exe" for name in rules["known_apps"]],
+             list(rules["aliases"]), [f"tool{i:05d}.exe" for i in range(processes)]]
+    names = [rng.choice(rng.choice(pools)) for _ in range(processes)]
+    window_titles = [f"Window {i} - {rng.choice(rules['known_apps'])}" if i % 2 else f"Untitled {i}"
+                     for i in range(titles)]
+    return names, window_titles
+
+
+def naive_classify(rules: dict, names: list, titles: list) -> tuple:
+    """The original approach: lists and a substring test per app per title"""
+    excluded = list(rules["exclude"])
+    known = list(rules["known_apps"])
+    aliases = list(rules["aliases"].items())
+    apps = []
+    for name in names:
+        name = name.lower()
+        alias = next((display for exe, display in aliases if exe == name), None)
+        if alias is not None:
+            apps.append(alias)
+        elif name not in excluded and name.endswith('.exe'):
+            base = name[:-4]
+            if base in known or (len(base) > 2 and not base.startswith(('dll', 'ms'))):
+                apps.append(format_app_name(base))
+    for title in titles:
+        lowered = title.lower()
+        apps.extend(format_app_name(app) for app in known if app in lowered)
+    return apps
+
+
+def compiled_classify(compiled: AppRules, names: list, titles: list) -> list:
+    """Classify with the compiled rules"""
+    apps = []
+    for name in names:
+        app = compiled.classify(name, ".exe")
+        if app is not None:
+            apps.append(app)
+    for title in titles:
+        apps.extend(compiled.apps_in_title(title))
+    return apps
+
+
+def timed(function, *args) -> tuple:
+    """Run function once, returning (result, milliseconds)"""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='App classification rules benchmark')
+    parser.add_argument('--rules', nargs='+', type=int, default=[100, 1000, 3000],
+                       help='Rules per kind to test (default: 100 1000 3000)')
+    parser.add_argument('--processes', type=int, default=3000,
+                       help='Processes to classify (default: 3000)')
+    parser.add_argument('--titles', type=int, default=200,
+                       help='Window titles to match (default: 200)')
+
+    args = parser.parse_args()
+
+    print("="*60)
+    print("APP RULES - COMPILED vs LOOP")
+    print("="*60)
+    print(f"{'rules':>6}{'compile ms':>12}{'loop ms':>10}{'compiled ms':>13}{'speedup':>9}")
+    for count in args.rules:
+        rules = build_rules(count)
+        names, titles = build_samples(rules, args.processes, args.titles)
+        compiled, compile_ms = timed(AppRules.from_dict, rules)
+        expected, loop_ms = timed(naive_classify, rules, names, titles)
+        result, compiled_ms = timed(compiled_classify, compiled, names, titles)
+        if sorted(result) != sorted(expected):
+            print(f"[ERROR] Compiled rules disagree with the loop for {count} rules")
+        print(f"{count:>6}{compile_ms:>12.1f}{loop_ms:>10.1f}{compiled_ms:>13.1f}{loop_ms / compiled_ms:>8.0f}x")
+    sys.exit(0)
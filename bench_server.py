@@ -0,0 +1,107 @@
+"""
+Server Benchmark - Heartbeat throughput against client concurrency
+Starts a local LoggingServer in each mode and hammers POST /log
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import Request, urlopen
+
+from server import LoggingServer, SERVER_MODES
+from storage import STORAGE_TYPES
+
+
+def send_heartbeats(server_url: str, pc_name: str, count: int, errors: list):
+    """Send count heartbeats for one simulated PC"""
+    software = ["Steam", "Discord", "Counter-Strike 2", "Spotify", "Chrome"]
+    for i in range(count):
+        data = {"pc_name": pc_name, "status": "running", "software": software[:1 + i % 5]}
+        try:
+            request = Request(
+                f"{server_url}/log",
+                data=json.dumps(data).encode('utf-8'),
+                headers={'Content-Type': 'application/json'}
+            )
+            urlopen(request, timeout=30).read()
+        except Exception as e:
+            errors.append(e)
+
+
+def run_level(server_url: str, concurrency: int, requests_per_client: int) -> dict:
+    """
+    Run one benchmark level.
+
+    Returns:
+        Dictionary with requests, errors, seconds and requests per second
+    """
+    errors = []
+    threads = [
+        threading.Thread(target=send_heartbeats,
+                         args=(server_url, f"BENCH-PC-{i:03d}", requests_per_client, errors))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    total = concurrency * requests_per_client
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "seconds": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+    }
+
+
+def benchmark_mode(mode: str, storage: str, levels: list, requests_per_client: int, workers: int) -> list:
+    """Benchmark one server mode at every concurrency level"""
+    work_dir = tempfile.mkdtemp(prefix="pc_bench_")
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            server = LoggingServer(host='127.0.0.1', port=0,
+                                   log_file=os.path.join(work_dir, 'pc_logs.json'),
+                                   storage=storage, mode=mode, workers=workers)
+            server.start_background()
+            server_url = f"http://127.0.0.1:{server.port}"
+            results = [(level, run_level(server_url, level, requests_per_client)) for level in levels]
+            server.stop()
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PC Logging Server benchmark')
+    parser.add_argument('--modes', nargs='+', choices=SERVER_MODES, default=list(SERVER_MODES),
+                       help='Server modes to benchmark (default: all)')
+    parser.add_argument('--storage', choices=STORAGE_TYPES, default='json',
+                       help='PCLogger storage mode (default: json)')
+    parser.add_argument('--levels', nargs='+', type=int, default=[1, 4, 16, 64],
+                       help='Concurrent clients per level (default: 1 4 16 64)')
+    parser.add_argument('--requests', type=int, default=50,
+                       help='Heartbeats sent by each client (default: 50)')
+    parser.add_argument('--workers', type=int, default=8,
+                       help='Worker threads in pool mode (default: 8)')
+
+    args = parser.parse_args()
+
+    print("="*60)
+    print("PC LOGGING SERVER - HEARTBEAT THROUGHPUT")
+    print("="*60)
+    print(f"Storage: {args.storage}, {args.requests} heartbeats per client")
+    print()
+    print(f"{'mode':<10}{'clients':>8}{'requests':>10}{'errors':>8}{'seconds':>10}{'req/s':>10}")
+    for mode in args.modes:
+        for level, result in benchmark_mode(mode, args.storage, args.levels, args.requests, args.workers):
+            print(f"{mode:<10}{level:>8}{result['requests']:>10}{result['errors']:>8}"
+                  f"{result['seconds']:>10.2f}{result['rps']:>10.0f}")
+    sys.exit(0)
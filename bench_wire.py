@@ -0,0 +1,78 @@
+"""
+Wire Format Benchmark - JSON vs binary heartbeats
+Compares body size and server-side parse cost of each heartbeat kind
+"""
+
+import argparse
+import json
+import sys
+import timeit
+
+from protocol import WireDecoder, WireEncoder, diff_software, software_hash
+
+
+def sample_software(count: int) -> list:
+    """Software names of the length typically seen on a gaming PC"""
+    return [f"Sample Application Name {i:03d}" for i in range(count)]
+
+
+def heartbeats(apps: int) -> list:
+    """
+    Build (kind, payload) pairs for one PC: first contact, keep-alive and a small delta.
+    """
+    software = sample_software(apps)
+    changed = software[1:] + ["Counter-Strike 2"]
+    added, removed = diff_software(software, changed)
+    base = {"pc_name": "PC-07", "status": "running", "interval": 30}
+    return [
+        ("full", dict(base, software=software, software_hash=software_hash(software))),
+        ("keep-alive", dict(base, base_hash=software_hash(software))),
+        ("delta", dict(base, base_hash=software_hash(software), added=added, removed=removed,
+                       software_hash=software_hash(changed))),
+        # Full list again after a resync, once the server already knows every name
+        ("full (known)", dict(base, software=software, software_hash=software_hash(software))),
+    ]
+
+
+def benchmark(apps: int, number: int) -> list:
+    """
+    Measure size and parse time of every heartbeat kind.
+
+    Returns:
+        List of (kind, json bytes, binary bytes, json µs, binary µs)
+    """
+    encoder = WireEncoder()
+    decoder = WireDecoder()
+    results = []
+    for kind, payload in heartbeats(apps):
+        json_body = json.dumps(payload).encode('utf-8')
+        binary_body = encoder.encode(payload)
+        # Teach the decoder the names once, as a real exchange would
+        decoder.decode(binary_body)
+        encoder.acknowledge()
+        binary_body = encoder.encode(payload)
+
+        json_time = timeit.timeit(lambda: json.loads(json_body.decode('utf-8')), number=number)
+        binary_time = timeit.timeit(lambda: decoder.decode(binary_body), number=number)
+        results.append((kind, len(json_body), len(binary_body),
+                        json_time / number * 1e6, binary_time / number * 1e6))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Heartbeat wire format benchmark')
+    parser.add_argument('--apps', nargs='+', type=int, default=[20, 80, 200],
+                       help='Software list sizes to test (default: 20 80 200)')
+    parser.add_argument('--number', type=int, default=20000,
+                       help='Parses per measurement (default: 20000)')
+
+    args = parser.parse_args()
+
+    print("="*60)
+    print("HEARTBEAT WIRE FORMAT - JSON vs BINARY")
+    print("="*60)
+    print(f"{'apps':>5}  {'heartbeat':<13}{'json B':>8}{'bin B':>8}{'json us':>9}{'bin us':>9}")
+    for apps in args.apps:
+        for kind, json_size, binary_size, json_us, binary_us in benchmark(apps, args.number):
+            print(f"{apps:>5}  {kind:<13}{json_size:>8}{binary_size:>8}{json_us:>9.1f}{binary_us:>9.1f}")
+    sys.exit(0)
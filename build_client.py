@@ -31,7 +31,10 @@ def build_client():
         "--clean",                      # Clean cache
         "--noconfirm",                  # Overwrite without asking
         "--hidden-import", "detect_software",  # Include software detection module
+        "--hidden-import", "app_rules",        # Include app classification rules
         "--hidden-import", "pc_logger",        # Include logger module
+        "--hidden-import", "protocol",         # Include heartbeat protocol helpers
+        "--hidden-import", "spool",            # Include offline heartbeat spool
         "client.py"
     ]
     
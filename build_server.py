@@ -30,6 +30,18 @@ def build_server():
         "--clean",                      # Clean cache
         "--noconfirm",                  # Overwrite without asking
         "--hidden-import", "pc_logger",  # Include logger module
+        "--hidden-import", "journal",    # Include journal storage
+        "--hidden-import", "async_server",  # Include asyncio backend
+        "--hidden-import", "protocol",   # Include heartbeat protocol helpers
+        "--hidden-import", "history",    # Include session history
+        "--hidden-import", "response_cache",  # Include response cache
+        "--hidden-import", "events",     # Include change feed
+        "--hidden-import", "liveness",   # Include heartbeat monitor
+        "--hidden-import", "storage",    # Include storage engines
+        "--hidden-import", "pc_model",   # Include compact PC records
+        "--hidden-import", "fleet_index",  # Include status/app index
+        "--hidden-import", "metrics",    # Include /metrics instrumentation
+        "--hidden-import", "log_writer",  # Include background log writer
         "server.py"
     ]
     
@@ -0,0 +1,126 @@
+"""
+Journal Replay Check - Journal storage survives restarts and crashes
+Writes PCs through PCLogger in journal mode, reopens the files and checks
+that the same fleet comes back: after a clean close, with a torn last line,
+after an interrupted compaction and with a damaged snapshot.
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+from journal import LogJournal
+from pc_logger import PCLogger
+from storage import JournalStorage
+
+SOFTWARE = ["Steam", "Discord", "Counter-Strike 2", "Spotify", "Valorant"]
+
+failures = []
+
+
+def expect(condition: bool, message: str):
+    """Record a failed check"""
+    if not condition:
+        failures.append(message)
+
+
+def fill(log_file: str, pcs: int, compact_every: int = 1000) -> dict:
+    """Log pcs PCs (and change some of them) in journal mode, close, return the fleet"""
+    logger = PCLogger(log_file, storage=JournalStorage(log_file, compact_every=compact_every))
+    for i in range(pcs):
+        logger.log_pc_with_software(f"PC-{i:02d}", SOFTWARE[:1 + i % len(SOFTWARE)])
+    for i in range(0, pcs, 3):
+        logger.log_pc_status(f"PC-{i:02d}", "offline")
+    logger.log_pc_delta("PC-01", "running", ["Minecraft"], ["Steam"], logger.get_software_hash("PC-01"))
+    fleet = logger.get_all_pcs()
+    logger.close()
+    return fleet
+
+
+def reload(log_file: str) -> dict:
+    """Open the files again the way a restarted server does"""
+    logger = PCLogger(log_file, storage="journal")
+    fleet = logger.get_all_pcs()
+    logger.close()
+    return fleet
+
+
+def check_restart(work_dir: str):
+    """Records in the journal alone (no compaction yet) are replayed"""
+    log_file = os.path.join(work_dir, "restart.json")
+    fleet = fill(log_file, 10)
+    expect(os.path.exists(log_file + ".journal"), "restart: no journal written")
+    expect(reload(log_file) == fleet, "restart: replayed fleet differs")
+
+
+def check_compaction(work_dir: str):
+    """Compactions along the way leave snapshot + journal equal to the fleet"""
+    log_file = os.path.join(work_dir, "compact.json")
+    fleet = fill(log_file, 30, compact_every=7)
+    expect(os.path.exists(log_file), "compaction: no snapshot written")
+    expect(not os.path.exists(log_file + ".journal.old"), "compaction: rotated journal left behind")
+    expect(reload(log_file) == fleet, "compaction: replayed fleet differs")
+
+
+def check_torn_line(work_dir: str):
+    """A line cut off by a crash mid-append is skipped, the rest is kept"""
+    log_file = os.path.join(work_dir, "torn.json")
+    fleet = fill(log_file, 10)
+    with open(log_file + ".journal", 'a', encoding='utf-8') as f:
+        f.write('{"pc":"PC-99","status":"runn')
+    expect(reload(log_file) == fleet, "torn line: replayed fleet differs")
+
+
+def check_interrupted_compaction(work_dir: str):
+    """A rotated journal whose snapshot was never written is replayed before the new one"""
+    log_file = os.path.join(work_dir, "interrupted.json")
+    fleet = fill(log_file, 10)
+    # As if the server died right after rotating: every record is in .old, newer ones follow
+    os.replace(log_file + ".journal", log_file + ".journal.old")
+    journal = LogJournal(log_file)
+    journal.append([{"pc": "PC-00", "status": "running", "software": ["Valorant"],
+                     "last_updated": "2030-01-01 00:00:00"}])
+    journal.close()
+    fleet["PC-00"] = {"status": "running", "software": ["Valorant"], "last_updated": "2030-01-01 00:00:00"}
+    expect(reload(log_file) == fleet, "interrupted compaction: replayed fleet differs")
+    expect(not os.path.exists(log_file + ".journal.old"), "interrupted compaction: not finished on load")
+    expect(reload(log_file) == fleet, "interrupted compaction: fleet differs after finishing it")
+
+
+def check_corrupt_snapshot(work_dir: str):
+    """A damaged snapshot is set aside and the journal still replays"""
+    log_file = os.path.join(work_dir, "corrupt.json")
+    fill(log_file, 4)
+    with open(log_file, 'w') as f:
+        f.write('{"pcs": {')
+    journal = LogJournal(log_file)
+    journal.append([{"pc": "PC-50", "status": "running", "software": [], "last_updated": "2030-01-01 00:00:00"}])
+    journal.close()
+    fleet = reload(log_file)
+    expect(os.path.exists(log_file + ".corrupt"), "corrupt snapshot: not moved aside")
+    expect("PC-50" in fleet, "corrupt snapshot: journal records lost")
+
+
+if __name__ == "__main__":
+    checks = [check_restart, check_compaction, check_torn_line, check_interrupted_compaction,
+              check_corrupt_snapshot]
+    work_dir = tempfile.mkdtemp(prefix="pc_journal_check_")
+    try:
+        for check in checks:
+            # PCLogger reports every update
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                try:
+                    check(work_dir)
+                except Exception as e:
+                    failures.append(f"{check.__name__} raised {e!r}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for message in failures:
+        print(f"[ERROR] {message}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] {len(checks)} journal checks passed")
+    sys.exit(0)
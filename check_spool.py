@@ -0,0 +1,149 @@
+"""
+Spool Check - Offline heartbeats come back in order, once
+Fills a HeartbeatSpool with small segments and reads it back through the
+cursor: across segment rotation, undelivered reads, restarts, a torn last
+line and the size limit.
+"""
+
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+
+from spool import SEGMENT_PREFIX, HeartbeatSpool
+
+failures = []
+
+
+def expect(condition: bool, message: str):
+    """Record a failed check"""
+    if not condition:
+        failures.append(message)
+
+
+def record(i: int) -> dict:
+    """Heartbeat record number i, about 100 bytes as a line"""
+    return {"pc_name": "PC-01", "status": "running", "software": ["Steam", "Discord"], "timestamp": i}
+
+
+def segments(directory: str) -> list:
+    """Segment file names in a spool directory"""
+    return sorted(name for name in os.listdir(directory) if name.startswith(SEGMENT_PREFIX))
+
+
+def drain(spool: HeartbeatSpool, batch: int = 7) -> list:
+    """Read and commit everything, batch records at a time; returns the timestamps"""
+    seen = []
+    while True:
+        records, cursor = spool.read(batch)
+        if not records:
+            return seen
+        seen.extend(r["timestamp"] for r in records)
+        spool.commit(cursor)
+
+
+def check_rotation(work_dir: str):
+    """Records cross several segments in order, and read segments are deleted"""
+    directory = os.path.join(work_dir, "rotation")
+    spool = HeartbeatSpool(directory, segment_bytes=1000)
+    for i in range(50):
+        spool.append(record(i))
+    expect(len(segments(directory)) > 3, "rotation: no new segments started")
+    expect(drain(spool) == list(range(50)), "rotation: records lost, repeated or out of order")
+    expect(len(segments(directory)) <= 1, "rotation: read segments not deleted")
+    expect(not spool, "rotation: spool not empty after draining")
+    spool.close()
+
+
+def check_undelivered(work_dir: str):
+    """Records read but not committed (the server was down) are read again"""
+    directory = os.path.join(work_dir, "undelivered")
+    spool = HeartbeatSpool(directory, segment_bytes=1000)
+    for i in range(20):
+        spool.append(record(i))
+    first, _ = spool.read(15)
+    again, _ = spool.read(15)
+    expect(first == again, "undelivered: second read differs")
+    spool.close()
+    reopened = HeartbeatSpool(directory, segment_bytes=1000)
+    expect(drain(reopened) == list(range(20)), "undelivered: records lost after restart")
+    reopened.close()
+
+
+def check_restart(work_dir: str):
+    """The cursor survives a restart: delivered records are not sent twice"""
+    directory = os.path.join(work_dir, "restart")
+    spool = HeartbeatSpool(directory, segment_bytes=1000)
+    for i in range(30):
+        spool.append(record(i))
+    records, cursor = spool.read(12)
+    spool.commit(cursor)
+    spool.close()
+
+    reopened = HeartbeatSpool(directory, segment_bytes=1000)
+    for i in range(30, 40):
+        reopened.append(record(i))
+    expect(drain(reopened) == list(range(12, 40)), "restart: cursor not resumed")
+    reopened.close()
+
+    # Fully drained and reopened: new records start from a clean spool
+    reopened = HeartbeatSpool(directory, segment_bytes=1000)
+    expect(not reopened, "restart: drained spool not empty after reopening")
+    reopened.append(record(40))
+    expect(drain(reopened) == [40], "restart: record after a drained restart")
+    reopened.close()
+
+
+def check_torn_line(work_dir: str):
+    """A line cut off by a crash is skipped and appending goes on in a new segment"""
+    directory = os.path.join(work_dir, "torn")
+    spool = HeartbeatSpool(directory, segment_bytes=100000)
+    for i in range(5):
+        spool.append(record(i))
+    spool.close()
+    last = os.path.join(directory, segments(directory)[-1])
+    with open(last, 'ab') as f:
+        f.write(b'{"pc_name":"PC-01","stat')
+
+    reopened = HeartbeatSpool(directory, segment_bytes=100000)
+    reopened.append(record(5))
+    expect(len(segments(directory)) == 2, "torn line: appended to the torn segment")
+    expect(drain(reopened, batch=3) == list(range(6)), "torn line: records lost or out of order")
+    reopened.close()
+
+
+def check_size_limit(work_dir: str):
+    """Past max_bytes the oldest segments go and reading resumes at the oldest left"""
+    directory = os.path.join(work_dir, "limit")
+    spool = HeartbeatSpool(directory, max_bytes=3000, segment_bytes=1000)
+    for i in range(100):
+        spool.append(record(i))
+    total = sum(os.path.getsize(os.path.join(directory, name)) for name in segments(directory))
+    expect(total <= 3000, f"size limit: {total} bytes kept")
+    seen = drain(spool)
+    expect(seen and seen[-1] == 99, "size limit: newest records dropped")
+    expect(seen == list(range(seen[0], 100)), "size limit: gap in the records kept")
+    spool.close()
+
+
+if __name__ == "__main__":
+    checks = [check_rotation, check_undelivered, check_restart, check_torn_line, check_size_limit]
+    work_dir = tempfile.mkdtemp(prefix="pc_spool_check_")
+    try:
+        for check in checks:
+            # The spool warns when it drops heartbeats
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                try:
+                    check(work_dir)
+                except Exception as e:
+                    failures.append(f"{check.__name__} raised {e!r}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for message in failures:
+        print(f"[ERROR] {message}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] {len(checks)} spool checks passed")
+    sys.exit(0)
@@ -0,0 +1,138 @@
+"""
+Wire Format Check - Binary heartbeats round-trip and resync correctly
+Encodes full, delta and keep-alive heartbeats, decodes them as the server
+does, and drives the app-name table through a server restart. Then sends
+heartbeats through RequestRouter to check what the server answers.
+"""
+
+import contextlib
+import json
+import os
+import sys
+
+from pc_logger import PCLogger
+from protocol import (BINARY_CONTENT_TYPE, ResyncRequired, WireDecoder, WireEncoder, diff_software,
+                      software_hash)
+from server import RequestRouter
+
+SOFTWARE = ["Steam", "Discord", "Counter-Strike 2", "Spotify"]
+CHANGED = ["Discord", "Counter-Strike 2", "Spotify", "Valorant"]
+
+failures = []
+
+
+def expect(condition: bool, message: str):
+    """Record a failed check"""
+    if not condition:
+        failures.append(message)
+
+
+def heartbeats() -> list:
+    """(kind, payload) for first contact, a delta and a keep-alive, as LoggingClient builds them"""
+    added, removed = diff_software(SOFTWARE, CHANGED)
+    base = {"pc_name": "PC-07", "status": "running", "interval": 0.5}
+    return [
+        ("full", dict(base, software=SOFTWARE, software_hash=software_hash(SOFTWARE))),
+        ("delta", dict(base, base_hash=software_hash(SOFTWARE), added=added, removed=removed,
+                       software_hash=software_hash(CHANGED))),
+        ("keep-alive", dict(base, base_hash=software_hash(CHANGED))),
+    ]
+
+
+def check_round_trip():
+    """Every heartbeat kind decodes to the payload it was encoded from"""
+    encoder, decoder = WireEncoder(), WireDecoder()
+    for kind, payload in heartbeats():
+        decoded = decoder.decode(encoder.encode(payload))
+        encoder.acknowledge()
+        expect(decoded == payload, f"round trip: {kind} decoded as {decoded}")
+
+
+def check_unacknowledged_names():
+    """Names of a heartbeat that never arrived are sent again with the next one"""
+    encoder, decoder = WireEncoder(), WireDecoder()
+    full = heartbeats()[0][1]
+    encoder.encode(full)  # lost on the way, so not acknowledged
+    expect(decoder.decode(encoder.encode(full)) == full, "unacknowledged names: not resent")
+
+
+def check_resync():
+    """A restarted server asks for a resync, and the reset encoder starts over"""
+    encoder = WireEncoder()
+    full, delta, _ = (payload for _, payload in heartbeats())
+    WireDecoder().decode(encoder.encode(full))
+    encoder.acknowledge()
+
+    restarted = WireDecoder()
+    try:
+        restarted.decode(encoder.encode(delta))
+        failures.append("resync: restarted server decoded IDs it never saw")
+    except ResyncRequired:
+        pass
+    encoder.reset()
+    full_again = dict(full, software=CHANGED, software_hash=software_hash(CHANGED))
+    expect(restarted.decode(encoder.encode(full_again)) == full_again, "resync: full list after reset")
+
+
+def check_version():
+    """Bodies of another format version are refused"""
+    body = bytearray(WireEncoder().encode(heartbeats()[0][1]))
+    body[0] += 1
+    try:
+        WireDecoder().decode(bytes(body))
+        failures.append("version: unknown version accepted")
+    except ValueError:
+        pass
+
+
+def post(router: RequestRouter, path: str, body: bytes, content_type: str = "application/json") -> int:
+    """Status code the router answers a POST with"""
+    return router.handle('POST', path, {'content-type': content_type}, body)[0]
+
+
+def check_server():
+    """What /log and /log/batch answer for good, stale and invalid heartbeats"""
+    logger = PCLogger(os.devnull, storage="memory")
+    router = RequestRouter(logger)
+    encoder = WireEncoder()
+    full, delta, keep_alive = (payload for _, payload in heartbeats())
+
+    expect(post(router, '/log', encoder.encode(full), BINARY_CONTENT_TYPE) == 200, "server: binary full list")
+    encoder.acknowledge()
+    expect(post(router, '/log', encoder.encode(delta), BINARY_CONTENT_TYPE) == 200, "server: binary delta")
+    expect(logger.get_pc_info("PC-07")["software"] == sorted(CHANGED), "server: delta not applied")
+    expect(post(router, '/log', json.dumps(keep_alive).encode()) == 200, "server: keep-alive")
+
+    # Deltas and keep-alives for a PC the server doesn't know ask for the full list
+    stray = dict(keep_alive, pc_name="PC-08", base_hash=None)
+    expect(post(router, '/log', json.dumps(stray).encode()) == 409, "server: keep-alive of unknown PC")
+    stray = dict(delta, pc_name="PC-08")
+    expect(post(router, '/log', json.dumps(stray).encode()) == 409, "server: delta of unknown PC")
+    expect(logger.get_pc_info("PC-08") is None, "server: unknown PC was created")
+
+    for bad in ({"pc_name": 5, "software": []}, {"pc_name": ["PC"], "software": []},
+                {"pc_name": "PC-09", "status": 1}, {"pc_name": "PC-09", "software": "Steam"}):
+        expect(post(router, '/log', json.dumps(bad).encode()) == 400, f"server: accepted {bad}")
+    batch = [{"pc_name": "PC-10"}, {"pc_name": 7}]
+    expect(post(router, '/log/batch', json.dumps(batch).encode()) == 400, "server: accepted bad batch")
+    expect(logger.get_pc_info("PC-10") is None, "server: bad batch half-applied")
+    expect(json.loads(router.cache.logs()[1]).get("pcs", {}).keys() == {"PC-07"}, "server: /logs")
+    logger.close()
+
+
+if __name__ == "__main__":
+    checks = [check_round_trip, check_unacknowledged_names, check_resync, check_version, check_server]
+    for check in checks:
+        # PCLogger reports every update
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            try:
+                check()
+            except Exception as e:
+                failures.append(f"{check.__name__} raised {e!r}")
+
+    for message in failures:
+        print(f"[ERROR] {message}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] {len(checks)} wire format checks passed")
+    sys.exit(0)
@@ -3,21 +3,72 @@ PC Logging Client
 Runs on each gaming PC to send status and software info to the server
 """
 
+import gzip
+import http.client
 import json
+import queue
+import random
 import socket
+import threading
 import time
 import sys
-from typing import List, Optional
-from urllib.request import Request, urlopen
+from collections import deque
+from typing import Dict, List, Optional, Tuple
 from urllib.error import URLError, HTTPError
+from urllib.parse import urlparse
 
-from detect_software import get_running_software, get_pc_name
+from app_rules import RulesFile
+from detect_software import PROVIDERS, SoftwareDetector, create_provider, get_pc_name
+from protocol import BINARY_CONTENT_TYPE, WireEncoder, diff_software, software_hash
+from spool import HeartbeatSpool
+
+
+class LatencyStats:
+    """Latency figures of one client pipeline stage (detection or sending)"""
+    
+    def __init__(self, window: int = 256):
+        """
+        Args:
+            window: Number of recent measurements percentiles are taken over
+        """
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        """Add one measurement"""
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.recent.append(seconds)
+    
+    def percentile(self, percent: float) -> float:
+        """Percentile of the recent measurements in seconds (0.0 if none)"""
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * percent / 100))]
+    
+    def summary(self) -> str:
+        """One-line summary in milliseconds"""
+        if not self.count:
+            return "no data"
+        return (f"n={self.count} mean={self.total / self.count * 1000:.1f}ms "
+                f"p50={self.percentile(50) * 1000:.1f}ms p95={self.percentile(95) * 1000:.1f}ms "
+                f"max={self.max * 1000:.1f}ms")
 
 
 class LoggingClient:
     """Client that sends PC information to the logging server"""
     
-    def __init__(self, server_url: str, pc_name: Optional[str] = None, interval: int = 30):
+    def __init__(self, server_url: str, pc_name: Optional[str] = None, interval: int = 30,
+                 delta: bool = True, wire: str = "json", compress_min_bytes: int = 1024,
+                 provider: str = "auto", rules_file: Optional[str] = None, queue_size: int = 8,
+                 spool_dir: Optional[str] = None, spool_max_bytes: int = 10 * 1024 * 1024):
         """
         Initialize the logging client.
         
@@ -25,11 +76,82 @@ class LoggingClient:
             server_url: URL of the logging server (e.g., "http://192.168.1.100:8080")
             pc_name: Name of this PC (auto-detected if not provided)
             interval: How often to send updates in seconds (default: 30)
+            delta: Send only software changes (or a bare keep-alive) after the
+                   first full list, instead of the full list every time
+            wire: "json", or "binary" for the compact encoding with app names
+                  sent as small IDs (falls back to JSON on older servers)
+            compress_min_bytes: gzip request bodies of at least this many
+                                bytes (0 = never compress)
+            provider: Process list source for software detection (see
+                      detect_software.PROVIDERS; "auto" picks the fastest)
+            rules_file: JSON app rules file (see app_rules.py), reloaded when
+                        it changes; None uses the built-in rules
+            queue_size: Samples waiting to be sent in run_continuous; when the
+                        server is slow the oldest waiting sample is dropped
+            spool_dir: Directory to keep heartbeats in while the server is
+                       unreachable, replayed once it is back (None = drop them)
+            spool_max_bytes: Size limit of the spool; the oldest heartbeats
+                             are dropped beyond it
         """
         self.server_url = server_url.rstrip('/')
+        parsed_url = urlparse(self.server_url)
+        self._connection_class = (http.client.HTTPSConnection if parsed_url.scheme == 'https'
+                                  else http.client.HTTPConnection)
+        self._netloc = parsed_url.netloc
+        self._connection = None  # persistent HTTP/1.1 connection, opened on first request
         self.pc_name = pc_name or get_pc_name()
         self.interval = interval
+        self.delta = delta
         self.running = False
+        # Software list the server last accepted; None until a full list got through
+        self.last_sent_software = None
+        self.last_sent_hash = None
+        self.encoder = WireEncoder() if wire == "binary" else None
+        self.compress_min_bytes = compress_min_bytes
+        self.provider = provider
+        self.detector = None  # SoftwareDetector, created on first detection
+        self.rules = RulesFile(rules_file) if rules_file else None
+        # run_continuous samples on the calling thread and sends from a worker
+        self._send_queue = queue.Queue(maxsize=max(1, queue_size))
+        self._sender = None
+        self.dropped_samples = 0
+        self.sample_latency = LatencyStats()
+        self.send_latency = LatencyStats()
+        self.spool = HeartbeatSpool(spool_dir, max_bytes=spool_max_bytes) if spool_dir else None
+        self.replay_batch_size = 100
+        self.max_backoff = 600.0
+        self._failures = 0      # failed attempts in a row while the server is unreachable
+        self._retry_at = 0.0    # monotonic time before which the spool isn't replayed
+    
+    def build_payload(self, status: str, software: List[str]) -> Dict:
+        """
+        Build the heartbeat body: a full software list on first contact (or
+        after a resync), otherwise only the changes since the last accepted
+        heartbeat, or just a keep-alive with the list's hash.
+        
+        Args:
+            status: PC status ("running" or "offline")
+            software: Current software list
+            
+        Returns:
+            Dictionary to send as JSON
+        """
+        # The interval lets the server tell a missed heartbeat from a slow one
+        data = {"pc_name": self.pc_name, "status": status, "interval": self.interval}
+        current_hash = software_hash(software)
+        
+        if not self.delta or self.last_sent_hash is None:
+            data["software"] = software
+            data["software_hash"] = current_hash
+            return data
+        
+        data["base_hash"] = self.last_sent_hash
+        if current_hash != self.last_sent_hash:
+            added, removed = diff_software(self.last_sent_software, software)
+            data["added"] = added
+            data["removed"] = removed
+            data["software_hash"] = current_hash
+        return data
     
     def send_log(self, status: str = "running", software: Optional[List[str]] = None) -> bool:
         """
@@ -43,35 +165,144 @@ class LoggingClient:
             True if successful, False otherwise
         """
         if software is None:
+            software = self.detect_software()
+        return self.send_sample(status, software)
+    
+    def detect_software(self) -> List[str]:
+        """
+        Detect the running software, timing it into sample_latency.
+        
+        Returns:
+            List of software names (empty if detection failed)
+        """
+        start = time.monotonic()
+        try:
+            if self.detector is None:
+                self.detector = SoftwareDetector(create_provider(self.provider), rules=self.rules)
+            return self.detector.detect()
+        except Exception as e:
+            print(f"[WARNING] Could not detect software: {e}")
+            return []
+        finally:
+            self.sample_latency.record(time.monotonic() - start)
+    
+    def send_sample(self, status: str, software: List[str], sampled_at: Optional[float] = None) -> bool:
+        """
+        Send one sample to the server, timing it into send_latency.
+        With a spool, a sample the server can't be reached for is spooled,
+        and while older samples are spooled new ones queue up behind them.
+        
+        Args:
+            status: PC status ("running" or "offline")
+            software: Detected software list
+            sampled_at: When the sample was taken (epoch seconds, default: now)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        start = time.monotonic()
+        sampled_at = time.time() if sampled_at is None else sampled_at
+        try:
+            if self.spool is not None and self.spool:
+                # Keep the order: this sample goes behind the spooled ones
+                self._spool_sample(status, software, sampled_at)
+                return self.replay_spool()
+            sent = self._send_sample(status, software)
+            if sent is None and self.spool is not None:
+                self._spool_sample(status, software, sampled_at)
+                self._back_off()
+            return bool(sent)
+        finally:
+            self.send_latency.record(time.monotonic() - start)
+    
+    def _spool_sample(self, status: str, software: List[str], sampled_at: float):
+        """Store a sample as a /log/batch record"""
+        self.spool.append({"pc_name": self.pc_name, "status": status, "software": software,
+                           "timestamp": sampled_at, "interval": self.interval})
+    
+    def _back_off(self):
+        """Schedule the next replay attempt with exponential backoff and jitter"""
+        self._failures += 1
+        delay = min(self.max_backoff, self.interval * 2 ** min(self._failures - 1, 16))
+        # Random spread, so PCs don't all come back at the same moment
+        delay = random.uniform(delay / 2, delay)
+        self._retry_at = time.monotonic() + delay
+        print(f"[INFO] Spooling heartbeats to {self.spool.directory}, next attempt in {delay:.0f}s")
+    
+    def replay_spool(self) -> bool:
+        """
+        Send spooled heartbeats to /log/batch in order, in batches of
+        replay_batch_size, unless still backing off from a failure.
+        
+        Returns:
+            True if the spool is empty afterwards
+        """
+        if time.monotonic() < self._retry_at:
+            return False
+        replayed = 0
+        while True:
+            records, cursor = self.spool.read(self.replay_batch_size)
+            if not records:
+                break
             try:
-                software = get_running_software()
-            except Exception as e:
-                print(f"[WARNING] Could not detect software: {e}")
-                software = []
+                self._post_json('/log/batch', {"records": records})
+            except HTTPError as e:
+                if e.code >= 500:
+                    self._back_off()
+                    return False
+                # Retrying can't make the server accept these
+                print(f"[ERROR] Server rejected {len(records)} spooled heartbeats: {e.code} - {e.reason}")
+            except (URLError, ValueError):
+                self._back_off()
+                return False
+            else:
+                replayed += len(records)
+                # The server now has the last replayed list
+                self.last_sent_software = list(records[-1].get("software", []))
+                self.last_sent_hash = software_hash(self.last_sent_software)
+            self.spool.commit(cursor)
+        self._failures = 0
+        self._retry_at = 0.0
+        if replayed:
+            print(f"[OK] Replayed {replayed} spooled heartbeats for {self.pc_name}")
+        return True
+    
+    def _send_sample(self, status: str, software: List[str]) -> Optional[bool]:
+        """
+        Build the heartbeat for a sample and POST it.
         
-        data = {
-            "pc_name": self.pc_name,
-            "status": status,
-            "software": software
-        }
+        Returns:
+            True if sent, False if the server refused it, None if the server
+            could not be reached (or failed with a 5xx error)
+        """
+        data = self.build_payload(status, software)
         
         try:
-            request = Request(
-                f"{self.server_url}/log",
-                data=json.dumps(data).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
+            result = self._post_heartbeat(data)
             
-            response = urlopen(request, timeout=5)
-            result = json.loads(response.read().decode('utf-8'))
+            if result.get('status') == 'resync':
+                # Server lost track of our list (restart, missed update): send it in full
+                print(f"[INFO] Server asked for a full software list, resending")
+                self.last_sent_software = None
+                self.last_sent_hash = None
+                if self.encoder:
+                    self.encoder.reset()
+                result = self._post_heartbeat(self.build_payload(status, software))
             
             if result.get('status') == 'success':
+                self.last_sent_software = list(software)
+                self.last_sent_hash = software_hash(software)
+                if self.encoder:
+                    self.encoder.acknowledge()
                 print(f"[OK] Sent log for {self.pc_name}: {len(software)} apps detected")
                 return True
             else:
                 print(f"[ERROR] Server returned: {result.get('message', 'Unknown error')}")
                 return False
                 
+        except HTTPError as e:
+            print(f"[ERROR] Server error: {e.code} - {e.reason}")
+            return None if e.code >= 500 else False
         except URLError as e:
             error_msg = str(e)
             if "refused" in error_msg.lower() or "10061" in error_msg:
@@ -81,20 +312,127 @@ class LoggingClient:
                 print(f"       → Check IP address is correct")
             else:
                 print(f"[ERROR] Could not connect to server at {self.server_url}: {e}")
-            return False
-        except HTTPError as e:
-            print(f"[ERROR] Server error: {e.code} - {e.reason}")
-            return False
+            return None
         except Exception as e:
             print(f"[ERROR] Unexpected error: {e}")
             return False
     
+    def _post_heartbeat(self, data: Dict) -> Dict:
+        """
+        POST a heartbeat to /log in the configured wire format.
+        
+        Args:
+            data: Heartbeat dictionary from build_payload
+            
+        Returns:
+            Decoded response dictionary
+        """
+        if self.encoder is None:
+            return self._post_json("/log", data)
+        try:
+            status, body = self._post('/log', self.encoder.encode(data), BINARY_CONTENT_TYPE)
+        except HTTPError as e:
+            if e.code not in (400, 415):
+                raise
+            # Server predates the binary format
+            print(f"[WARNING] Server did not accept a binary heartbeat, switching to JSON")
+            self.encoder = None
+            return self._post_json("/log", data)
+        return json.loads(body.decode('utf-8'))
+    
+    def _post_json(self, path: str, data: Dict) -> Dict:
+        """
+        POST a JSON body and decode the JSON reply.
+        A 409 reply (resync request) is returned like a normal reply.
+        
+        Args:
+            path: Server path, e.g. "/log"
+            data: Dictionary to send
+            
+        Returns:
+            Decoded response dictionary
+        """
+        status, body = self._post(path, json.dumps(data).encode('utf-8'), 'application/json')
+        return json.loads(body.decode('utf-8'))
+    
+    def _post(self, path: str, body: bytes, content_type: str) -> Tuple[int, bytes]:
+        """
+        POST a body, gzip-compressed if it is at least compress_min_bytes.
+        A 409 reply (resync request) is returned like a normal reply.
+        
+        Args:
+            path: Server path, e.g. "/log"
+            body: Uncompressed request body
+            content_type: Content-Type of body
+            
+        Returns:
+            Tuple of (status code, response body)
+        """
+        headers = {'Content-Type': content_type}
+        if self.compress_min_bytes and len(body) >= self.compress_min_bytes:
+            try:
+                return self._request('POST', path, gzip.compress(body, compresslevel=6),
+                                     dict(headers, **{'Content-Encoding': 'gzip'}), accept_status=(409,))
+            except HTTPError as e:
+                if e.code not in (400, 415):
+                    raise
+                # Server predates compressed uploads
+                print(f"[WARNING] Server did not accept a compressed body, sending uncompressed from now on")
+                self.compress_min_bytes = 0
+        return self._request('POST', path, body, headers, accept_status=(409,))
+    
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None, accept_status: Tuple[int, ...] = ()) -> Tuple[int, bytes]:
+        """
+        Send a request over the persistent connection.
+        A kept-alive connection the server has meanwhile closed is reopened
+        once. Failures are raised as URLError/HTTPError like urlopen does.
+        
+        Args:
+            method: HTTP method
+            path: Server path, e.g. "/log"
+            body: Request body
+            headers: Request headers
+            accept_status: Error status codes to return instead of raising
+            
+        Returns:
+            Tuple of (status code, response body)
+        """
+        for attempt in (1, 2):
+            reused = self._connection is not None
+            if self._connection is None:
+                self._connection = self._connection_class(self._netloc, timeout=5)
+            try:
+                self._connection.request(method, path, body=body, headers=headers or {})
+                response = self._connection.getresponse()
+                response_body = response.read()
+            except socket.timeout as e:
+                self.close()
+                raise URLError(e)
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+                if reused and attempt == 1:
+                    continue
+                raise URLError(e)
+            
+            if response.will_close:
+                self.close()
+            if response.status >= 400 and response.status not in accept_status:
+                raise HTTPError(f"{self.server_url}{path}", response.status, response.reason,
+                                response.headers, None)
+            return response.status, response_body
+    
+    def close(self):
+        """Close the persistent connection (reopened by the next request)"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+    
     def test_connection(self) -> bool:
         """Test if server is reachable"""
         try:
-            request = Request(f"{self.server_url}/status", method='GET')
-            response = urlopen(request, timeout=5)
-            result = json.loads(response.read().decode('utf-8'))
+            status, body = self._request('GET', '/status')
+            result = json.loads(body.decode('utf-8'))
             if result.get('status') == 'running':
                 print(f"[OK] Server connection successful!")
                 return True
@@ -132,17 +470,73 @@ class LoggingClient:
             print()
         
         self.running = True
+        self._sender = threading.Thread(target=self._send_loop, name="heartbeat-sender", daemon=True)
+        self._sender.start()
         
         try:
+            # Fixed-rate schedule: the next sample is due one interval after
+            # the previous one was due, however long detection took, and
+            # sending happens on the worker so a slow server can't delay it
+            next_sample = time.monotonic()
             while self.running:
-                self.send_log()
-                time.sleep(self.interval)
+                self._enqueue("running", self.detect_software())
+                next_sample += self.interval
+                now = time.monotonic()
+                if next_sample < now:
+                    # Fell behind (slow detection, PC was asleep): skip the missed samples
+                    next_sample += ((now - next_sample) // self.interval + 1) * self.interval
+                time.sleep(next_sample - now)
         except KeyboardInterrupt:
             print("\n\nShutting down client...")
             # Send offline status before exiting
-            self.send_log(status="offline")
+            self.running = False
+            self._enqueue("offline", self.detect_software())
+        finally:
+            self._stop_sender()
+            self.close()
+            if self.spool is not None:
+                self.spool.close()
+            print(f"[INFO] Detection latency: {self.sample_latency.summary()}")
+            print(f"[INFO] Send latency: {self.send_latency.summary()}")
+            if self.dropped_samples:
+                print(f"[INFO] Dropped {self.dropped_samples} samples while the server was slow")
             print("Client stopped.")
     
+    def _enqueue(self, status: str, software: List[str]):
+        """Queue a sample for the sender, dropping the oldest waiting one if the queue is full"""
+        while True:
+            try:
+                self._send_queue.put_nowait((status, software, time.time()))
+                return
+            except queue.Full:
+                try:
+                    self._send_queue.get_nowait()
+                    self.dropped_samples += 1
+                except queue.Empty:
+                    pass
+    
+    def _send_loop(self):
+        """Sender worker: POST queued samples in order until told to stop (None)"""
+        while True:
+            item = self._send_queue.get()
+            if item is None:
+                return
+            try:
+                self.send_sample(*item)
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {e}")
+    
+    def _stop_sender(self, timeout: float = 15.0):
+        """Let the sender finish the queued samples, then stop it"""
+        if self._sender is None:
+            return
+        try:
+            self._send_queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass  # sender is stuck on the network; it is a daemon thread
+        self._sender.join(timeout)
+        self._sender = None
+    
     def send_once(self):
         """Send a single log update"""
         return self.send_log()
@@ -156,15 +550,47 @@ if __name__ == "__main__":
     parser.add_argument('--pc-name', help='PC name (auto-detected if not provided)')
     parser.add_argument('--interval', type=int, default=30, 
                        help='Update interval in seconds (default: 30)')
+    parser.add_argument('--queue-size', type=int, default=8,
+                       help='Samples waiting to be sent before the oldest is dropped (default: 8)')
+    parser.add_argument('--spool-dir', default='pc_log_spool',
+                       help='Directory to keep heartbeats in while the server is unreachable '
+                            '(default: pc_log_spool)')
+    parser.add_argument('--spool-max-mb', type=float, default=10,
+                       help='Size limit of the spool in MB; the oldest heartbeats are dropped '
+                            'beyond it (default: 10)')
+    parser.add_argument('--no-spool', action='store_true',
+                       help='Drop heartbeats the server could not receive instead of spooling them')
     parser.add_argument('--once', action='store_true', 
                        help='Send one update and exit (default: continuous)')
+    parser.add_argument('--no-delta', action='store_true',
+                       help='Send the full software list every time instead of only changes')
+    parser.add_argument('--wire', choices=['json', 'binary'], default='json',
+                       help='Heartbeat encoding: json, or binary with app names sent as '
+                            'small IDs (default: json)')
+    parser.add_argument('--compress-min', type=int, default=1024, metavar='BYTES',
+                       help='gzip uploads of at least BYTES bytes, 0 = never (default: 1024)')
+    parser.add_argument('--provider', choices=PROVIDERS, default='auto',
+                       help='Process list source: toolhelp (Windows API, no subprocess), '
+                            'tasklist (spawns tasklist/PowerShell), proc (Linux); '
+                            'auto picks the fastest available (default: auto)')
+    parser.add_argument('--rules', metavar='FILE',
+                       help='JSON app rules file (exclusions, aliases, title patterns), '
+                            'reloaded when it changes')
     
     args = parser.parse_args()
     
     client = LoggingClient(
         server_url=args.server_url,
         pc_name=args.pc_name,
-        interval=args.interval
+        interval=args.interval,
+        delta=not args.no_delta,
+        wire=args.wire,
+        compress_min_bytes=args.compress_min,
+        provider=args.provider,
+        rules_file=args.rules,
+        queue_size=args.queue_size,
+        spool_dir=None if args.no_spool else args.spool_dir,
+        spool_max_bytes=int(args.spool_max_mb * 1024 * 1024)
     )
     
     if args.once:
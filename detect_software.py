@@ -1,116 +1,435 @@
 """
 Software Detection Utility
-Detects running software on Windows systems
+Detects running software on Windows systems (and on Linux through /proc)
 """
 
+import csv
+import os
 import platform
 import subprocess
 import socket
-from typing import List
+import time
+from typing import List, Optional, Tuple, Union
+
+from app_rules import AppRules, RulesFile
+
+PROVIDERS = ("auto", "toolhelp", "tasklist", "proc")
 
 
 def get_pc_name() -> str:
     """
     Get the computer name.
-    
+
     Returns:
         Computer name as string
     """
     return socket.gethostname()
 
 
-def get_running_software() -> List[str]:
+def parse_tasklist_csv(text: str) -> List[Tuple[int, str]]:
     """
-    Detect running software/processes on Windows.
-    Filters out system processes and focuses on user applications.
-    
+    Parse the output of `tasklist /FO CSV /NH`.
+
+    Args:
+        text: CSV lines of "Image Name","PID","Session Name","Session#","Mem Usage"
+
     Returns:
-        List of software/application names
+        List of (pid, image name) tuples
     """
-    if platform.system() != 'Windows':
-        raise NotImplementedError("Software detection currently only supports Windows")
-    
-    # Common system processes to exclude
-    excluded_processes = {
-        'svchost.exe', 'explorer.exe', 'dwm.exe', 'winlogon.exe',
-        'csrss.exe', 'smss.exe', 'services.exe', 'lsass.exe',
-        'spoolsv.exe', 'taskhost.exe', 'taskhostw.exe', 'conhost.exe',
-        'dllhost.exe', 'audiodg.exe', 'sihost.exe', 'RuntimeBroker.exe',
-        'SearchIndexer.exe', 'SearchProtocolHost.exe', 'SearchFilterHost.exe',
-        'WmiPrvSE.exe', 'MsMpEng.exe', 'SecurityHealthService.exe',
-        'chrome.exe', 'msedge.exe', 'firefox.exe',  # Browsers (we'll get them separately)
-    }
-    
-    # Common application names to look for (without .exe)
-    gaming_apps = {
-        'steam', 'epicgameslauncher', 'origin', 'uplay', 'battlenet',
-        'discord', 'teamspeak', 'mumble', 'obs64', 'obs32', 'streamlabs',
-        'spotify', 'vlc', 'chrome', 'firefox', 'msedge',
-        'notepad++', 'code', 'pycharm', 'intellij',
-        'counter-strike', 'csgo', 'cs2', 'valorant', 'league of legends',
-        'fortnite', 'apex', 'overwatch', 'minecraft', 'roblox'
-    }
-    
-    try:
-        # Get all running processes
-        result = subprocess.run(
-            ['tasklist', '/FO', 'CSV', '/NH'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
+    processes = []
+    for row in csv.reader(text.splitlines()):
+        if len(row) < 2:
+            continue
+        try:
+            pid = int(row[1])
+        except ValueError:
+            continue  # header line or a localized "N/A"
+        processes.append((pid, row[0]))
+    return processes
+
+
+class ProcessProvider:
+    """
+    Source of the process list (and window titles) for SoftwareDetector.
+
+    Providers that can enumerate in-process keep their handles and
+    buffers for the life of the detector instead of spawning a program
+    on every sample.
+    """
+
+    name = None
+    # Suffix executables carry on this platform; names without it are skipped
+    executable_suffix = ""
+
+    def processes(self) -> List[Tuple[int, str]]:
+        """
+        List running processes.
+
+        Returns:
+            List of (pid, executable name) tuples
+        """
+        raise NotImplementedError
+
+    def window_titles(self) -> List[str]:
+        """Titles of visible windows (empty where there are none)"""
+        return []
+
+    def close(self):
+        """Release handles or helper processes"""
+
+
+class TasklistProvider(ProcessProvider):
+    """Runs tasklist for processes and PowerShell for window titles (the original method)"""
+
+    name = "tasklist"
+    executable_suffix = ".exe"
+
+    def processes(self) -> List[Tuple[int, str]]:
+        try:
+            result = subprocess.run(
+                ['tasklist', '/FO', 'CSV', '/NH'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+        except subprocess.TimeoutExpired:
+            raise Exception("Process detection timed out")
         if result.returncode != 0:
             raise Exception("Failed to get process list")
-        
+        return parse_tasklist_csv(result.stdout)
+
+    def window_titles(self) -> List[str]:
+        try:
+            # Use PowerShell to get window titles
+            ps_command = """
+            Get-Process | Where-Object {$_.MainWindowTitle -ne ""} |
+            Select-Object -ExpandProperty MainWindowTitle
+            """
+
+            result = subprocess.run(
+                ['powershell', '-Command', ps_command],
+                capture_output=True,
+                text=True,
+                timeout=3
+            )
+
+            if result.returncode == 0:
+                return [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
+            return []
+        except Exception:
+            return []
+
+
+class ToolhelpProvider(ProcessProvider):
+    """
+    Windows processes through the Toolhelp snapshot API and window titles
+    through EnumWindows, both called in-process with ctypes: a sample costs
+    a few system calls instead of starting tasklist and PowerShell.
+    """
+
+    name = "toolhelp"
+    executable_suffix = ".exe"
+
+    TH32CS_SNAPPROCESS = 0x00000002
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESSENTRY32W(ctypes.Structure):
+            _fields_ = [
+                ("dwSize", wintypes.DWORD),
+                ("cntUsage", wintypes.DWORD),
+                ("th32ProcessID", wintypes.DWORD),
+                ("th32DefaultHeapID", ctypes.c_size_t),
+                ("th32ModuleID", wintypes.DWORD),
+                ("cntThreads", wintypes.DWORD),
+                ("th32ParentProcessID", wintypes.DWORD),
+                ("pcPriClassBase", ctypes.c_long),
+                ("dwFlags", wintypes.DWORD),
+                ("szExeFile", ctypes.c_wchar * 260),
+            ]
+
+        self._ctypes = ctypes
+        self._kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self._user32 = ctypes.WinDLL('user32', use_last_error=True)
+        self._kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+        self._kernel32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+        self._kernel32.Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        self._kernel32.Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+        self._kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._invalid_handle = wintypes.HANDLE(-1).value
+
+        # One entry buffer, reused by every snapshot walk
+        self._entry = PROCESSENTRY32W()
+        self._entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        self._entry_ref = ctypes.byref(self._entry)
+
+        self._title_buffer = ctypes.create_unicode_buffer(512)
+        self._titles = []
+        self._enum_callback = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)(self._on_window)
+
+    def processes(self) -> List[Tuple[int, str]]:
+        kernel32 = self._kernel32
+        snapshot = kernel32.CreateToolhelp32Snapshot(self.TH32CS_SNAPPROCESS, 0)
+        if snapshot is None or snapshot == self._invalid_handle:
+            raise Exception(f"Failed to get process list (error {self._ctypes.get_last_error()})")
+        try:
+            processes = []
+            entry = self._entry
+            more = kernel32.Process32FirstW(snapshot, self._entry_ref)
+            while more:
+                processes.append((entry.th32ProcessID, entry.szExeFile))
+                more = kernel32.Process32NextW(snapshot, self._entry_ref)
+            return processes
+        finally:
+            kernel32.CloseHandle(snapshot)
+
+    def _on_window(self, hwnd, lparam) -> bool:
+        """EnumWindows callback: collect the title of a visible window"""
+        user32 = self._user32
+        if user32.IsWindowVisible(hwnd) and user32.GetWindowTextLengthW(hwnd):
+            length = user32.GetWindowTextW(hwnd, self._title_buffer, len(self._title_buffer))
+            if length:
+                self._titles.append(self._title_buffer.value)
+        return True
+
+    def window_titles(self) -> List[str]:
+        self._titles = []
+        self._user32.EnumWindows(self._enum_callback, 0)
+        return self._titles
+
+
+class ProcFSProvider(ProcessProvider):
+    """Linux processes read from /proc/<pid>/stat (kernel threads skipped)"""
+
+    name = "proc"
+
+    PF_KTHREAD = 0x00200000
+
+    def __init__(self, root: str = "/proc"):
+        """
+        Args:
+            root: Mount point of procfs
+        """
+        self.root = root
+
+    def processes(self) -> List[Tuple[int, str]]:
         processes = []
-        lines = result.stdout.strip().split('\n')
-        
-        for line in lines:
-            if not line.strip():
+        for entry in os.listdir(self.root):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"{self.root}/{entry}/stat", 'rb') as f:
+                    stat = f.read()
+            except OSError:
+                continue  # exited since listdir
+            # "pid (comm) state ppid ..." - comm may itself contain spaces or ")"
+            start = stat.find(b"(")
+            end = stat.rfind(b")")
+            fields = stat[end + 2:].split()
+            if len(fields) > 6 and int(fields[6]) & self.PF_KTHREAD:
                 continue
-            
-            # Parse CSV format: "Image Name","PID","Session Name","Session#","Mem Usage"
-            parts = line.split('","')
-            if len(parts) >= 1:
-                process_name = parts[0].strip('"').lower()
-                
-                # Skip excluded system processes
-                if process_name in excluded_processes:
+            processes.append((int(entry), stat[start + 1:end].decode('utf-8', 'replace')))
+        return processes
+
+
+def create_provider(kind: str = "auto") -> ProcessProvider:
+    """
+    Create a process provider by name.
+
+    Args:
+        kind: One of PROVIDERS; "auto" picks toolhelp on Windows (tasklist
+              if ctypes can't load it) and proc on Linux
+
+    Returns:
+        ProcessProvider instance
+    """
+    system = platform.system()
+    if kind == "auto":
+        if system == 'Windows':
+            try:
+                return ToolhelpProvider()
+            except (AttributeError, OSError) as e:
+                print(f"[WARNING] Toolhelp API unavailable ({e}), falling back to tasklist")
+                return TasklistProvider()
+        if system == 'Linux':
+            return ProcFSProvider()
+        raise NotImplementedError(f"Software detection is not supported on {system}")
+    if kind == "toolhelp":
+        return ToolhelpProvider()
+    if kind == "tasklist":
+        return TasklistProvider()
+    if kind == "proc":
+        return ProcFSProvider()
+    raise ValueError(f"Unknown process provider: {kind}")
+
+
+class SoftwareDetector:
+    """
+    Turns a provider's process list into app names, incrementally.
+
+    Processes are cached by PID with the app they were classified as, and
+    each app counts the processes that run it. A sample only classifies
+    PIDs it hasn't seen and releases the ones that are gone, so the work
+    beyond listing the processes follows process churn, not process count,
+    and the apps only change when a count reaches or leaves zero.
+
+    Window titles are only supplementary (they catch apps whose executable
+    name says little), so they are re-read at most every title_interval
+    seconds, and the app names found in each distinct title are cached.
+    """
+
+    def __init__(self, provider: Optional[ProcessProvider] = None, title_interval: float = 60.0,
+                 rules: Union[AppRules, RulesFile, None] = None):
+        """
+        Args:
+            provider: Process source (default: create_provider("auto"))
+            title_interval: Seconds to reuse window titles for (0 = read every time)
+            rules: Classification rules, or a RulesFile to follow as it
+                   changes (default: the built-in rules)
+        """
+        self.provider = provider or create_provider()
+        self.title_interval = title_interval
+        self.rules = rules or AppRules()
+        self._rules = self.rules.current() if isinstance(self.rules, RulesFile) else self.rules
+        self._titles = []
+        self._titles_read_at = None
+        self._title_matches = {}  # window title -> app names found in it
+        self._app_names = {}      # executable name -> app name, or None if filtered out
+        self._pids = {}           # pid -> (executable name, app name or None)
+        self._process_apps = {}   # app name -> number of processes running it
+        self.apps = set()         # app names detected by the last sample
+
+    def _app_name(self, process_name: str) -> Optional[str]:
+        """Map an executable name to a formatted app name (None for system processes)"""
+        return self._rules.classify(process_name, self.provider.executable_suffix)
+
+    def window_titles(self) -> List[str]:
+        """Window titles, re-read from the provider once title_interval has passed"""
+        now = time.monotonic()
+        if self._titles_read_at is None or now - self._titles_read_at >= self.title_interval:
+            try:
+                self._titles = self.provider.window_titles()
+            except Exception:
+                self._titles = []  # Window title detection is optional
+            self._titles_read_at = now
+        return self._titles
+
+    def _apps_in_title(self, title: str) -> List[str]:
+        """Known app names mentioned in a window title"""
+        apps = self._title_matches.get(title)
+        if apps is None:
+            apps = self._rules.apps_in_title(title)
+            if len(self._title_matches) >= 1024:
+                self._title_matches.clear()
+            self._title_matches[title] = apps
+        return apps
+
+    def _classify(self, process_name: str) -> Optional[str]:
+        """App name of an executable, cached by name"""
+        app_names = self._app_names
+        if process_name in app_names:
+            return app_names[process_name]
+        if len(app_names) >= 4096:
+            app_names.clear()
+        app = app_names[process_name] = self._app_name(process_name)
+        return app
+
+    def sample(self) -> Tuple[List[str], List[str]]:
+        """
+        Take a detection sample and update self.apps.
+
+        Returns:
+            (added, removed): sorted app names that started and stopped
+            since the previous sample (everything is "added" on the first)
+        """
+        if isinstance(self.rules, RulesFile):
+            rules = self.rules.current()
+            if rules is not self._rules:
+                self._use_rules(rules)
+        pids = self._pids
+        counts = self._process_apps
+
+        current = {}
+        for pid, process_name in self.provider.processes():
+            cached = pids.get(pid)
+            if cached is not None:
+                if cached[0] == process_name:
+                    current[pid] = cached
                     continue
-                
-                # Remove .exe extension and add to list
-                if process_name.endswith('.exe'):
-                    app_name = process_name[:-4]
-                    
-                    # Only include if it's a known app or looks like user software
-                    # (not a random system process)
-                    if (app_name in gaming_apps or 
-                        len(app_name) > 2 and 
-                        not app_name.startswith('dll') and
-                        not app_name.startswith('ms')):
-                        # Format nicely (capitalize first letter)
-                        formatted_name = app_name.capitalize().replace('_', ' ')
-                        if formatted_name not in processes:
-                            processes.append(formatted_name)
-        
-        # Also try to get window titles for better detection
-        try:
-            window_titles = get_window_titles()
-            for title in window_titles:
-                # Extract app name from window title
-                for app in gaming_apps:
-                    if app in title.lower():
-                        formatted = app.capitalize().replace('_', ' ')
-                        if formatted not in processes:
-                            processes.append(formatted)
-        except:
-            pass  # Window title detection is optional
-        
-        return sorted(processes) if processes else []
-        
-    except subprocess.TimeoutExpired:
-        raise Exception("Process detection timed out")
+                # PID reused by another executable
+                self._release(cached[1])
+            app = self._classify(process_name)
+            current[pid] = (process_name, app)
+            if app is not None:
+                counts[app] = counts.get(app, 0) + 1
+
+        for pid in pids.keys() - current.keys():
+            self._release(pids[pid][1])
+        self._pids = current
+
+        title_apps = set()
+        for title in self.window_titles():
+            title_apps.update(self._apps_in_title(title))
+
+        # An app counts while any process or window title shows it
+        previous = self.apps
+        self.apps = counts.keys() | title_apps
+        return sorted(self.apps - previous), sorted(previous - self.apps)
+
+    def _use_rules(self, rules: AppRules):
+        """Switch to new rules; every process is classified again on this sample"""
+        self._rules = rules
+        self._app_names = {}
+        self._title_matches = {}
+        self._pids = {}
+        self._process_apps = {}
+
+    def _release(self, app: Optional[str]):
+        """Drop one process of an app from the counts"""
+        if app is None:
+            return
+        count = self._process_apps[app] - 1
+        if count:
+            self._process_apps[app] = count
+        else:
+            del self._process_apps[app]
+
+    def detect(self) -> List[str]:
+        """
+        Detect running software.
+
+        Returns:
+            Sorted list of software/application names
+        """
+        self.sample()
+        return sorted(self.apps)
+
+    def close(self):
+        """Release the provider"""
+        self.provider.close()
+
+
+_default_detector = None
+
+
+def get_running_software() -> List[str]:
+    """
+    Detect running software/processes.
+    Filters out system processes and focuses on user applications.
+    Uses one shared SoftwareDetector, so the provider is set up once per process.
+
+    Returns:
+        List of software/application names
+    """
+    global _default_detector
+    try:
+        if _default_detector is None:
+            _default_detector = SoftwareDetector()
+        return _default_detector.detect()
+    except NotImplementedError:
+        raise
     except Exception as e:
         raise Exception(f"Error detecting software: {e}")
 
@@ -119,32 +438,15 @@ def get_window_titles() -> List[str]:
     """
     Get titles of visible windows (Windows only).
     This helps identify running applications.
-    
+
     Returns:
         List of window titles
     """
     if platform.system() != 'Windows':
         return []
-    
     try:
-        # Use PowerShell to get window titles
-        ps_command = """
-        Get-Process | Where-Object {$_.MainWindowTitle -ne ""} | 
-        Select-Object -ExpandProperty MainWindowTitle
-        """
-        
-        result = subprocess.run(
-            ['powershell', '-Command', ps_command],
-            capture_output=True,
-            text=True,
-            timeout=3
-        )
-        
-        if result.returncode == 0:
-            titles = [line.strip() for line in result.stdout.strip().split('\n') if line.strip()]
-            return titles
-        return []
-    except:
+        return create_provider().window_titles()
+    except Exception:
         return []
 
 
@@ -159,4 +461,3 @@ if __name__ == "__main__":
             print(f"  - {app}")
     except Exception as e:
         print(f"Error: {e}")
-
@@ -0,0 +1,213 @@
+"""
+PC Change Feed
+Numbers every PCLogger update and pushes it to dashboards over
+Server-Sent Events or long-polling (GET /events).
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from pc_model import PCRecord
+
+# Event types: a PC seen for the first time, a status change, a software
+# change, or a heartbeat that only refreshed last_updated
+EVENT_TYPES = ("new", "status", "software", "heartbeat")
+
+
+class EventFeed:
+    """
+    Ring buffer of numbered PC change events.
+
+    Sequence numbers grow by one per update, so a consumer that reconnects
+    with the last number it saw gets exactly what it missed, as long as it
+    is still in the buffer; otherwise it is told to reload (reset).
+    """
+
+    def __init__(self, logger, backlog: int = 10000):
+        """
+        Initialize the feed and start listening to logger updates.
+
+        Args:
+            logger: PCLogger to listen to
+            backlog: Number of recent events kept for reconnecting consumers
+        """
+        self.seq = 0
+        self.closed = False
+        self._events = deque(maxlen=backlog)
+        self._condition = threading.Condition(threading.Lock())
+        self._wakeups = set()  # callbacks of asyncio waiters
+        logger.add_listener(self._on_change)
+
+    def _on_change(self, pc_name: str, previous: Optional[PCRecord], current: PCRecord):
+        """PCLogger listener: append an event and wake waiting consumers"""
+        if previous is None:
+            event_type = "new"
+        elif previous.status != current.status:
+            event_type = "status"
+        elif previous.apps != current.apps:
+            event_type = "software"
+        else:
+            event_type = "heartbeat"
+
+        with self._condition:
+            self.seq += 1
+            self._events.append({
+                "seq": self.seq,
+                "type": event_type,
+                "pc_name": pc_name,
+                "status": current.status,
+                "software": current.software,
+                "last_updated": current.last_updated,
+            })
+            self._condition.notify_all()
+            wakeups = list(self._wakeups)
+        for wakeup in wakeups:
+            wakeup()
+
+    def since(self, seq: int, types: Optional[Set[str]] = None) -> Tuple[List[Dict], bool, int]:
+        """
+        Get events after a sequence number.
+
+        Args:
+            seq: Last sequence number the consumer has seen (0 = none)
+            types: Only return these event types (default: all)
+
+        Returns:
+            Tuple of (events, reset, last_seq); reset is True when events after
+            seq were already dropped from the buffer (or the server restarted),
+            so the consumer should reload /logs. last_seq is the newest sequence
+            number when the events were taken, the one to pass next time
+        """
+        with self._condition:
+            first_seq = self._events[0]["seq"] if self._events else self.seq + 1
+            reset = seq > self.seq or (seq < first_seq - 1)
+            if reset:
+                seq = 0
+            # Sequence numbers are contiguous, so skip straight to the first new one
+            start = max(0, len(self._events) - (self.seq - seq))
+            events = [self._events[i] for i in range(start, len(self._events))]
+            last_seq = self.seq
+        if types:
+            events = [event for event in events if event["type"] in types]
+        return events, reset, last_seq
+
+    def wait(self, seq: int, timeout: float) -> None:
+        """Block until there are events after seq, the feed closes, or timeout passes"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.seq <= seq and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._condition.wait(remaining)
+
+    async def wait_async(self, seq: int, timeout: float) -> None:
+        """Like wait(), for the asyncio server: waits without blocking the loop"""
+        loop = asyncio.get_event_loop()
+        ready = asyncio.Event()
+
+        def wakeup():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+        with self._condition:
+            if self.seq > seq or self.closed:
+                return
+            self._wakeups.add(wakeup)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._wakeups.discard(wakeup)
+
+    def close(self):
+        """Wake every waiting consumer and end all streams"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            wakeups = list(self._wakeups)
+        for wakeup in wakeups:
+            wakeup()
+
+
+class EventStream:
+    """
+    Response body for GET /events.
+
+    Iterating yields the body in chunks. In "sse" mode it never ends on its
+    own: one chunk per batch of events, plus a comment every ping_interval
+    seconds so proxies keep the connection open. In "poll" mode it yields
+    a single JSON document once events arrive or timeout passes.
+    Supports both plain iteration (threaded servers) and async iteration
+    (asyncio server).
+    """
+
+    def __init__(self, feed: EventFeed, since: int = 0, types: Optional[Set[str]] = None,
+                 mode: str = "sse", timeout: float = 25.0, ping_interval: float = 15.0):
+        """
+        Initialize the stream.
+
+        Args:
+            feed: EventFeed to read from
+            since: Last sequence number the consumer has seen
+            types: Only send these event types (default: all)
+            mode: "sse" for Server-Sent Events, "poll" for one long-poll response
+            timeout: How long a long-poll waits for events (seconds)
+            ping_interval: Seconds between SSE keep-alive comments
+        """
+        self.feed = feed
+        self.seq = since
+        self.types = types
+        self.mode = mode
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+    def _poll_body(self) -> bytes:
+        """Build the long-poll JSON document for events after self.seq"""
+        events, reset, last_seq = self.feed.since(self.seq, self.types)
+        return json.dumps({"events": events, "last_seq": last_seq, "reset": reset}).encode()
+
+    def _sse_chunk(self) -> bytes:
+        """Format new events as SSE messages (a ping comment if there are none)"""
+        events, reset, self.seq = self.feed.since(self.seq, self.types)
+        lines = []
+        if reset:
+            lines.append(f"event: reset\ndata: {json.dumps({'last_seq': self.seq})}\n\n")
+        for event in events:
+            lines.append(f"id: {event['seq']}\nevent: pc\ndata: {json.dumps(event)}\n\n")
+        return "".join(lines).encode() if lines else b": ping\n\n"
+
+    def __iter__(self):
+        if self.mode == "poll":
+            self.feed.wait(self.seq, self.timeout)
+            yield self._poll_body()
+            return
+        yield b"retry: 3000\n\n"
+        while not self.feed.closed:
+            self.feed.wait(self.seq, self.ping_interval)
+            if self.feed.closed:
+                return
+            yield self._sse_chunk()
+
+    def __aiter__(self):
+        return self._iterate_async()
+
+    async def _iterate_async(self):
+        if self.mode == "poll":
+            await self.feed.wait_async(self.seq, self.timeout)
+            yield self._poll_body()
+            return
+        yield b"retry: 3000\n\n"
+        while not self.feed.closed:
+            await self.feed.wait_async(self.seq, self.ping_interval)
+            if self.feed.closed:
+                return
+            yield self._sse_chunk()
@@ -0,0 +1,144 @@
+"""
+Fleet Index
+Inverted indexes from status and from app to the PCs that match, kept up
+to date by PCLogger so "who is running X right now" never scans the fleet.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Set
+
+from pc_model import AppTable, PCRecord, iter_bits
+
+
+class FleetIndex:
+    """
+    status -> PC names and app ID -> names of running PCs.
+
+    Only running PCs are indexed under their apps: an offline PC keeps its
+    last software list in storage but isn't running any of it. Every
+    update touches just the sets of the apps that changed (the bits of
+    old XOR new), and a query costs O(matching PCs), not O(fleet).
+    Not thread-safe; PCLogger updates and queries it under its lock.
+    """
+
+    def __init__(self, table: AppTable):
+        """
+        Args:
+            table: App intern table the PC software bitsets refer to
+        """
+        self.table = table
+        self.by_status = {}  # status -> names of the PCs with it
+        self.by_app = {}     # app ID -> names of the running PCs that run it
+        # Bumped whenever a set changes; keep-alives that change nothing keep it
+        self.version = 0
+
+    @staticmethod
+    def _running_apps(status: Optional[str], apps: int) -> int:
+        """The apps a PC counts as running: its software while running, nothing otherwise"""
+        return apps if status == "running" else 0
+
+    def add(self, pc_name: str, record: PCRecord):
+        """Index a PC that isn't indexed yet (e.g. loaded from storage)"""
+        self.update(pc_name, None, 0, record.status, record.apps)
+
+    def update(self, pc_name: str, old_status: Optional[str], old_apps: int, status: str, apps: int):
+        """
+        Move a PC from its old entries to its new ones.
+
+        Args:
+            pc_name: Name/ID of the PC
+            old_status: Status before the update (None for a new PC)
+            old_apps: Software bitset before the update
+            status: Status after the update
+            apps: Software bitset after the update
+        """
+        if old_status != status:
+            self.version += 1
+            if old_status is not None:
+                pcs = self.by_status[old_status]
+                pcs.discard(pc_name)
+                if not pcs:
+                    del self.by_status[old_status]
+            self.by_status.setdefault(status, set()).add(pc_name)
+
+        old_running = self._running_apps(old_status, old_apps)
+        running = self._running_apps(status, apps)
+        changed = old_running ^ running
+        if changed:
+            self.version += 1
+        for app_id in iter_bits(changed & old_running):
+            pcs = self.by_app[app_id]
+            pcs.discard(pc_name)
+            if not pcs:
+                del self.by_app[app_id]
+        for app_id in iter_bits(changed & running):
+            self.by_app.setdefault(app_id, set()).add(pc_name)
+
+    def pcs_with_status(self, status: str) -> Set[str]:
+        """Names of the PCs with a status (a live set; copy before releasing the lock)"""
+        return self.by_status.get(status, set())
+
+    def pcs_running_app(self, app: str) -> Set[str]:
+        """
+        Names of the running PCs that run an app.
+
+        Args:
+            app: App name, matched ignoring case; every spelling of it counts
+
+        Returns:
+            A new set of PC names
+        """
+        pcs = set()
+        for app_id in self.table.lookup(app):
+            pcs |= self.by_app.get(app_id, set())
+        return pcs
+
+    def query(self, status: Optional[str] = None, app: Optional[str] = None) -> List[str]:
+        """
+        Find PCs by status and/or running app.
+
+        Args:
+            status: Only PCs with this status
+            app: Only PCs running this app (see pcs_running_app)
+
+        Returns:
+            Sorted PC names; every PC when neither filter is given
+        """
+        if app is not None:
+            pcs = self.pcs_running_app(app)
+            if status is not None and status != "running":
+                # Only running PCs run apps
+                pcs = set()
+        elif status is not None:
+            pcs = self.pcs_with_status(status)
+        else:
+            pcs = set().union(*self.by_status.values())
+        return sorted(pcs)
+
+    def app_counts(self) -> Dict[str, int]:
+        """Number of running PCs per app that at least one PC runs"""
+        return {self.table.names[app_id]: len(pcs) for app_id, pcs in self.by_app.items()}
+
+    def stats(self, top: int = 10) -> Dict:
+        """
+        Fleet aggregates read off the set sizes, O(apps in use), not O(fleet).
+
+        Args:
+            top: Number of most-used apps to list
+
+        Returns:
+            {"pcs", "running", "offline", "statuses", "apps", "top_apps"} where
+            "apps" maps app name -> running PCs and "top_apps" is a list of
+            {"app", "pcs"}, most used first (ties by name)
+        """
+        statuses = {status: len(pcs) for status, pcs in self.by_status.items()}
+        apps = self.app_counts()
+        top_apps = heapq.nsmallest(top, apps.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            "pcs": sum(statuses.values()),
+            "running": statuses.get("running", 0),
+            "offline": statuses.get("offline", 0),
+            "statuses": statuses,
+            "apps": apps,
+            "top_apps": [{"app": app, "pcs": count} for app, count in top_apps],
+        }
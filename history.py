@@ -0,0 +1,251 @@
+"""
+PC and Software Session History
+Records when PCs were up and when apps were running as sessions in SQLite,
+so questions like "how long was CS2 running on PC-07 yesterday" can be
+answered without keeping every heartbeat.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from pc_model import PCRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pc_sessions (
+    id INTEGER PRIMARY KEY,
+    pc TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL
+);
+CREATE TABLE IF NOT EXISTS app_sessions (
+    id INTEGER PRIMARY KEY,
+    pc TEXT NOT NULL,
+    app TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL
+);
+CREATE INDEX IF NOT EXISTS pc_sessions_pc_ended ON pc_sessions (pc, ended);
+CREATE INDEX IF NOT EXISTS pc_sessions_ended ON pc_sessions (ended);
+CREATE INDEX IF NOT EXISTS app_sessions_pc_ended ON app_sessions (pc, ended);
+CREATE INDEX IF NOT EXISTS app_sessions_app_ended ON app_sessions (app, ended);
+CREATE INDEX IF NOT EXISTS app_sessions_ended ON app_sessions (ended);
+"""
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_time(value: Union[str, float, int, None]) -> Optional[float]:
+    """
+    Parse a query time into epoch seconds.
+
+    Args:
+        value: Epoch seconds, "YYYY-MM-DD", "YYYY-MM-DD HH:MM:SS" or None
+
+    Returns:
+        Epoch seconds, or None if value is None/empty
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in (TIME_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return time.mktime(datetime.strptime(value, fmt).timetuple())
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time: {value}")
+
+
+def format_time(epoch: Optional[float]) -> Optional[str]:
+    """Format epoch seconds like PCLogger timestamps (None stays None)"""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch).strftime(TIME_FORMAT)
+
+
+class HistoryStore:
+    """
+    Session history of PC uptime and app usage.
+
+    Listens to PCLogger updates and only writes on transitions: a PC going
+    running/offline opens/closes a PC session, an app appearing/disappearing
+    from a running PC's software list opens/closes an app session. Open
+    sessions have ended = NULL.
+    """
+
+    def __init__(self, db_file: str = "pc_history.db"):
+        """
+        Open (or create) the history database.
+
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+        # Open sessions, carried over from the last run: pc -> row id, pc -> {app: row id}
+        self._open_pcs = {}
+        self._open_apps = {}
+        for row_id, pc in self._db.execute("SELECT id, pc FROM pc_sessions WHERE ended IS NULL"):
+            self._open_pcs[pc] = row_id
+        for row_id, pc, app in self._db.execute("SELECT id, pc, app FROM app_sessions WHERE ended IS NULL"):
+            self._open_apps.setdefault(pc, {})[app] = row_id
+
+    def attach(self, logger):
+        """
+        Start recording updates from a PCLogger.
+
+        Args:
+            logger: PCLogger instance to listen to
+        """
+        logger.add_listener(self.record_change)
+
+    def record_change(self, pc_name: str, previous: Optional[PCRecord], current: PCRecord,
+                      now: Optional[float] = None):
+        """
+        PCLogger listener: open/close sessions for what changed.
+
+        Args:
+            pc_name: Name/ID of the PC
+            previous: PC record before the update (None for a new PC)
+            current: PC record after the update
+            now: Time of the change in epoch seconds (default: the record's
+                 update time, which is when a replayed heartbeat was taken)
+        """
+        running = current.status == "running"
+        if (previous is not None and previous.status == current.status and
+                previous.apps == current.apps and
+                running == (pc_name in self._open_pcs)):
+            # Plain heartbeat, nothing started or stopped
+            return
+
+        now = (current.updated or time.time()) if now is None else now
+        wanted_apps = set(current.software) if running else set()
+        with self._lock:
+            open_apps = self._open_apps.setdefault(pc_name, {})
+
+            if running and pc_name not in self._open_pcs:
+                cursor = self._db.execute(
+                    "INSERT INTO pc_sessions (pc, started) VALUES (?, ?)", (pc_name, now))
+                self._open_pcs[pc_name] = cursor.lastrowid
+            elif not running and pc_name in self._open_pcs:
+                self._db.execute("UPDATE pc_sessions SET ended = ? WHERE id = ?",
+                                 (now, self._open_pcs.pop(pc_name)))
+
+            for app in [app for app in open_apps if app not in wanted_apps]:
+                self._db.execute("UPDATE app_sessions SET ended = ? WHERE id = ?",
+                                 (now, open_apps.pop(app)))
+            for app in wanted_apps:
+                if app not in open_apps:
+                    cursor = self._db.execute(
+                        "INSERT INTO app_sessions (pc, app, started) VALUES (?, ?, ?)", (pc_name, app, now))
+                    open_apps[app] = cursor.lastrowid
+
+            self._db.commit()
+
+    def _query(self, table: str, filters: Dict[str, str], since: Optional[float],
+               until: Optional[float]) -> List[tuple]:
+        """Select sessions of table that overlap [since, until]"""
+        columns = "pc, app, started, ended" if table == "app_sessions" else "pc, NULL, started, ended"
+        where = ""
+        params = []
+        for column, value in filters.items():
+            if value is not None:
+                where += f" AND {column} = ?"
+                params.append(value)
+        if until is not None:
+            where += " AND started < ?"
+            params.append(until)
+
+        # Closed sessions are found by a range scan on the (..., ended) indexes,
+        # open ones separately; an OR of both would defeat the index
+        closed = f"SELECT {columns} FROM {table} WHERE ended > ?{where}"
+        still_open = f"SELECT {columns} FROM {table} WHERE ended IS NULL{where}"
+        sql = f"{closed} UNION ALL {still_open} ORDER BY started"
+        since_param = since if since is not None else float('-inf')
+        with self._lock:
+            return self._db.execute(sql, [since_param] + params + params).fetchall()
+
+    def _sessions(self, rows: List[tuple], since: Optional[float], until: Optional[float]) -> List[Dict]:
+        """Turn rows into session dictionaries, with durations clipped to [since, until]"""
+        now = time.time()
+        sessions = []
+        for pc, app, started, ended in rows:
+            start = max(started, since) if since is not None else started
+            end = ended if ended is not None else now
+            if until is not None:
+                end = min(end, until)
+            session = {"pc": pc}
+            if app is not None:
+                session["app"] = app
+            session["started"] = format_time(started)
+            session["ended"] = format_time(ended)
+            session["seconds"] = round(max(0.0, end - start), 1)
+            sessions.append(session)
+        return sessions
+
+    def pc_sessions(self, pc_name: Optional[str] = None, since=None, until=None) -> List[Dict]:
+        """
+        Get PC uptime sessions overlapping a time range.
+
+        Args:
+            pc_name: Only sessions of this PC (default: all PCs)
+            since: Range start (epoch seconds or "YYYY-MM-DD[ HH:MM:SS]")
+            until: Range end (same formats)
+
+        Returns:
+            List of {"pc", "started", "ended", "seconds"} dictionaries; "ended"
+            is None for a PC that is still up and "seconds" counts only the
+            part inside the range
+        """
+        since, until = parse_time(since), parse_time(until)
+        return self._sessions(self._query("pc_sessions", {"pc": pc_name}, since, until), since, until)
+
+    def app_sessions(self, app: Optional[str] = None, pc_name: Optional[str] = None,
+                     since=None, until=None) -> List[Dict]:
+        """
+        Get app usage sessions overlapping a time range.
+
+        Args:
+            app: Only sessions of this app (default: all apps)
+            pc_name: Only sessions on this PC (default: all PCs)
+            since: Range start (epoch seconds or "YYYY-MM-DD[ HH:MM:SS]")
+            until: Range end (same formats)
+
+        Returns:
+            List of {"pc", "app", "started", "ended", "seconds"} dictionaries
+        """
+        since, until = parse_time(since), parse_time(until)
+        rows = self._query("app_sessions", {"app": app, "pc": pc_name}, since, until)
+        return self._sessions(rows, since, until)
+
+    def app_usage(self, app: str, pc_name: Optional[str] = None, since=None, until=None) -> float:
+        """
+        Total time an app was running inside a time range.
+
+        Args:
+            app: App name as logged (e.g. "Counter-Strike 2")
+            pc_name: Only count this PC (default: summed over all PCs)
+            since: Range start
+            until: Range end
+
+        Returns:
+            Seconds of usage
+        """
+        return round(sum(s["seconds"] for s in self.app_sessions(app, pc_name, since, until)), 1)
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,167 @@
+"""
+Append-only journal storage for PCLogger
+Each update is appended as one compact JSON line; the journal is folded
+into the regular pc_logs.json snapshot in the background.
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, List
+
+
+class LogJournal:
+    """
+    Write-ahead journal next to a JSON snapshot file.
+
+    Layout on disk:
+        pc_logs.json          - last compacted snapshot (same format as before)
+        pc_logs.json.journal  - one record per line, appended on every update
+        pc_logs.json.journal.old - journal being compacted (only while compacting)
+
+    Every record holds the full state of one PC, so replaying is
+    "last record wins" and replaying a record twice is harmless.
+    """
+
+    def __init__(self, snapshot_file: str, compact_every: int = 1000):
+        """
+        Initialize the journal.
+
+        Args:
+            snapshot_file: Path to the JSON snapshot (the normal log file)
+            compact_every: Number of appended records before a background compaction starts
+        """
+        self.snapshot_file = snapshot_file
+        self.journal_file = snapshot_file + ".journal"
+        self.old_journal_file = self.journal_file + ".old"
+        self.compact_every = compact_every
+        self.records_since_compact = 0
+        self.bytes_written = 0  # journal and snapshot bytes written, for benchmarks
+        self._file = None
+        self._compact_thread = None
+
+    def load(self, empty_structure: Callable[[], Dict]) -> Dict:
+        """
+        Load the snapshot and replay any journal records on top of it.
+
+        Args:
+            empty_structure: Factory for an empty log structure
+
+        Returns:
+            Dictionary containing all logged data
+        """
+        logs = empty_structure()
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r') as f:
+                    logs = json.load(f)
+            except json.JSONDecodeError:
+                # Snapshots are written atomically, so keep a damaged file for inspection
+                backup = self.snapshot_file + ".corrupt"
+                os.replace(self.snapshot_file, backup)
+                print(f"[WARNING] {self.snapshot_file} is corrupted, moved to {backup}; "
+                      f"rebuilding from the journal")
+                logs = empty_structure()
+
+        for path in (self.old_journal_file, self.journal_file):
+            self.records_since_compact += self._replay(path, logs)
+
+        if os.path.exists(self.old_journal_file):
+            # A previous compaction did not finish; finish it now so the
+            # next rotation cannot overwrite records that only live there
+            self._write_snapshot(logs)
+        return logs
+
+    def _replay(self, path: str, logs: Dict) -> int:
+        """
+        Apply the records of one journal file to logs.
+
+        Returns:
+            Number of records applied
+        """
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves a partial last line
+                    continue
+                pc_name = record.pop("pc", None)
+                if pc_name is None:
+                    continue
+                logs["pcs"][pc_name] = record
+                applied += 1
+        return applied
+
+    def append(self, records: List[Dict]):
+        """
+        Append records to the journal.
+
+        Args:
+            records: List of {"pc": name, "status": ..., "software": [...], "last_updated": ...}
+        """
+        if self._file is None:
+            self._file = open(self.journal_file, 'a', encoding='utf-8')
+        text = "".join(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        self._file.write(text)
+        self._file.flush()
+        self.bytes_written += len(text.encode('utf-8'))
+        self.records_since_compact += len(records)
+
+    def needs_compaction(self) -> bool:
+        """Check if enough records were appended and no compaction is running"""
+        return (self.records_since_compact >= self.compact_every and
+                not self.is_compacting())
+
+    def is_compacting(self) -> bool:
+        """Check if a background compaction is in progress"""
+        return self._compact_thread is not None and self._compact_thread.is_alive()
+
+    def start_compaction(self, snapshot: Dict, background: bool = True):
+        """
+        Rotate the journal and write snapshot to the snapshot file.
+
+        Must be called from the thread that appends (PCLogger holds its
+        flush lock), with a snapshot that already includes every appended
+        record. Records appended after this call go to a fresh journal file.
+
+        Args:
+            snapshot: Copy of the logs to write
+            background: Write the snapshot on a background thread
+        """
+        if self.is_compacting():
+            self._compact_thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.old_journal_file)
+        self.records_since_compact = 0
+
+        if background:
+            self._compact_thread = threading.Thread(
+                target=self._write_snapshot, args=(snapshot,), daemon=True)
+            self._compact_thread.start()
+        else:
+            self._write_snapshot(snapshot)
+
+    def _write_snapshot(self, snapshot: Dict):
+        """Write snapshot atomically, then drop the rotated journal"""
+        tmp_file = self.snapshot_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        self.bytes_written += os.path.getsize(tmp_file)
+        os.replace(tmp_file, self.snapshot_file)
+        if os.path.exists(self.old_journal_file):
+            os.remove(self.old_journal_file)
+
+    def close(self):
+        """Wait for a running compaction and close the journal file"""
+        if self.is_compacting():
+            self._compact_thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
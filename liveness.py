@@ -0,0 +1,206 @@
+"""
+Heartbeat Liveness Monitor
+Marks PCs offline on the server when their heartbeats stop, so a power cut
+or crash doesn't leave a PC "running" forever.
+"""
+
+import math
+import threading
+import time
+from typing import List, Optional
+
+from log_writer import ERROR, INFO
+from pc_model import PCRecord
+
+# One slot per second; deadlines further out than this wrap around and
+# are checked again on a later turn of the wheel
+WHEEL_SLOTS = 512
+
+
+class HeartbeatMonitor:
+    """
+    Per-PC heartbeat deadlines kept in a hashed timer wheel.
+
+    A heartbeat only moves the PC's deadline forward in a dict; the PC
+    stays in the wheel slot of its older deadline and is moved when that
+    slot comes up. So each heartbeat costs O(1), each tick only looks at
+    the PCs due in the seconds that passed, and the PC table is never scanned.
+    """
+
+    def __init__(self, logger, missed_intervals: int = 3, default_interval: float = 30.0,
+                 tick: float = 1.0):
+        """
+        Initialize the monitor and start listening to logger updates.
+
+        Args:
+            logger: PCLogger whose PCs are watched
+            missed_intervals: Mark a PC offline after this many heartbeat
+                              intervals without a heartbeat
+            default_interval: Heartbeat interval of PCs that don't advertise one (seconds)
+            tick: How often expired deadlines are checked (seconds)
+        """
+        self.logger = logger
+        self.missed_intervals = missed_intervals
+        self.default_interval = default_interval
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._wheel = [set() for _ in range(WHEEL_SLOTS)]
+        self._deadlines = {}  # pc_name -> epoch seconds its next heartbeat is due by
+        self._scheduled = {}  # pc_name -> wheel second the PC currently sits in
+        self._intervals = {}  # pc_name -> interval advertised by the client
+        self._last_tick = int(time.time())
+        self._stop = threading.Event()
+        self._thread = None
+
+        now = time.time()
+        with logger.lock:
+            # PCs left running by the last server run get a full grace period
+            for pc_name, record in logger.pcs.items():
+                if record.status == "running":
+                    self._schedule(pc_name, now + self._timeout(pc_name))
+            logger.add_listener(self._on_change)
+
+    def _timeout(self, pc_name: str) -> float:
+        """Seconds without a heartbeat after which a PC counts as offline"""
+        return self.missed_intervals * self._intervals.get(pc_name, self.default_interval)
+
+    @staticmethod
+    def check_interval(interval) -> float:
+        """
+        Check an advertised heartbeat interval.
+
+        Returns:
+            The interval in seconds
+
+        Raises:
+            ValueError: If it isn't a number of seconds between 0 and a day
+        """
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) or not 0 < interval <= 86400:
+            raise ValueError(f"Invalid heartbeat interval: {interval!r}")
+        return float(interval)
+
+    def set_interval(self, pc_name: str, interval: float):
+        """
+        Record the heartbeat interval a client advertised, once its heartbeat
+        was accepted. A watched PC's deadline is recomputed from now, since
+        the heartbeat just scheduled it with the interval known before.
+
+        Args:
+            pc_name: Name/ID of the PC
+            interval: Seconds between the client's heartbeats
+
+        Raises:
+            ValueError: If the interval is invalid (see check_interval)
+        """
+        interval = self.check_interval(interval)
+        with self._lock:
+            if self._intervals.get(pc_name) == interval:
+                return
+            self._intervals[pc_name] = interval
+            if pc_name in self._deadlines:
+                self._schedule(pc_name, time.time() + self._timeout(pc_name))
+
+    def _schedule(self, pc_name: str, deadline: float):
+        """Set a PC's deadline; caller holds self._lock or runs before the thread starts"""
+        self._deadlines[pc_name] = deadline
+        second = int(math.ceil(deadline))
+        scheduled = self._scheduled.get(pc_name)
+        if scheduled is not None and scheduled <= second:
+            # Already in an earlier slot; it is moved when that slot comes up
+            return
+        if scheduled is not None:
+            self._wheel[scheduled % WHEEL_SLOTS].discard(pc_name)
+        self._wheel[second % WHEEL_SLOTS].add(pc_name)
+        self._scheduled[pc_name] = second
+
+    def _unschedule(self, pc_name: str):
+        """Stop watching a PC; caller holds self._lock"""
+        self._deadlines.pop(pc_name, None)
+        scheduled = self._scheduled.pop(pc_name, None)
+        if scheduled is not None:
+            self._wheel[scheduled % WHEEL_SLOTS].discard(pc_name)
+
+    def _on_change(self, pc_name: str, previous: Optional[PCRecord], current: PCRecord):
+        """PCLogger listener: every update of a running PC counts as a heartbeat"""
+        with self._lock:
+            if current.status == "running":
+                self._schedule(pc_name, time.time() + self._timeout(pc_name))
+            else:
+                self._unschedule(pc_name)
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """
+        Collect PCs whose deadline passed, advancing the wheel to now.
+
+        Args:
+            now: Current time in epoch seconds (default: now)
+
+        Returns:
+            Names of the PCs that missed their deadline
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            current_second = int(now)
+            # After a long stall one full turn visits every slot
+            first = max(self._last_tick + 1, current_second - WHEEL_SLOTS + 1)
+            for second in range(first, current_second + 1):
+                slot = self._wheel[second % WHEEL_SLOTS]
+                for pc_name in [name for name in slot if self._scheduled[name] <= second]:
+                    slot.discard(pc_name)
+                    del self._scheduled[pc_name]
+                    deadline = self._deadlines[pc_name]
+                    if deadline <= now:
+                        del self._deadlines[pc_name]
+                        expired.append(pc_name)
+                    else:
+                        # Heartbeats moved the deadline on since it was slotted
+                        self._schedule(pc_name, deadline)
+            self._last_tick = max(self._last_tick, current_second)
+        return expired
+
+    def check(self, now: Optional[float] = None) -> List[str]:
+        """
+        Mark every PC that missed its deadline as offline.
+
+        Returns:
+            Names of the PCs marked offline
+        """
+        now = time.time() if now is None else now
+        marked = []
+        for pc_name in self.expire(now):
+            # A heartbeat may have landed since expire() let go of the lock;
+            # mark_offline checks the PC's last update again under logger.lock
+            if self.logger.mark_offline(pc_name, now - self._timeout(pc_name)):
+                self._report(INFO, "[INFO] %s missed %s heartbeats, marked offline", pc_name, self.missed_intervals)
+                marked.append(pc_name)
+        return marked
+
+    def _report(self, level: int, message: str, *args):
+        """Queue a line on the logger's log writer (never sampled), or print it"""
+        log_writer = self.logger.log_writer
+        if log_writer is not None:
+            log_writer.log(level, message, *args)
+        else:
+            print(message % args)
+
+    def _run(self):
+        """Background thread: check deadlines every tick until stopped"""
+        while not self._stop.wait(self.tick):
+            try:
+                self.check()
+            except Exception as e:
+                self._report(ERROR, "[ERROR] Heartbeat check failed: %s", e)
+
+    def start(self):
+        """Start the background checking thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="heartbeat-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background checking thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,223 @@
+"""
+Load Generator - Simulates a fleet of PCs against a logging server
+Each virtual PC is a LoggingClient sending heartbeats on its own schedule,
+with its software list changing now and then like a real gaming PC. Reports
+throughput, send latency, scheduling lag, CPU time and bytes written.
+"""
+
+import argparse
+import contextlib
+import heapq
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from client import LoggingClient
+from server import LoggingServer, SERVER_MODES
+from storage import STORAGE_TYPES
+
+# Software a virtual PC picks from
+APP_POOL = [
+    "Steam", "Discord", "Counter-Strike 2", "Spotify", "Chrome", "Obs64", "Valorant",
+    "Epicgameslauncher", "Battle.net", "Minecraft", "Roblox", "Fortnite", "Apex",
+    "Overwatch", "League of Legends", "Teamspeak", "Vlc", "Code", "Firefox", "Streamlabs",
+]
+
+
+class VirtualPC:
+    """One simulated PC: a LoggingClient and the software it is running"""
+
+    def __init__(self, name: str, server_url: str, apps: int, rng: random.Random, **client_options):
+        self.client = LoggingClient(server_url, pc_name=name, spool_dir=None, **client_options)
+        self.rng = rng
+        self.software = sorted(rng.sample(APP_POOL, min(apps, len(APP_POOL))))
+
+    def churn(self):
+        """Swap one running app for another"""
+        idle = [app for app in APP_POOL if app not in self.software]
+        if self.software and idle:
+            self.software.remove(self.rng.choice(self.software))
+            self.software.append(self.rng.choice(idle))
+            self.software.sort()
+
+
+def percentile(values: list, percent: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def drive(pcs: list, interval: float, deadline: float, churn: float, results: dict, lock: threading.Lock):
+    """
+    Send heartbeats for a group of virtual PCs until the deadline.
+
+    Each PC is due every interval seconds, starting at an even spread over
+    the first interval. A send that starts after its due time (the thread
+    was busy with others) counts toward the scheduling lag.
+    """
+    start = time.monotonic()
+    due = [(start + interval * i / len(pcs), i) for i in range(len(pcs))]
+    heapq.heapify(due)
+    latencies, lags, errors = [], [], 0
+    while due:
+        at, i = heapq.heappop(due)
+        if at >= deadline:
+            continue
+        delay = at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        pc = pcs[i]
+        if pc.rng.random() < churn:
+            pc.churn()
+        sent_at = time.monotonic()
+        if not pc.client.send_sample("running", list(pc.software)):
+            errors += 1
+        latencies.append(time.monotonic() - sent_at)
+        lags.append(max(0.0, sent_at - at))
+        heapq.heappush(due, (at + interval, i))
+    for pc in pcs:
+        pc.client.close()
+    with lock:
+        results["latencies"].extend(latencies)
+        results["lags"].extend(lags)
+        results["errors"] += errors
+
+
+def run_load(server_url: str, pcs: int, interval: float, duration: float, threads: int,
+             apps: int, churn: float, seed: int = 1, **client_options) -> dict:
+    """
+    Run the simulated fleet against a server.
+
+    Args:
+        server_url: Server to send to
+        pcs: Number of virtual PCs
+        interval: Seconds between heartbeats of one PC
+        duration: Seconds to run for
+        threads: Driver threads the PCs are spread over
+        apps: Apps each PC runs
+        churn: Chance that a PC's software changes before a heartbeat
+        seed: Random seed for the software lists
+        client_options: Passed on to every LoggingClient (delta, wire)
+
+    Returns:
+        Dictionary with requests, errors, seconds, latencies and lags (seconds)
+    """
+    rng = random.Random(seed)
+    fleet = [VirtualPC(f"LOAD-PC-{i:05d}", server_url, apps, random.Random(rng.random()),
+                       interval=interval, **client_options)
+             for i in range(pcs)]
+    threads = max(1, min(threads, pcs))
+    results = {"latencies": [], "lags": [], "errors": 0}
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+    workers = [threading.Thread(target=drive, args=(fleet[i::threads], interval, deadline, churn, results, lock))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results["seconds"] = time.monotonic() - started
+    results["requests"] = len(results["latencies"])
+    return results
+
+
+def print_report(results: dict, cpu_seconds: float, bytes_written, interval: float):
+    """Print the results of a run"""
+    seconds = results["seconds"]
+    latencies = results["latencies"]
+    late = sum(1 for lag in results["lags"] if lag > interval / 2)
+    print(f"Requests:      {results['requests']} in {seconds:.1f}s "
+          f"({results['requests'] / seconds if seconds else 0:.0f} req/s), {results['errors']} errors")
+    print(f"Latency:       p50={percentile(latencies, 50) * 1000:.2f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.2f}ms max={max(latencies, default=0) * 1000:.2f}ms")
+    print(f"Schedule lag:  p99={percentile(results['lags'], 99) * 1000:.2f}ms, "
+          f"{late} sends more than half an interval late")
+    print(f"CPU:           {cpu_seconds:.2f}s ({cpu_seconds / seconds * 100 if seconds else 0:.0f}% of one core)")
+    if bytes_written is None:
+        print("Bytes written: n/a (external server)")
+    else:
+        per_request = bytes_written / results["requests"] if results["requests"] else 0
+        print(f"Bytes written: {bytes_written:,} ({per_request:,.0f} per request)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='PC Logging load generator')
+    parser.add_argument('--pcs', type=int, default=200,
+                       help='Virtual PCs to simulate (default: 200)')
+    parser.add_argument('--interval', type=float, default=1.0,
+                       help='Seconds between heartbeats of each PC (default: 1.0)')
+    parser.add_argument('--duration', type=float, default=10.0,
+                       help='Seconds to run for (default: 10)')
+    parser.add_argument('--threads', type=int, default=16,
+                       help='Driver threads sending for the virtual PCs (default: 16)')
+    parser.add_argument('--apps', type=int, default=6,
+                       help='Apps each virtual PC runs (default: 6)')
+    parser.add_argument('--churn', type=float, default=0.1,
+                       help='Chance a PC\'s software changes before a heartbeat (default: 0.1)')
+    parser.add_argument('--wire', choices=['json', 'binary'], default='json',
+                       help='Heartbeat encoding (default: json)')
+    parser.add_argument('--no-delta', action='store_true',
+                       help='Send the full software list on every heartbeat')
+    parser.add_argument('--url',
+                       help='Send to a running server instead of starting one '
+                            '(CPU then only covers the load generator)')
+    parser.add_argument('--mode', choices=SERVER_MODES, default='threaded',
+                       help='Mode of the local server (default: threaded)')
+    parser.add_argument('--storage', choices=STORAGE_TYPES, default='json',
+                       help='Storage of the local server (default: json)')
+    parser.add_argument('--flush-every', type=int, default=None,
+                       help='Local server: save after this many updates '
+                            '(default: 1, or 0 when --flush-interval-ms is set)')
+    parser.add_argument('--flush-interval-ms', type=int, default=0,
+                       help='Local server: save pending updates this often (default: 0)')
+
+    args = parser.parse_args()
+    if args.flush_every is None:
+        args.flush_every = 0 if args.flush_interval_ms > 0 else 1
+    client_options = {"delta": not args.no_delta, "wire": args.wire}
+
+    print("="*60)
+    print("PC LOGGING - LOAD TEST")
+    print("="*60)
+    print(f"{args.pcs} PCs every {args.interval}s for {args.duration}s, {args.apps} apps each, "
+          f"churn {args.churn}, wire {args.wire}{'' if args.no_delta else ' + delta'}")
+
+    work_dir = None
+    server = None
+    try:
+        # Client and server chatter would swamp the report (and cost CPU)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if args.url:
+                server_url = args.url
+            else:
+                work_dir = tempfile.mkdtemp(prefix="pc_load_")
+                server = LoggingServer(host='127.0.0.1', port=0, log_file=os.path.join(work_dir, 'pc_logs.json'),
+                                       storage=args.storage, mode=args.mode, flush_every=args.flush_every,
+                                       flush_interval_ms=args.flush_interval_ms,
+                                       heartbeat_interval=max(1, int(args.interval)))
+                server.start_background()
+                server_url = f"http://127.0.0.1:{server.port}"
+            cpu_start = time.process_time()
+            results = run_load(server_url, args.pcs, args.interval, args.duration, args.threads,
+                               args.apps, args.churn, **client_options)
+            bytes_written = None
+            if server is not None:
+                server.logger.flush()
+                bytes_written = server.logger.backend.bytes_written
+            cpu_seconds = time.process_time() - cpu_start
+            if server is not None:
+                server.stop()
+        if server is not None:
+            print(f"Server:        {args.mode} mode, {args.storage} storage")
+        print_report(results, cpu_seconds, bytes_written, args.interval)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(0)
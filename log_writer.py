@@ -0,0 +1,217 @@
+"""
+Buffered Server Log
+Request threads hand log lines to a queue and return; one background thread
+formats them, writes them in batches to the console and/or a rotating file.
+A slow console (the Windows one especially) can then no longer hold up
+request handling.
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Optional, TextIO
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+
+def access_level(status: int) -> int:
+    """Level of an access log line: ERROR for 5xx, WARNING for 4xx, INFO otherwise"""
+    if status >= 500:
+        return ERROR
+    if status >= 400:
+        return WARNING
+    return INFO
+
+
+class LogWriter:
+    """
+    Queue-backed log writer.
+
+    log() filters by level, samples routine lines (1 in sample_every) and
+    puts the unformatted message on a bounded queue without waiting; when
+    the queue is full the line is dropped and counted instead. The writer
+    thread drains up to batch_size lines at a time, %-formats them, adds a
+    timestamp and writes each batch with a single write and flush.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, path: Optional[str] = None, level: str = "info",
+                 sample_every: int = 1, max_bytes: int = 0, backups: int = 3,
+                 queue_size: int = 10000, batch_size: int = 256):
+        """
+        Start the writer thread.
+
+        Args:
+            stream: Console stream to write to (None = no console output)
+            path: File to append to as well (None = no file)
+            level: Lowest level written ("debug", "info", "warning", "error")
+            sample_every: Write 1 in this many routine lines (successful
+                          requests, PC updates) of each message format;
+                          other lines are always written
+            max_bytes: Rotate the file once it reaches this size (0 = never)
+            backups: Rotated files kept (path.1 is the newest)
+            queue_size: Lines that may wait for the writer before new ones are dropped
+            batch_size: Most lines written in one batch
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+        self.stream = stream
+        self.path = path
+        self.level = LEVELS[level]
+        self.sample_every = max(1, sample_every)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()  # only taken when the queue is full
+        self._reported_drops = 0
+        # Routine lines are counted per message format, so each kind of line
+        # is sampled on its own; next() on a count is atomic, no lock needed
+        self._routine = {}
+        self._routine_other = itertools.count()  # formats beyond the first 256
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+        self._stamp_second = None
+        self._stamp = ""
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, level: int, message: str, *args, routine: bool = False):
+        """
+        Queue a line; never blocks.
+
+        Args:
+            level: DEBUG, INFO, WARNING or ERROR
+            message: Line text, %-formatted with args on the writer thread
+            routine: Subject to sampling (see sample_every)
+        """
+        if level < self.level or self._closed:
+            return
+        if routine and self.sample_every > 1:
+            counter = self._routine.get(message)
+            if counter is None:
+                counter = (self._routine.setdefault(message, itertools.count())
+                           if len(self._routine) < 256 else self._routine_other)
+            if next(counter) % self.sample_every:
+                return
+        try:
+            self._queue.put_nowait((time.time(), message, args))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def debug(self, message: str, *args, routine: bool = False):
+        """Queue a DEBUG line"""
+        self.log(DEBUG, message, *args, routine=routine)
+
+    def info(self, message: str, *args, routine: bool = False):
+        """Queue an INFO line"""
+        self.log(INFO, message, *args, routine=routine)
+
+    def warning(self, message: str, *args):
+        """Queue a WARNING line (never sampled)"""
+        self.log(WARNING, message, *args)
+
+    def error(self, message: str, *args):
+        """Queue an ERROR line (never sampled)"""
+        self.log(ERROR, message, *args)
+
+    def _timestamp(self, when: float) -> str:
+        """Format a time, reusing the last result within the same second"""
+        second = int(when)
+        if second != self._stamp_second:
+            self._stamp_second = second
+            self._stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self._stamp
+
+    def _write_loop(self):
+        """Writer thread: write batches until close() queues the stop marker"""
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Lines queued after the stop marker (a racing log() call) are still written
+            stop = None in items
+            lines = []
+            for item in items:
+                if item is None:
+                    continue
+                when, message, args = item
+                if args:
+                    try:
+                        message = message % args
+                    except (TypeError, ValueError):
+                        message = f"{message} {args!r}"
+                lines.append(f"[{self._timestamp(when)}] {message}\n")
+            dropped = self.dropped
+            if dropped != self._reported_drops:
+                lines.append(f"[{self._timestamp(time.time())}] [WARNING] Log queue full, "
+                             f"dropped {dropped - self._reported_drops} lines\n")
+                self._reported_drops = dropped
+            if lines:
+                self._write("".join(lines))
+            if stop:
+                return
+
+    def _write(self, text: str):
+        """Write one batch to the console and the file"""
+        if self.stream is not None:
+            try:
+                self.stream.write(text)
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass  # console gone (closed window, pythonw); keep serving
+        if self._file is not None:
+            try:
+                self._file.write(text)
+                self._file.flush()
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+
+    def _rotate(self):
+        """Move path to path.1, path.1 to path.2, ... and start a new file"""
+        self._file.close()
+        try:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        finally:
+            # Keep logging to the same file if it couldn't be moved (e.g. open in an editor)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self, timeout: float = 5.0):
+        """
+        Write everything still queued and stop the writer thread.
+
+        Args:
+            timeout: Seconds to wait for the writer; a stuck console must not
+                     keep the process from exiting
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)  # everything before it gets written
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            return  # still writing; leave the file to it
+        if self._file is not None:
+            self._file.close()
+            self._file = None
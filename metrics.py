@@ -0,0 +1,246 @@
+"""
+Server Metrics
+Counters, gauges and histograms exported in the Prometheus text format at
+GET /metrics. Recording is a dict update under a per-metric lock; values
+that already exist elsewhere (connections, bytes written, PC state) are
+read through callbacks only when /metrics is scraped.
+"""
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; from sub-millisecond handler work up to slow disk writes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    """Format a sample value (integers without a decimal point)"""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """Render {name="value",...}, or nothing without labels"""
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class: a named metric with optional labels"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        """
+        Args:
+            name: Metric name (e.g. "pc_logging_requests_total")
+            help_text: One-line description for the # HELP line
+            labels: Label names; values are passed positionally when recording
+        """
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, Labels, Tuple[str, ...], float]]:
+        """(name suffix, extra label names, label values, value) for every series"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Lines of the text format for this metric"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, extra_names, values, value in self.samples():
+            labels = format_labels(self.label_names + extra_names, values)
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Add amount to the series with these label values"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current value of one series"""
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", (), labels, value) for labels, value in items]
+
+
+class Gauge(Metric):
+    """Value that goes up and down per label set"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values = {}
+
+    def set(self, value: float, *labels: str):
+        """Set the series with these label values"""
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1):
+        """Add amount to the series with these label values"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        """Subtract amount from the series with these label values"""
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        """Current value of one series"""
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", (), labels, value) for labels, value in items]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name: Metric name (e.g. "pc_logging_request_duration_seconds")
+            help_text: One-line description for the # HELP line
+            labels: Label names
+            buckets: Increasing upper bounds; +Inf is added automatically
+        """
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum]
+
+    def observe(self, value: float, *labels: str):
+        """Record one observation for the series with these label values"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        """Observations recorded for one series"""
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        samples = []
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", ("le",), labels + (format_value(bound),), cumulative))
+            samples.append(("_sum", (), labels, total))
+            samples.append(("_count", (), labels, cumulative))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """Counter or gauge whose series are computed by a function at scrape time"""
+
+    def __init__(self, name: str, help_text: str, function: Callable[[], Dict[Labels, float]],
+                 labels: Iterable[str] = (), kind: str = "gauge"):
+        """
+        Args:
+            name: Metric name
+            help_text: One-line description for the # HELP line
+            function: Returns {label values tuple: value}; () for no labels
+            labels: Label names
+            kind: "gauge" or "counter"
+        """
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.function = function
+
+    def samples(self):
+        return [("", (), labels, value) for labels, value in sorted(self.function().items())]
+
+
+class MetricsRegistry:
+    """Metrics exported together, in registration order"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric and return it"""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        """Create and register a Counter"""
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        """Create and register a Gauge"""
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a Histogram"""
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def callback(self, name: str, help_text: str, function: Callable[[], Dict[Labels, float]],
+                 labels: Iterable[str] = (), kind: str = "gauge") -> CallbackMetric:
+        """Create and register a CallbackMetric"""
+        return self.register(CallbackMetric(name, help_text, function, labels, kind))
+
+    def render(self) -> bytes:
+        """
+        Export every metric.
+
+        Returns:
+            The text exposition format, UTF-8 encoded
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One broken callback shouldn't take the whole scrape down
+                lines.append(f"# {metric.name} unavailable: {escape_label(e)}")
+        return ("\n".join(lines) + "\n").encode('utf-8')
@@ -3,10 +3,40 @@ PC Logging System for Gaming Zone
 Tracks PC status, running software, and timestamps
 """
 
-import json
-import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import atexit
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from fleet_index import FleetIndex
+from log_writer import LogWriter
+from metrics import Histogram
+from pc_model import AppTable, PCRecord, format_timestamp
+from protocol import software_hash
+from storage import StorageBackend, create_storage
+
+
+def check_heartbeat(pc_name, status, **software_lists):
+    """
+    Check the field types of a heartbeat before any of it is applied.
+    
+    Args:
+        pc_name: Name/ID of the PC, must be a non-empty string
+        status: PC status, must be a string
+        software_lists: Named software lists (software=, added=, removed=),
+                        each must be a list of strings
+    
+    Raises:
+        ValueError: If a field has the wrong type
+    """
+    if not isinstance(pc_name, str) or not pc_name:
+        raise ValueError("pc_name must be a non-empty string")
+    if not isinstance(status, str):
+        raise ValueError("status must be a string")
+    for field, names in software_lists.items():
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"{field} must be a list of strings")
 
 
 class PCLogger:
@@ -15,33 +45,92 @@ class PCLogger:
     Tracks which PCs are running and what software is active on each.
     """
     
-    def __init__(self, log_file: str = "pc_logs.json"):
+    def __init__(self, log_file: str = "pc_logs.json", storage: Union[str, StorageBackend] = "json",
+                 flush_every: int = 1, flush_interval_ms: int = 0, load_since: Optional[str] = None,
+                 log_writer: Optional[LogWriter] = None):
         """
         Initialize the logger with a JSON file for data storage.
         
         Args:
             log_file: Path to the JSON file where logs will be stored
+            storage: "json" rewrites log_file on every save,
+                     "journal" appends each update to log_file + ".journal"
+                     and compacts it into log_file in the background,
+                     "sqlite" upserts changed PCs into a database next to
+                     log_file (.json becomes .db), "memory" keeps nothing
+                     on disk; or a StorageBackend instance (see storage.py)
+            flush_every: Save after this many updates (1 = save on every
+                         update, 0 = don't flush by count)
+            flush_interval_ms: Also save pending updates this often in
+                               milliseconds (0 = don't flush by time; unused
+                               with flush_every=1, nothing is ever pending).
+                               With flush_every=0 and flush_interval_ms=0
+                               updates are only saved by flush()/close().
+            load_since: Only load PCs updated at or after this
+                        "YYYY-MM-DD HH:MM:SS" timestamp (sqlite and memory
+                        storage; the others always load everything)
+            log_writer: Queue update lines on this LogWriter (sampled as
+                        routine lines) instead of printing them
         """
         self.log_file = log_file
-        self.logs = self._load_logs()
+        self.backend = storage if isinstance(storage, StorageBackend) else create_storage(storage, log_file)
+        self.storage = self.backend.name
+        self.load_since = load_since
+        self.log_writer = log_writer
+        self.flush_every = flush_every
+        self.flush_interval_ms = flush_interval_ms
+        # Guards self.pcs and storage; held by server threads while reading logs
+        self.lock = threading.RLock()
+        # Serializes writes to disk; taken before self.lock, never after it
+        self._flush_lock = threading.Lock()
+        self._dirty = {}  # PC names changed since the last save, in order
+        self._pending_updates = 0
+        self._closed = False
+        self._software_hashes = {}  # software bitset -> software_hash() of its names, filled lazily
+        self._listeners = []
+        # App names are stored once for the whole fleet; PCs hold bitsets of their IDs
+        self.apps = AppTable()
+        self.pcs = {name: PCRecord.from_dict(self.apps, info)
+                    for name, info in self._load_logs()["pcs"].items()}
+        # Status -> PCs and app -> running PCs, updated with every change
+        self.index = FleetIndex(self.apps)
+        for name, record in self.pcs.items():
+            self.index.add(name, record)
+        # Exported at /metrics by the server
+        self.save_time = Histogram("pc_logging_save_duration_seconds",
+                                   "Time spent in PCLogger._save_logs", ("kind",))
+        
+        # Anything but "save on every update" is flushed by a background thread
+        self._flush_wakeup = threading.Condition(self.lock)
+        self._flush_thread = None
+        if flush_every != 1:
+            self._flush_thread = threading.Thread(target=self._flush_loop, name="pc-logger-flush", daemon=True)
+            self._flush_thread.start()
+            atexit.register(self.close)
     
     def _load_logs(self) -> Dict:
         """
-        Load existing logs from the JSON file.
-        Creates a new file with empty structure if it doesn't exist.
+        Load existing logs from storage.
+        Starts with an empty structure if nothing was stored yet.
         
         Returns:
             Dictionary containing all logged data
         """
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, 'r') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                # If file is corrupted, start fresh
-                return self._get_empty_structure()
-        else:
-            return self._get_empty_structure()
+        if self.load_since is not None and not self.backend.partial_load:
+            print(f"[WARNING] {self.storage} storage always loads every PC, ignoring load_since")
+        return self.backend.load(self._get_empty_structure, since=self.load_since)
+    
+    @property
+    def logs(self) -> Dict:
+        """
+        All logged data in the stored dictionary layout.
+        
+        Returns:
+            {"pcs": {pc_name: {"status", "software", "last_updated"}}}, built
+            on every access (a copy, not the live state)
+        """
+        with self.lock:
+            return self._snapshot()
     
     def _get_empty_structure(self) -> Dict:
         """
@@ -54,12 +143,135 @@ class PCLogger:
             "pcs": {}  # Format: {"PC_NAME": {"status": "running/offline", "software": [], "last_updated": "timestamp"}}
         }
     
-    def _save_logs(self):
+    def add_listener(self, callback: Callable[[str, Optional[Dict], Dict], None]):
         """
-        Save current logs to the JSON file.
+        Register a function called after every update of a PC.
+        
+        The callback gets (pc_name, previous, current): a copy of the PC's
+        PCRecord before the update (None for a new PC) and its live record
+        after it. Records read like the info dictionaries (record["status"],
+        record.get("software")) and compare software cheaply through their
+        .apps bitsets. The callback runs while self.lock is held, so it must
+        be quick and must copy anything from current it wants to keep.
+        
+        Args:
+            callback: Function to call on every update
+        """
+        with self.lock:
+            self._listeners.append(callback)
+    
+    def _previous_state(self, pc_name: str) -> Optional[PCRecord]:
+        """Copy a PC's record before changing it, for listeners; caller holds self.lock"""
+        if not self._listeners:
+            return None
+        record = self.pcs.get(pc_name)
+        return record.copy() if record is not None else None
+    
+    def _notify(self, pc_name: str, previous: Optional[PCRecord]):
+        """Tell listeners a PC was updated; caller holds self.lock"""
+        if not self._listeners:
+            return
+        current = self.pcs[pc_name]
+        for callback in self._listeners:
+            callback(pc_name, previous, current)
+    
+    def _mark_dirty(self, pc_names: List[str], updates: int = 1):
         """
-        with open(self.log_file, 'w') as f:
-            json.dump(self.logs, f, indent=2)
+        Record changed PCs; caller holds self.lock.
+        Wakes the flush thread once flush_every updates are pending.
+        
+        Args:
+            pc_names: PCs that were just updated
+            updates: Number of updates this change counts as
+        """
+        for pc_name in pc_names:
+            self._dirty[pc_name] = True
+        self._pending_updates += updates
+        if self._flush_thread and self.flush_every and self._pending_updates >= self.flush_every:
+            self._flush_wakeup.notify()
+    
+    def _after_update(self):
+        """Save right away when flushing on every update; caller must not hold self.lock"""
+        if self.flush_every == 1:
+            self.flush()
+    
+    def _flush_loop(self):
+        """Background thread: flush by count, by interval, and once more on close"""
+        timeout = self.flush_interval_ms / 1000.0 if self.flush_interval_ms else None
+        while True:
+            with self.lock:
+                if not self._closed and not (self.flush_every and self._pending_updates >= self.flush_every):
+                    self._flush_wakeup.wait(timeout)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+    
+    def flush(self):
+        """
+        Save every update that is still only in memory.
+        """
+        with self._flush_lock:
+            with self.lock:
+                pc_names = list(self._dirty)
+                self._dirty = {}
+                self._pending_updates = 0
+            if pc_names:
+                self._save_logs(pc_names)
+    
+    def _save_logs(self, pc_names: Optional[List[str]] = None):
+        """
+        Save current logs to storage. Callers other than a single-threaded
+        script hold self._flush_lock (see flush()).
+        
+        Args:
+            pc_names: PCs changed since the last save. Incremental backends
+                      (journal, sqlite) only write these; None writes a
+                      full snapshot.
+        """
+        start = time.perf_counter()
+        if self.backend.incremental and pc_names is not None:
+            with self.lock:
+                pcs = {name: self.pcs[name].to_dict() for name in pc_names}
+            self.backend.write_pcs(pcs)
+            if self.backend.needs_compaction():
+                with self.lock:
+                    snapshot = self._snapshot()
+                self.backend.compact(snapshot)
+            self.save_time.observe(time.perf_counter() - start, "incremental")
+            return
+        
+        with self.lock:
+            snapshot = self._snapshot()
+        self.backend.write_snapshot(snapshot)
+        self.save_time.observe(time.perf_counter() - start, "full")
+    
+    def _snapshot(self) -> Dict:
+        """
+        Build the logs dictionary so it can be written while updates continue;
+        caller holds self.lock.
+        
+        Returns:
+            Copy of the logs in the stored dictionary layout
+        """
+        return {"pcs": {name: record.to_dict() for name, record in self.pcs.items()}}
+    
+    def close(self):
+        """
+        Save pending updates, stop the flush thread and close storage. In
+        journal mode this also waits for a running compaction; the journal
+        stays on disk and is replayed on next start.
+        """
+        with self.lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_wakeup.notify()
+        if self._flush_thread:
+            self._flush_thread.join()
+        self.flush()
+        with self._flush_lock:
+            self.backend.close()
     
     def _get_timestamp(self) -> str:
         """
@@ -68,7 +280,19 @@ class PCLogger:
         Returns:
             Current date and time as a string
         """
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return format_timestamp(time.time())
+    
+    def _report(self, message: str, *args, stamped: bool = False):
+        """
+        Report an update: queued on the log writer without blocking (it adds
+        the time itself), or printed with a timestamp when stamped is set.
+        """
+        if self.log_writer is not None:
+            self.log_writer.info(message, *args, routine=True)
+        elif stamped:
+            print(f"{message % args} at {self._get_timestamp()}")
+        else:
+            print(message % args)
     
     def log_pc_status(self, pc_name: str, status: str):
         """
@@ -78,18 +302,56 @@ class PCLogger:
             pc_name: Name/ID of the PC (e.g., "PC-01", "Gaming-Rig-1")
             status: Status of the PC ("running" or "offline")
         """
-        if pc_name not in self.logs["pcs"]:
-            self.logs["pcs"][pc_name] = {
-                "status": status,
-                "software": [],
-                "last_updated": self._get_timestamp()
-            }
-        else:
-            self.logs["pcs"][pc_name]["status"] = status
-            self.logs["pcs"][pc_name]["last_updated"] = self._get_timestamp()
+        with self.lock:
+            previous = self._previous_state(pc_name)
+            self._set_status(pc_name, status)
+            self._notify(pc_name, previous)
+            self._mark_dirty([pc_name])
+        self._after_update()
+        self._report("[OK] Logged %s: %s", pc_name, status, stamped=True)
+    
+    def mark_offline(self, pc_name: str, silent_since: float) -> bool:
+        """
+        Mark a running PC offline unless it was updated since silent_since.
+        The check and the update happen under one lock, so a heartbeat that
+        arrives while the liveness monitor decides is never overwritten.
+        The PC keeps its last update time: it was last seen running then, so
+        history closes its sessions there rather than at detection time.
         
-        self._save_logs()
-        print(f"[OK] Logged {pc_name}: {status} at {self._get_timestamp()}")
+        Args:
+            pc_name: Name/ID of the PC
+            silent_since: Epoch seconds; the PC only goes offline if its
+                          last update is older than this
+            
+        Returns:
+            True if the PC was marked offline
+        """
+        with self.lock:
+            record = self.pcs.get(pc_name)
+            if record is None or record.status != "running" or record.updated >= silent_since:
+                return False
+            last_seen = record.updated
+            previous = self._previous_state(pc_name)
+            self._set_status(pc_name, "offline")
+            record.updated = last_seen
+            self._notify(pc_name, previous)
+            self._mark_dirty([pc_name])
+        self._after_update()
+        self._report("[OK] Logged %s: %s", pc_name, "offline", stamped=True)
+        return True
+    
+    def _set_status(self, pc_name: str, status: str):
+        """Update the status of a PC in memory without saving"""
+        # Interning rejects a non-string status before the index is touched
+        status = sys.intern(status)
+        record = self.pcs.get(pc_name)
+        if record is None:
+            record = self.pcs[pc_name] = PCRecord(self.apps, status, 0, time.time())
+            self.index.add(pc_name, record)
+        else:
+            self.index.update(pc_name, record.status, record.apps, status, record.apps)
+            record.status = status
+            record.updated = time.time()
     
     def log_software(self, pc_name: str, software_list: List[str]):
         """
@@ -99,16 +361,31 @@ class PCLogger:
             pc_name: Name/ID of the PC
             software_list: List of software names running on the PC
         """
-        if pc_name not in self.logs["pcs"]:
+        with self.lock:
+            previous = self._previous_state(pc_name)
+            self._set_software(pc_name, software_list)
+            self._notify(pc_name, previous)
+            self._mark_dirty([pc_name])
+        self._after_update()
+        self._report("[OK] Logged software on %s: %s", pc_name, ', '.join(software_list))
+    
+    def _set_software(self, pc_name: str, software_list: List[str]):
+        """Update the software list of a PC in memory without saving"""
+        # Build the bitset first, so a bad list fails before the PC or index changes
+        apps = self.apps.bits(software_list)
+        self._set_apps(pc_name, apps)
+    
+    def _set_apps(self, pc_name: str, apps: int):
+        """Update the software bitset of a PC in memory without saving"""
+        if pc_name not in self.pcs:
             # If PC doesn't exist, create it first
-            self.log_pc_status(pc_name, "running")
+            self._set_status(pc_name, "running")
         
-        # Update software list with timestamp
-        self.logs["pcs"][pc_name]["software"] = software_list
-        self.logs["pcs"][pc_name]["last_updated"] = self._get_timestamp()
-        
-        self._save_logs()
-        print(f"[OK] Logged software on {pc_name}: {', '.join(software_list)}")
+        # Update software with timestamp
+        record = self.pcs[pc_name]
+        self.index.update(pc_name, record.status, record.apps, record.status, apps)
+        record.apps = apps
+        record.updated = time.time()
     
     def log_pc_with_software(self, pc_name: str, software_list: List[str], status: str = "running"):
         """
@@ -118,9 +395,146 @@ class PCLogger:
             pc_name: Name/ID of the PC
             software_list: List of software names running on the PC
             status: Status of the PC (default: "running")
+            
+        Raises:
+            ValueError: If pc_name, status or software_list has the wrong type
+        """
+        check_heartbeat(pc_name, status, software=software_list)
+        # Apply both changes first so storage is written once, not twice
+        with self.lock:
+            previous = self._previous_state(pc_name)
+            self._set_status(pc_name, status)
+            self._set_software(pc_name, software_list)
+            self._notify(pc_name, previous)
+            self._mark_dirty([pc_name])
+        self._after_update()
+        self._report("[OK] Logged %s: %s", pc_name, status, stamped=True)
+        self._report("[OK] Logged software on %s: %s", pc_name, ', '.join(software_list))
+    
+    def get_software_hash(self, pc_name: str) -> Optional[str]:
         """
-        self.log_pc_status(pc_name, status)
-        self.log_software(pc_name, software_list)
+        Get the content hash of the software list stored for a PC.
+        
+        Args:
+            pc_name: Name/ID of the PC
+            
+        Returns:
+            Hash from protocol.software_hash, or None if PC doesn't exist
+        """
+        with self.lock:
+            record = self.pcs.get(pc_name)
+            if record is None:
+                return None
+            return self._apps_hash(record.apps)
+    
+    def _apps_hash(self, apps: int) -> str:
+        """software_hash() of a software bitset, cached since many PCs share one; caller holds self.lock"""
+        digest = self._software_hashes.get(apps)
+        if digest is None:
+            if len(self._software_hashes) >= 4096:
+                self._software_hashes.clear()
+            digest = software_hash(self.apps.names_of(apps))
+            self._software_hashes[apps] = digest
+        return digest
+    
+    def log_pc_delta(self, pc_name: str, status: str, added: List[str], removed: List[str],
+                     base_hash: str, new_hash: Optional[str] = None) -> bool:
+        """
+        Log a heartbeat that only carries changes to the software list.
+        With no added/removed apps this is a keep-alive that just refreshes
+        status and timestamp.
+        
+        Args:
+            pc_name: Name/ID of the PC
+            status: Status of the PC
+            added: Software started since the client's last accepted heartbeat
+            removed: Software stopped since the client's last accepted heartbeat
+            base_hash: Hash of the software list the delta applies to
+            new_hash: Hash the client expects after applying the delta
+            
+        Returns:
+            True if applied, False if the PC is unknown, the stored list
+            doesn't match base_hash (or the result doesn't match new_hash)
+            and the client must resend its full software list
+            
+        Raises:
+            ValueError: If pc_name, status, added or removed has the wrong type
+        """
+        check_heartbeat(pc_name, status, added=added, removed=removed)
+        with self.lock:
+            # An unknown PC has no list to apply the delta to, whatever base_hash says
+            record = self.pcs.get(pc_name)
+            if record is None or not isinstance(base_hash, str) or self._apps_hash(record.apps) != base_hash:
+                return False
+            
+            if added or removed:
+                apps = (record.apps & ~self.apps.bits(removed)) | self.apps.bits(added)
+                if new_hash is not None and self._apps_hash(apps) != new_hash:
+                    return False
+                previous = self._previous_state(pc_name)
+                self._set_status(pc_name, status)
+                self._set_apps(pc_name, apps)
+            else:
+                previous = self._previous_state(pc_name)
+                self._set_status(pc_name, status)
+            self._notify(pc_name, previous)
+            self._mark_dirty([pc_name])
+        self._after_update()
+        
+        if added or removed:
+            self._report("[OK] Logged software delta on %s: +%d -%d", pc_name, len(added), len(removed))
+        else:
+            self._report("[OK] Logged %s: %s", pc_name, status, stamped=True)
+        return True
+    
+    def log_batch(self, records: List[Dict]) -> int:
+        """
+        Log many heartbeats at once with a single storage write.
+        
+        Args:
+            records: List of {"pc_name": ..., "status": ..., "software": [...]}
+                     dictionaries, applied in order ("status" defaults to
+                     "running", "software" to an empty list). An optional
+                     "timestamp" (epoch seconds) records when the heartbeat
+                     was taken, e.g. for heartbeats a client spooled while
+                     offline; it is capped at the current time and never
+                     moves a PC's last update backwards.
+            
+        Returns:
+            Number of records applied
+            
+        Raises:
+            ValueError: If any record is invalid (nothing is applied then)
+        """
+        # Validate everything first so a bad record doesn't leave a half-applied batch
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError("Every record must be an object")
+            check_heartbeat(record.get("pc_name"), record.get("status", "running"),
+                            software=record.get("software", []))
+            timestamp = record.get("timestamp")
+            if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+                raise ValueError("timestamp must be epoch seconds")
+        
+        changed = {}  # PC names in first-seen order
+        with self.lock:
+            for record in records:
+                pc_name = record["pc_name"]
+                previous = self._previous_state(pc_name)
+                existing = self.pcs.get(pc_name)
+                last_update = existing.updated if existing is not None else 0.0
+                self._set_status(pc_name, record.get("status", "running"))
+                self._set_software(pc_name, record.get("software", []))
+                if record.get("timestamp") is not None:
+                    current = self.pcs[pc_name]
+                    current.updated = max(last_update, min(record["timestamp"], current.updated))
+                self._notify(pc_name, previous)
+                changed[pc_name] = True
+            if changed:
+                self._mark_dirty(list(changed), updates=len(records))
+        self._after_update()
+        self._report("[OK] Logged batch of %d records for %d PCs", len(records), len(changed), stamped=True)
+        return len(records)
     
     def get_pc_info(self, pc_name: str) -> Optional[Dict]:
         """
@@ -132,16 +546,20 @@ class PCLogger:
         Returns:
             Dictionary with PC info or None if PC doesn't exist
         """
-        return self.logs["pcs"].get(pc_name)
+        with self.lock:
+            record = self.pcs.get(pc_name)
+            # A plain dictionary, so callers can serialize it while other threads keep logging
+            return record.to_dict() if record is not None else None
     
-    def get_all_pcs(self) -> Dict:
+    def get_all_pcs(self) -> Dict[str, Dict]:
         """
         Get information about all logged PCs.
         
         Returns:
-            Dictionary containing all PC information
+            Dictionary of pc_name -> PC information (a copy)
         """
-        return self.logs["pcs"]
+        with self.lock:
+            return {pc_name: record.to_dict() for pc_name, record in self.pcs.items()}
     
     def get_running_pcs(self) -> List[str]:
         """
@@ -150,8 +568,53 @@ class PCLogger:
         Returns:
             List of PC names that are running
         """
-        return [pc_name for pc_name, info in self.logs["pcs"].items() 
-                if info.get("status") == "running"]
+        with self.lock:
+            return self.index.query(status="running")
+    
+    def get_pcs_running_app(self, app: str) -> List[str]:
+        """
+        Get the running PCs that are running an app.
+        Looked up in the fleet index, so the cost depends on the number of
+        matching PCs, not the fleet size.
+        
+        Args:
+            app: App name (case-insensitive)
+            
+        Returns:
+            Sorted list of PC names
+        """
+        with self.lock:
+            return sorted(self.index.pcs_running_app(app))
+    
+    def find_pcs(self, status: Optional[str] = None, app: Optional[str] = None) -> List[str]:
+        """
+        Find PCs by status and/or running app.
+        
+        Args:
+            status: Only PCs with this status (e.g. "running")
+            app: Only PCs running this app (case-insensitive); offline PCs
+                 never match, since they aren't running anything
+            
+        Returns:
+            Sorted list of PC names (all PCs if no filter is given)
+        """
+        with self.lock:
+            return self.index.query(status, app)
+    
+    def get_stats(self, top: int = 10) -> Dict:
+        """
+        Get fleet aggregates: PCs per status and running PCs per app.
+        Counted from the fleet index, without iterating over the PCs.
+        
+        Args:
+            top: Number of most-used apps to list in "top_apps"
+            
+        Returns:
+            Dictionary with "pcs", "running", "offline", "statuses", "apps"
+            (app name -> running PCs) and "top_apps" ([{"app", "pcs"}, ...])
+        """
+        with self.lock:
+            return self.index.stats(top)
     
     def print_summary(self):
         """
@@ -161,7 +624,7 @@ class PCLogger:
         print("GAMING ZONE - PC STATUS SUMMARY")
         print("="*50)
         
-        if not self.logs["pcs"]:
+        if not self.pcs:
             print("No PCs logged yet.")
             return
         
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['detect_software', 'pc_logger'],
+    hiddenimports=['detect_software', 'app_rules', 'pc_logger', 'protocol', 'spool'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['pc_logger'],
+    hiddenimports=['pc_logger', 'journal', 'async_server', 'protocol', 'history', 'response_cache', 'events', 'liveness', 'storage', 'pc_model', 'fleet_index', 'metrics', 'log_writer'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
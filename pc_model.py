@@ -0,0 +1,179 @@
+"""
+Compact In-Memory PC Model
+PC records with __slots__, app names interned once per fleet and software
+sets stored as integer bitsets, timestamps kept as epoch seconds.
+"""
+
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Fields of the dictionary view of a PC, in output order
+FIELDS = ("status", "software", "last_updated")
+
+_last_formatted = (None, None)  # (whole second, formatted text) of the last call
+
+
+def format_timestamp(epoch: float) -> str:
+    """
+    Format epoch seconds the way PC timestamps have always looked.
+    Consecutive calls within the same second reuse the last result.
+    """
+    global _last_formatted
+    second = int(epoch)
+    if _last_formatted[0] != second:
+        _last_formatted = (second, time.strftime(TIME_FORMAT, time.localtime(second)))
+    return _last_formatted[1]
+
+
+def parse_timestamp(text: Optional[str]) -> float:
+    """Parse a "YYYY-MM-DD HH:MM:SS" timestamp from storage (0.0 if missing or invalid)"""
+    if not text:
+        return 0.0
+    try:
+        return time.mktime(datetime.strptime(text, TIME_FORMAT).timetuple())
+    except ValueError:
+        return 0.0
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the IDs set in a software bitset, lowest first"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class AppTable:
+    """
+    Intern table of app names shared by every PC.
+
+    Each distinct name is stored once and gets a small integer ID; a PC's
+    software is an int with bit ID set for every app it runs. Comparing two
+    software sets is one int comparison and a delta is a few bit operations.
+    """
+
+    # Decoded name lists kept for software sets seen recently; PCs built from
+    # the same image often run exactly the same apps
+    NAMES_CACHE_SIZE = 4096
+
+    def __init__(self):
+        self.names = []  # ID -> app name
+        self.ids = {}    # app name -> ID
+        self.folded = {}  # casefolded app name -> IDs of its spellings
+        self._names_cache = {}
+
+    def intern(self, name: str) -> int:
+        """Get the ID of an app name, assigning one if it is new"""
+        app_id = self.ids.get(name)
+        if app_id is None:
+            app_id = len(self.names)
+            name = sys.intern(name)
+            self.ids[name] = app_id
+            self.names.append(name)
+            self.folded.setdefault(name.casefold(), []).append(app_id)
+        return app_id
+
+    def lookup(self, name: str) -> List[int]:
+        """IDs of every known spelling of an app name, ignoring case (empty if unknown)"""
+        return self.folded.get(name.casefold(), [])
+
+    def bits(self, names: Iterable[str]) -> int:
+        """Build the bitset of a list of app names (duplicates collapse)"""
+        bits = 0
+        for name in names:
+            bits |= 1 << self.intern(name)
+        return bits
+
+    def names_of(self, bits: int) -> List[str]:
+        """
+        Get the app names in a bitset.
+
+        Returns:
+            Sorted list of names (a fresh list the caller may keep)
+        """
+        names = self._names_cache.get(bits)
+        if names is None:
+            names = sorted(self.names[app_id] for app_id in iter_bits(bits))
+            if len(self._names_cache) >= self.NAMES_CACHE_SIZE:
+                self._names_cache.clear()
+            self._names_cache[bits] = names
+        return list(names)
+
+
+class PCRecord:
+    """
+    One PC's state: status, software bitset and last update time.
+
+    Reads like the old dictionary ({"status", "software", "last_updated"}):
+    record["software"], record.get("status") and dict(record) all work,
+    with software names and the timestamp text built on access.
+    """
+
+    __slots__ = ("status", "apps", "updated", "table")
+
+    def __init__(self, table: AppTable, status: str, apps: int = 0, updated: float = 0.0):
+        """
+        Args:
+            table: App intern table the software bitset refers to
+            status: PC status ("running" or "offline")
+            apps: Software bitset (see AppTable)
+            updated: Last update time in epoch seconds
+        """
+        self.table = table
+        self.status = sys.intern(status)
+        self.apps = apps
+        self.updated = updated
+
+    @classmethod
+    def from_dict(cls, table: AppTable, info: Dict) -> "PCRecord":
+        """Build a record from the dictionary form used by storage"""
+        return cls(table, info.get("status", "running"), table.bits(info.get("software", [])),
+                   parse_timestamp(info.get("last_updated")))
+
+    @property
+    def software(self) -> List[str]:
+        """Sorted software names"""
+        return self.table.names_of(self.apps)
+
+    @property
+    def last_updated(self) -> str:
+        """Last update time as "YYYY-MM-DD HH:MM:SS" """
+        return format_timestamp(self.updated)
+
+    def copy(self) -> "PCRecord":
+        """Copy the record (a snapshot that later updates won't change)"""
+        return PCRecord(self.table, self.status, self.apps, self.updated)
+
+    def to_dict(self) -> Dict:
+        """Build the dictionary form used for JSON output and storage"""
+        return {"status": self.status, "software": self.software, "last_updated": self.last_updated}
+
+    def __getitem__(self, key: str):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in FIELDS]
+
+    def __contains__(self, key) -> bool:
+        return key in FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def __repr__(self) -> str:
+        return f"PCRecord({self.to_dict()!r})"
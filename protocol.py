@@ -0,0 +1,286 @@
+"""
+Heartbeat Protocol Helpers
+Shared by the client and the server so both sides agree on the wire format
+"""
+
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+
+def software_hash(software: Iterable[str]) -> str:
+    """
+    Content hash of a software list, independent of order and duplicates.
+
+    Args:
+        software: Software names
+
+    Returns:
+        16 hex character hash
+    """
+    text = "\n".join(sorted(set(software)))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def diff_software(old: Iterable[str], new: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Compare two software lists.
+
+    Args:
+        old: Previously sent software names
+        new: Current software names
+
+    Returns:
+        Tuple of (added, removed) sorted name lists
+    """
+    old_set = set(old)
+    new_set = set(new)
+    return sorted(new_set - old_set), sorted(old_set - new_set)
+
+
+# Compact binary heartbeat encoding, sent with this Content-Type instead of JSON
+BINARY_CONTENT_TYPE = "application/x-pclog-heartbeat"
+WIRE_VERSION = 2
+
+# How the software list is carried in a binary heartbeat
+_FULL, _DELTA, _KEEP_ALIVE = 0, 1, 2
+
+
+class ResyncRequired(Exception):
+    """The server's app-name table doesn't match the client's; resend everything"""
+
+
+def _write_varint(out: bytearray, value: int):
+    """Append an unsigned LEB128 varint"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_str(out: bytearray, text: str):
+    """Append a varint-length-prefixed UTF-8 string"""
+    data = text.encode('utf-8')
+    _write_varint(out, len(data))
+    out += data
+
+
+class _Reader:
+    """Cursor over a binary heartbeat body"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def varint(self) -> int:
+        if self.pos < len(self.data) and self.data[self.pos] < 0x80:
+            # Single-byte fast path: counts, lengths and most IDs
+            self.pos += 1
+            return self.data[self.pos - 1]
+        result = shift = 0
+        while True:
+            if self.pos >= len(self.data):
+                raise ValueError("Truncated heartbeat")
+            byte = self.data[self.pos]
+            self.pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+            if shift > 63:
+                raise ValueError("Varint too long")
+
+    def raw(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise ValueError("Truncated heartbeat")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def string(self) -> str:
+        return self.raw(self.varint()).decode('utf-8')
+
+    def varints(self, count: int) -> List[int]:
+        """Read count varints; IDs below 128 are one byte each and read in one slice"""
+        chunk = self.data[self.pos:self.pos + count]
+        if len(chunk) == count and (not chunk or max(chunk) < 0x80):
+            self.pos += count
+            return list(chunk)
+        # Same as calling varint() count times, without the per-call overhead
+        data, pos, result = self.data, self.pos, []
+        try:
+            for _ in range(count):
+                byte = data[pos]
+                pos += 1
+                value = byte & 0x7F
+                shift = 7
+                while byte >= 0x80:
+                    byte = data[pos]
+                    pos += 1
+                    value |= (byte & 0x7F) << shift
+                    shift += 7
+                result.append(value)
+        except IndexError:
+            raise ValueError("Truncated heartbeat")
+        self.pos = pos
+        return result
+
+
+class WireEncoder:
+    """
+    Client side of the binary heartbeat format.
+
+    Layout (varints are unsigned LEB128, strings are varint length + UTF-8):
+        version byte
+        pc_name, status, interval (varint milliseconds, 0 = not sent)
+        table_base: app names of this PC the server already has
+        new app names: count, then strings; they get IDs table_base, table_base + 1, ...
+        mode byte: 0 full list | 1 delta | 2 keep-alive
+        full:       count + app IDs, 8-byte software hash
+        delta:      8-byte base hash, added count + IDs, removed count + IDs, 8-byte new hash
+        keep-alive: 8-byte base hash
+
+    App names are interned per PC: each name goes over the wire once and
+    is an ID of one or two bytes from then on. Names are only counted as
+    known by the server once a request carrying them succeeded.
+    """
+
+    def __init__(self):
+        self.names = []   # ID -> app name
+        self.ids = {}     # app name -> ID
+        self.acked = 0    # number of names the server confirmed
+
+    def _id(self, name: str) -> int:
+        app_id = self.ids.get(name)
+        if app_id is None:
+            app_id = len(self.names)
+            self.ids[name] = app_id
+            self.names.append(name)
+        return app_id
+
+    def _write_ids(self, out: bytearray, names: Iterable[str]):
+        ids = [self._id(name) for name in names]
+        _write_varint(out, len(ids))
+        for app_id in ids:
+            _write_varint(out, app_id)
+
+    def encode(self, payload: Dict) -> bytes:
+        """
+        Encode a heartbeat built by LoggingClient.build_payload.
+
+        Args:
+            payload: JSON heartbeat dictionary (full, delta or keep-alive)
+
+        Returns:
+            Binary body
+        """
+        ids = bytearray()
+        if "software" in payload:
+            mode = _FULL
+            self._write_ids(ids, payload["software"])
+            ids += bytes.fromhex(payload.get("software_hash") or software_hash(payload["software"]))
+        elif "added" in payload or "removed" in payload:
+            mode = _DELTA
+            ids += bytes.fromhex(payload["base_hash"])
+            self._write_ids(ids, payload.get("added", []))
+            self._write_ids(ids, payload.get("removed", []))
+            ids += bytes.fromhex(payload["software_hash"])
+        else:
+            mode = _KEEP_ALIVE
+            ids += bytes.fromhex(payload["base_hash"])
+
+        out = bytearray([WIRE_VERSION])
+        _write_str(out, payload["pc_name"])
+        _write_str(out, payload.get("status", "running"))
+        _write_varint(out, round(payload.get("interval", 0) * 1000))
+        _write_varint(out, self.acked)
+        # Unconfirmed names are repeated until a request carrying them succeeds
+        _write_varint(out, len(self.names) - self.acked)
+        for name in self.names[self.acked:]:
+            _write_str(out, name)
+        out.append(mode)
+        return bytes(out + ids)
+
+    def acknowledge(self):
+        """The server accepted the last heartbeat, so it knows every name sent so far"""
+        self.acked = len(self.names)
+
+    def reset(self):
+        """Forget the table after a resync; the next heartbeat starts from scratch"""
+        self.names = []
+        self.ids = {}
+        self.acked = 0
+
+
+class WireDecoder:
+    """
+    Server side of the binary heartbeat format: keeps one app-name table
+    per PC and turns binary heartbeats back into the JSON payload layout.
+    """
+
+    # Tables are reset beyond this many names so a misbehaving client
+    # can't grow them without bound
+    MAX_NAMES = 65536
+
+    def __init__(self):
+        self._tables = {}  # pc_name -> list of app names, index = ID
+        self._lock = threading.Lock()
+
+    def decode(self, body: bytes) -> Dict:
+        """
+        Decode a binary heartbeat.
+
+        Args:
+            body: Request body
+
+        Returns:
+            Payload dictionary in the same layout as the JSON heartbeat
+
+        Raises:
+            ResyncRequired: The client refers to names this server doesn't know
+            ValueError: The body is malformed
+        """
+        reader = _Reader(body)
+        version = reader.raw(1)[0]
+        if version != WIRE_VERSION:
+            raise ValueError(f"Unsupported heartbeat version: {version}")
+        payload = {"pc_name": reader.string(), "status": reader.string()}
+        interval = reader.varint()
+        if interval:
+            payload["interval"] = interval / 1000
+        table_base = reader.varint()
+        new_names = [reader.string() for _ in range(reader.varint())]
+        mode = reader.raw(1)[0]
+
+        with self._lock:
+            table = self._tables.setdefault(payload["pc_name"], [])
+            if table_base > len(table):
+                # Server restarted or the table was dropped
+                del table[:]
+                raise ResyncRequired(payload["pc_name"])
+            # A client that restarted counts from a smaller base; its view wins
+            del table[table_base:]
+            table.extend(new_names)
+            if len(table) > self.MAX_NAMES:
+                del table[:]
+                raise ResyncRequired(payload["pc_name"])
+
+            def names():
+                ids = reader.varints(reader.varint())
+                if ids and max(ids) >= len(table):
+                    raise ResyncRequired(payload["pc_name"])
+                return [table[app_id] for app_id in ids]
+
+            if mode == _FULL:
+                payload["software"] = names()
+                payload["software_hash"] = reader.raw(8).hex()
+            elif mode == _DELTA:
+                payload["base_hash"] = reader.raw(8).hex()
+                payload["added"] = names()
+                payload["removed"] = names()
+                payload["software_hash"] = reader.raw(8).hex()
+            elif mode == _KEEP_ALIVE:
+                payload["base_hash"] = reader.raw(8).hex()
+            else:
+                raise ValueError(f"Unknown heartbeat mode: {mode}")
+        return payload
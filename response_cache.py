@@ -0,0 +1,182 @@
+"""
+Response Cache for GET /logs, GET /pc/<name> and GET /stats
+Keeps serialized JSON bytes per PC and for the whole document, and only
+re-serializes PCs that PCLogger actually changed since the last request.
+"""
+
+import gzip
+import json
+import os
+from typing import Optional, Tuple
+
+from pc_model import PCRecord
+
+
+class ResponseCache:
+    """
+    Versioned cache of serialized PC info.
+
+    Every PCLogger update bumps a global version and records it as that
+    PC's version; the PC's cached bytes are dropped. GET /logs is rebuilt
+    by joining the per-PC fragments, so a poll after one heartbeat costs
+    one small json.dumps plus a bytes join, and a poll with no changes
+    costs nothing. Versions double as ETags.
+
+    All state is guarded by the logger's lock, which is also held when
+    the change listener runs.
+    """
+
+    def __init__(self, logger):
+        """
+        Initialize the cache and start listening to logger updates.
+
+        Args:
+            logger: PCLogger whose data is served
+        """
+        self.logger = logger
+        # Tells ETags of this server run apart from those of a previous run
+        self.boot_id = os.urandom(4).hex()
+        self.version = 0
+        self._pc_versions = {}    # pc_name -> version of its last change
+        self._fragments = {}      # (pc_name, compact) -> b'"PC": {...}' for /logs
+        self._pc_bodies = {}      # (pc_name, compact) -> body for /pc/<name>
+        self._logs_bodies = {}    # compact -> (version, body) for /logs
+        self._gzip_bodies = {}    # cache key -> (ETag, gzip-compressed body)
+        self._stats_bodies = {}   # (top, compact) -> (index version, body) for /stats
+        logger.add_listener(self._on_change)
+
+    def _on_change(self, pc_name: str, previous: Optional[PCRecord], current: PCRecord):
+        """PCLogger listener: invalidate what the update touched"""
+        self.version += 1
+        self._pc_versions[pc_name] = self.version
+        for compact in (False, True):
+            self._fragments.pop((pc_name, compact), None)
+            self._pc_bodies.pop((pc_name, compact), None)
+            self._gzip_bodies.pop(("pc", pc_name, compact), None)
+
+    def etag(self, version: int) -> str:
+        """Build the ETag header value for a version"""
+        return f'"{self.boot_id}-{version}"'
+
+    def _fragment(self, pc_name: str, record: PCRecord, compact: bool) -> bytes:
+        """Serialize one PC as it appears inside /logs"""
+        key = (pc_name, compact)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            info = record.to_dict()
+            # An object key must be a JSON string; PCLogger only accepts string
+            # names, but a name loaded from older storage could still be a number
+            name = json.dumps(pc_name if isinstance(pc_name, str) else str(pc_name))
+            if compact:
+                text = name + ":" + json.dumps(info, separators=(',', ':'))
+            else:
+                # Same layout json.dumps(logs, indent=2) produces at this depth
+                text = "    " + name + ": " + json.dumps(info, indent=2).replace("\n", "\n    ")
+            fragment = text.encode()
+            self._fragments[key] = fragment
+        return fragment
+
+    def logs(self, compact: bool = False) -> Tuple[str, bytes]:
+        """
+        Get the serialized /logs document.
+
+        Args:
+            compact: No indentation or spaces
+
+        Returns:
+            Tuple of (ETag, body)
+        """
+        with self.logger.lock:
+            cached = self._logs_bodies.get(compact)
+            if cached is not None and cached[0] == self.version:
+                return self.etag(self.version), cached[1]
+
+            pcs = self.logger.pcs
+            fragments = [self._fragment(pc_name, record, compact) for pc_name, record in pcs.items()]
+            if compact:
+                body = b'{"pcs":{' + b','.join(fragments) + b'}}'
+            elif fragments:
+                body = b'{\n  "pcs": {\n' + b',\n'.join(fragments) + b'\n  }\n}'
+            else:
+                body = b'{\n  "pcs": {}\n}'
+            self._logs_bodies[compact] = (self.version, body)
+            return self.etag(self.version), body
+
+    def pc(self, pc_name: str, compact: bool = False) -> Optional[Tuple[str, bytes]]:
+        """
+        Get the serialized /pc/<name> document.
+
+        Args:
+            pc_name: Name/ID of the PC
+            compact: No indentation or spaces
+
+        Returns:
+            Tuple of (ETag, body), or None if the PC doesn't exist
+        """
+        with self.logger.lock:
+            record = self.logger.pcs.get(pc_name)
+            if record is None:
+                return None
+            key = (pc_name, compact)
+            body = self._pc_bodies.get(key)
+            if body is None:
+                info = record.to_dict()
+                if compact:
+                    body = json.dumps(info, separators=(',', ':')).encode()
+                else:
+                    body = json.dumps(info, indent=2).encode()
+                self._pc_bodies[key] = body
+            return self.etag(self._pc_versions.get(pc_name, 0)), body
+
+    def stats(self, top: int = 10, compact: bool = False) -> Tuple[str, bytes]:
+        """
+        Get the serialized /stats document.
+
+        Cached until the fleet index changes, so keep-alive heartbeats
+        don't invalidate it and a display polling every second mostly
+        gets the same bytes (or a 304) back.
+
+        Args:
+            top: Number of most-used apps to list
+            compact: No indentation or spaces
+
+        Returns:
+            Tuple of (ETag, body)
+        """
+        with self.logger.lock:
+            version = self.logger.index.version
+            key = (top, compact)
+            cached = self._stats_bodies.get(key)
+            if cached is None or cached[0] != version:
+                stats = self.logger.get_stats(top)
+                if compact:
+                    body = json.dumps(stats, separators=(',', ':')).encode()
+                else:
+                    body = json.dumps(stats, indent=2).encode()
+                if len(self._stats_bodies) >= 16:
+                    self._stats_bodies.clear()
+                cached = self._stats_bodies[key] = (version, body)
+            return f'"{self.boot_id}-s{version}"', cached[1]
+
+    def gzip(self, key: tuple, etag: str, body: bytes) -> bytes:
+        """
+        Get the gzip-compressed form of a cached body, compressing it only
+        the first time this version is asked for.
+
+        Args:
+            key: ("logs", compact), ("pc", pc_name, compact) or ("stats", top, compact)
+            etag: ETag of body, to tell versions apart
+            body: Uncompressed body
+
+        Returns:
+            Compressed body
+        """
+        with self.logger.lock:
+            cached = self._gzip_bodies.get(key)
+            if cached is not None and cached[0] == etag:
+                return cached[1]
+        # Compress outside the lock; two threads racing here just both compress
+        compressed = gzip.compress(body, compresslevel=6)
+        with self.logger.lock:
+            self._gzip_bodies[key] = (etag, compressed)
+        return compressed
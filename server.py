@@ -5,133 +5,687 @@ Runs on your laptop to receive logs from all gaming zone PCs
 
 import json
 import os
+import queue
+import socket
+import sys
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs, unquote
 import threading
-from typing import Dict
+import time
+import zlib
+from typing import Dict, Optional, Tuple
 
-from pc_logger import PCLogger
+from async_server import AsyncLoggingServer
+from events import EVENT_TYPES, EventFeed, EventStream
+from history import HistoryStore
+from liveness import HeartbeatMonitor
+from log_writer import LEVELS as LOG_LEVELS, LogWriter, access_level
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from response_cache import ResponseCache
+from pc_logger import PCLogger, check_heartbeat
+from protocol import BINARY_CONTENT_TYPE, ResyncRequired, WireDecoder
+from storage import STORAGE_TYPES
 
 
-class LoggingServerHandler(BaseHTTPRequestHandler):
-    """HTTP request handler for receiving PC logs"""
+JSON_HEADERS = {
+    'Content-type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+}
+
+# Cached responses smaller than this are sent uncompressed even to gzip clients
+GZIP_MIN_BYTES = 1024
+# Largest request body accepted after decompressing Content-Encoding: gzip/deflate
+MAX_DECOMPRESSED_BYTES = 16 * 1024 * 1024
+
+# Endpoint labels for request metrics; paths with a name in them are grouped
+# and anything else counts as "other", so scanners can't add series
+METRIC_ENDPOINTS = {'/status', '/logs', '/events', '/stats', '/pcs', '/metrics', '/log', '/log/batch'}
+METRIC_ENDPOINT_PREFIXES = (('/pc/', '/pc/<name>'), ('/apps/', '/apps/<app>'),
+                            ('/history/pc/', '/history/pc/<name>'), ('/history/app/', '/history/app/<name>'))
+METRIC_METHODS = {'GET', 'POST', 'OPTIONS'}
+# Decoding a heartbeat takes microseconds, a large batch milliseconds
+PARSE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.05)
+
+
+def endpoint_label(path: str) -> str:
+    """Group a request path into the endpoint label of the request metrics"""
+    if path in METRIC_ENDPOINTS:
+        return path
+    for prefix, label in METRIC_ENDPOINT_PREFIXES:
+        if path.startswith(prefix):
+            return label
+    return 'other'
+
+
+class BodyTooLarge(ValueError):
+    """A compressed request body inflates past MAX_DECOMPRESSED_BYTES"""
+
+
+class RequestRouter:
+    """
+    Endpoint logic shared by every server backend.
+    Takes a parsed request and returns (status code, headers, body bytes),
+    so the threaded and asyncio backends serve exactly the same API.
+    """
     
-    def __init__(self, logger: PCLogger, *args, **kwargs):
+    def __init__(self, logger: PCLogger, history: Optional[HistoryStore] = None,
+                 compact_json: bool = False, liveness: Optional[HeartbeatMonitor] = None,
+                 log_writer: Optional[LogWriter] = None):
+        """
+        Initialize the router.
+        
+        Args:
+            logger: PCLogger instance that stores the received logs
+            history: Session history for the /history endpoints (optional)
+            compact_json: Serve /logs and /pc/<name> without indentation
+                          unless the request asks for ?compact=0
+            liveness: Heartbeat monitor that gets the intervals clients advertise (optional)
+            log_writer: Where backends queue access log lines (None = print them)
+        """
         self.logger = logger
-        super().__init__(*args, **kwargs)
+        self.log_writer = log_writer
+        self.history = history
+        self.liveness = liveness
+        self.compact_json = compact_json
+        self.cache = ResponseCache(logger)
+        self.events = EventFeed(logger)
+        self.wire = WireDecoder()
+        # Whether the backend can hold a connection open for /events;
+        # a single-threaded server (or a fixed worker pool) would stop
+        # serving everyone else
+        self.streaming = True
+        self.metrics = MetricsRegistry()
+        self._register_metrics()
     
-    def log_message(self, format, *args):
-        """Override to customize log format"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] {format % args}")
+    def _register_metrics(self):
+        """Create the metrics served at /metrics"""
+        metrics = self.metrics
+        self.request_count = metrics.counter(
+            "pc_logging_requests_total", "HTTP requests handled", ("method", "endpoint", "status"))
+        self.request_time = metrics.histogram(
+            "pc_logging_request_duration_seconds", "Time from routing a request to having its response",
+            ("method", "endpoint"))
+        self.parse_time = metrics.histogram(
+            "pc_logging_parse_duration_seconds", "Time spent decoding heartbeat bodies",
+            ("endpoint", "format"), buckets=PARSE_BUCKETS)
+        # Backends count their connections here
+        self.connections = metrics.gauge("pc_logging_active_connections", "Open client connections")
+        metrics.register(self.logger.save_time)
+        backend = self.logger.backend
+        metrics.callback("pc_logging_storage_bytes_written_total", "Bytes written by the log storage",
+                         lambda: {(backend.name,): backend.bytes_written}, ("storage",), kind="counter")
+        metrics.callback("pc_logging_pcs", "PCs by status", self._pcs_by_status, ("status",))
+        metrics.callback("pc_logging_heartbeat_lag_seconds", "Seconds since the last update of each running PC",
+                         self._heartbeat_lags, ("pc",))
     
-    def do_GET(self):
-        """Handle GET requests - return current logs or PC info"""
-        parsed_path = urlparse(self.path)
+    def _pcs_by_status(self) -> Dict[Tuple[str], int]:
+        """PC count per status for /metrics"""
+        with self.logger.lock:
+            return {(status,): len(pcs) for status, pcs in self.logger.index.by_status.items() if pcs}
+    
+    def _heartbeat_lags(self) -> Dict[Tuple[str], float]:
+        """Seconds since each running PC was last heard from, for /metrics"""
+        now = time.time()
+        with self.logger.lock:
+            pcs = self.logger.pcs
+            return {(name,): round(max(0.0, now - pcs[name].updated), 3)
+                    for name in self.logger.index.pcs_with_status("running")}
+    
+    def handle(self, method: str, path: str, headers: Dict[str, str],
+               body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Handle one request, counting and timing it for /metrics.
+        
+        Args:
+            method: HTTP method ("GET", "POST", "OPTIONS")
+            path: Request path including any query string
+            headers: Request headers with lower-case names
+            body: Request body (empty for GET)
+            
+        Returns:
+            Tuple of (status code, response headers, response body); the body
+            is an EventStream instead of bytes for GET /events
+        """
+        start = time.perf_counter()
+        parsed_path = urlparse(path)
+        status = 500
+        try:
+            response = self._route(method, parsed_path, headers, body)
+            status = response[0]
+            return response
+        finally:
+            endpoint = endpoint_label(parsed_path.path)
+            method = method if method in METRIC_METHODS else 'other'
+            self.request_count.inc(method, endpoint, str(status))
+            self.request_time.observe(time.perf_counter() - start, method, endpoint)
+    
+    def _route(self, method: str, parsed_path, headers: Dict[str, str],
+               body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        """Dispatch a request by method (see handle())"""
         path = parsed_path.path
         
+        if method == 'GET':
+            query = {name: values[-1] for name, values in parse_qs(parsed_path.query).items()}
+            return self.handle_get(path, headers, query)
+        if method == 'POST':
+            encoding = headers.get('content-encoding', 'identity').strip().lower()
+            if encoding not in ('identity', 'gzip', 'x-gzip', 'deflate'):
+                return self.json_response(415, {"status": "error",
+                                                "message": f"Unsupported Content-Encoding: {encoding}"})
+            if encoding != 'identity':
+                try:
+                    body = self.decompress(body, encoding)
+                except BodyTooLarge as e:
+                    return self.json_response(413, {"status": "error", "message": str(e)})
+                except ValueError as e:
+                    return self.json_response(400, {"status": "error", "message": str(e)})
+            return self.handle_post(path, headers, body)
+        if method == 'OPTIONS':
+            # CORS preflight
+            return 200, {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Content-Encoding',
+            }, b""
+        return 501, {}, b"Not Implemented"
+    
+    def decompress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Decompress a request body, refusing to inflate it past MAX_DECOMPRESSED_BYTES.
+        
+        Args:
+            body: Compressed request body
+            encoding: Content-Encoding ("gzip" or "deflate")
+            
+        Returns:
+            Decompressed body
+            
+        Raises:
+            BodyTooLarge: The body inflates past MAX_DECOMPRESSED_BYTES
+            ValueError: Corrupt data
+        """
+        if encoding == 'deflate':
+            decompressor = zlib.decompressobj()
+        else:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            # Stop one byte past the cap instead of inflating a bomb completely
+            data = decompressor.decompress(body, MAX_DECOMPRESSED_BYTES + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid {encoding} body: {e}")
+        if len(data) > MAX_DECOMPRESSED_BYTES or decompressor.unconsumed_tail:
+            raise BodyTooLarge(f"Decompressed body larger than {MAX_DECOMPRESSED_BYTES} bytes")
+        return data
+    
+    def json_response(self, status: int, data, indent: Optional[int] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Build a JSON response tuple"""
+        return status, dict(JSON_HEADERS), json.dumps(data, indent=indent).encode()
+    
+    def _wants_compact(self, query: Dict[str, str]) -> bool:
+        """Check ?compact=1/0, falling back to the server default"""
+        if 'compact' in query:
+            return query['compact'].lower() in ('1', 'true', 'yes')
+        return self.compact_json
+    
+    def _accepts_gzip(self, headers: Dict[str, str]) -> bool:
+        """Check Accept-Encoding for gzip with a non-zero q value; * only counts without a gzip entry"""
+        qualities = {}
+        for part in headers.get('accept-encoding', '').lower().split(','):
+            name, *params = part.split(';')
+            name = name.strip()
+            if name not in ('gzip', '*'):
+                continue
+            quality = 1.0
+            for param in params:
+                key, _, value = param.strip().partition('=')
+                if key.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[name] = quality
+        quality = qualities.get('gzip', qualities.get('*', 0.0))
+        return quality > 0
+    
+    def cached_response(self, headers: Dict[str, str], etag: str, body: bytes,
+                        cache_key: Optional[tuple] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Build a response for a cached body, or 304 Not Modified when the
+        client already has this version (If-None-Match). Large bodies are
+        gzip-compressed for clients that accept it, and the compressed
+        bytes are cached under cache_key.
+        """
+        response_headers = dict(JSON_HEADERS)
+        response_headers['Cache-Control'] = 'no-cache'
+        response_headers['Vary'] = 'Accept-Encoding'
+        use_gzip = cache_key is not None and len(body) >= GZIP_MIN_BYTES and self._accepts_gzip(headers)
+        if use_gzip:
+            # Each encoding is its own representation with its own ETag
+            etag = etag[:-1] + '-gzip"'
+        response_headers['ETag'] = etag
+        if_none_match = headers.get('if-none-match')
+        if if_none_match and (if_none_match.strip() == '*' or
+                              etag in [tag.strip() for tag in if_none_match.split(',')]):
+            return 304, response_headers, b""
+        if use_gzip:
+            response_headers['Content-Encoding'] = 'gzip'
+            body = self.cache.gzip(cache_key, etag, body)
+        return 200, response_headers, body
+    
+    def handle_get(self, path: str, headers: Dict[str, str],
+                   query: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Handle GET requests - return current logs or PC info"""
         if path == '/status':
             # Return server status
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            response = {"status": "running", "message": "PC Logging Server is active"}
-            self.wfile.write(json.dumps(response).encode())
+            return self.json_response(200, {"status": "running", "message": "PC Logging Server is active"})
         
         elif path == '/logs':
-            # Return all logs
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(self.logger.logs, indent=2).encode())
+            # Return all logs (pre-serialized, only changed PCs are re-encoded)
+            compact = self._wants_compact(query)
+            etag, body = self.cache.logs(compact)
+            return self.cached_response(headers, etag, body, ('logs', compact))
         
         elif path.startswith('/pc/'):
             # Return specific PC info
-            pc_name = path.split('/pc/')[1]
-            pc_info = self.logger.get_pc_info(pc_name)
+            pc_name = unquote(path.split('/pc/')[1])
+            compact = self._wants_compact(query)
+            cached = self.cache.pc(pc_name, compact)
             
-            self.send_response(200 if pc_info else 404)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            if cached:
+                return self.cached_response(headers, *cached, cache_key=('pc', pc_name, compact))
+            return self.json_response(404, {"error": "PC not found"})
+        
+        elif path.startswith('/history/'):
+            return self.handle_history(path, query)
+        
+        elif path == '/events':
+            return self.handle_events(headers, query)
+        
+        elif path == '/stats':
+            # Fleet aggregates for dashboards (cached until an index set changes)
+            try:
+                top = int(query.get('top', 10))
+            except ValueError:
+                return self.json_response(400, {"error": "top must be a number"})
+            if not 0 <= top <= 1000:
+                return self.json_response(400, {"error": "top must be between 0 and 1000"})
+            compact = self._wants_compact(query)
+            etag, body = self.cache.stats(top, compact)
+            return self.cached_response(headers, etag, body, ('stats', top, compact))
+        
+        elif path.startswith('/apps/'):
+            # PCs running an app right now
+            app = unquote(path[len('/apps/'):])
+            pcs = self.logger.get_pcs_running_app(app)
+            return self.json_response(200, {"app": app, "count": len(pcs), "pcs": pcs})
+        
+        elif path == '/pcs':
+            # PCs filtered by status and/or running app
+            pcs = self.logger.find_pcs(query.get('status'), query.get('app'))
+            return self.json_response(200, {"count": len(pcs), "pcs": pcs})
+        
+        elif path == '/metrics':
+            # Prometheus text exposition format
+            return 200, {'Content-type': METRICS_CONTENT_TYPE, 'Cache-Control': 'no-cache'}, self.metrics.render()
+        
+        return 404, {}, b"Not Found"
+    
+    def handle_events(self, headers: Dict[str, str], query: Dict[str, str]):
+        """
+        Handle the PC change feed:
+            /events?since=N&types=status,software          Server-Sent Events stream
+            /events?mode=poll&since=N&timeout=S&types=...  long-poll, one JSON response
+        since is the last sequence number the consumer saw; SSE clients
+        resume with the Last-Event-ID header instead.
+        """
+        try:
+            since = int(headers.get('last-event-id') or query.get('since') or 0)
+            timeout = min(max(float(query.get('timeout', 25)), 0.0), 300.0)
+        except ValueError:
+            return self.json_response(400, {"error": "since and timeout must be numbers"})
+        
+        types = None
+        if query.get('types'):
+            types = set(query['types'].split(','))
+            unknown = types - set(EVENT_TYPES)
+            if unknown:
+                return self.json_response(400, {"error": f"Unknown event types: {', '.join(sorted(unknown))}"})
+        
+        if query.get('mode') == 'poll':
+            if not self.streaming:
+                timeout = 0.0
+            response_headers = dict(JSON_HEADERS)
+            response_headers['Cache-Control'] = 'no-cache'
+            return 200, response_headers, EventStream(self.events, since, types, mode='poll', timeout=timeout)
+        
+        if not self.streaming:
+            return self.json_response(503, {"error": "Streaming is not available in single and pool mode, "
+                                                     "use /events?mode=poll"})
+        return 200, {
+            'Content-type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*',
+        }, EventStream(self.events, since, types)
+    
+    def handle_history(self, path: str, query: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Handle session history queries:
+            /history/pc/<name>?since=...&until=...           PC uptime and app sessions of one PC
+            /history/app/<name>?pc=...&since=...&until=...   sessions and total time of one app
+        since/until take epoch seconds or "YYYY-MM-DD[ HH:MM:SS]".
+        """
+        if self.history is None:
+            return self.json_response(404, {"error": "History is not enabled on this server"})
+        
+        since = query.get('since')
+        until = query.get('until')
+        try:
+            if path.startswith('/history/pc/'):
+                pc_name = unquote(path[len('/history/pc/'):])
+                return self.json_response(200, {
+                    "pc": pc_name,
+                    "sessions": self.history.pc_sessions(pc_name, since, until),
+                    "apps": self.history.app_sessions(None, pc_name, since, until),
+                }, indent=2)
             
-            if pc_info:
-                self.wfile.write(json.dumps(pc_info, indent=2).encode())
-            else:
-                self.wfile.write(json.dumps({"error": "PC not found"}).encode())
+            if path.startswith('/history/app/'):
+                app = unquote(path[len('/history/app/'):])
+                sessions = self.history.app_sessions(app, query.get('pc'), since, until)
+                return self.json_response(200, {
+                    "app": app,
+                    "total_seconds": round(sum(s["seconds"] for s in sessions), 1),
+                    "sessions": sessions,
+                }, indent=2)
+        except ValueError as e:
+            return self.json_response(400, {"error": str(e)})
         
-        else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
+        return 404, {}, b"Not Found"
     
-    def do_POST(self):
+    def resync_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        """Ask the client to resend its full software list"""
+        return self.json_response(409, {"status": "resync", "message": "Software list out of sync, send full list"})
+    
+    def _check_interval(self, record: Dict):
+        """Reject a bad heartbeat interval in a log record before anything is applied"""
+        if self.liveness is not None and isinstance(record, dict) and 'interval' in record:
+            HeartbeatMonitor.check_interval(record['interval'])
+    
+    def _note_interval(self, record: Dict):
+        """Pass the interval of an accepted log record to the liveness monitor"""
+        if self.liveness is not None and 'interval' in record:
+            self.liveness.set_interval(record['pc_name'], record['interval'])
+    
+    def handle_post(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, str], bytes]:
         """Handle POST requests - receive logs from clients"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        
         if path == '/log':
-            # Receive log data from client
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            
+            # Receive log data from client, as JSON or the compact binary format
             try:
-                data = json.loads(post_data.decode('utf-8'))
+                content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+                start = time.perf_counter()
+                if content_type == BINARY_CONTENT_TYPE:
+                    data = self.wire.decode(body)
+                    self.parse_time.observe(time.perf_counter() - start, '/log', 'binary')
+                else:
+                    data = json.loads(body.decode('utf-8'))
+                    self.parse_time.observe(time.perf_counter() - start, '/log', 'json')
                 pc_name = data.get('pc_name')
                 status = data.get('status', 'running')
-                software = data.get('software', [])
                 
-                if not pc_name:
-                    raise ValueError("pc_name is required")
+                # Check before anything is applied; a bad name or status must not reach the index
+                check_heartbeat(pc_name, status)
+                self._check_interval(data)
                 
-                # Log the data
-                self.logger.log_pc_with_software(pc_name, software, status)
+                if 'software' not in data and 'base_hash' in data:
+                    # Delta heartbeat: only added/removed apps, or a bare keep-alive
+                    applied = self.logger.log_pc_delta(
+                        pc_name, status,
+                        data.get('added', []), data.get('removed', []),
+                        data['base_hash'], data.get('software_hash'))
+                    if not applied:
+                        return self.resync_response()
+                else:
+                    # Log the data
+                    self.logger.log_pc_with_software(pc_name, data.get('software', []), status)
+                self._note_interval(data)
                 
-                # Send success response
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                response = {"status": "success", "message": f"Logged data for {pc_name}"}
-                self.wfile.write(json.dumps(response).encode())
+                return self.json_response(200, {"status": "success", "message": f"Logged data for {pc_name}"})
                 
+            except ResyncRequired:
+                return self.resync_response()
             except Exception as e:
-                # Send error response
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                response = {"status": "error", "message": str(e)}
-                self.wfile.write(json.dumps(response).encode())
+                return self.json_response(400, {"status": "error", "message": str(e)})
         
-        else:
-            self.send_response(404)
-            self.end_headers()
-            self.wfile.write(b"Not Found")
+        elif path == '/log/batch':
+            # Receive many heartbeats at once (relay or client catching up)
+            try:
+                start = time.perf_counter()
+                data = json.loads(body.decode('utf-8'))
+                self.parse_time.observe(time.perf_counter() - start, '/log/batch', 'json')
+                records = data.get('records') if isinstance(data, dict) else data
+                if not isinstance(records, list):
+                    raise ValueError("Expected a list of records")
+                for record in records:
+                    self._check_interval(record)
+                
+                count = self.logger.log_batch(records)
+                for record in records:
+                    self._note_interval(record)
+                
+                return self.json_response(200, {"status": "success", "message": f"Logged {count} records",
+                                                "count": count})
+                
+            except Exception as e:
+                return self.json_response(400, {"status": "error", "message": str(e)})
+        
+        return 404, {}, b"Not Found"
+
+
+class LoggingServerHandler(BaseHTTPRequestHandler):
+    """HTTP request handler for receiving PC logs"""
+    
+    # Keep client connections open between heartbeats; every response
+    # carries an exact Content-Length so the client knows where it ends
+    protocol_version = "HTTP/1.1"
+    # Drop connections idle for this long (seconds) so they don't pin a thread
+    timeout = 120
+    
+    def __init__(self, router: RequestRouter, *args, **kwargs):
+        self.router = router
+        self.logger = router.logger
+        super().__init__(*args, **kwargs)
+    
+    def log_request(self, code='-', size='-'):
+        """Log a handled request; errors get a higher level and aren't sampled"""
+        status = int(code) if isinstance(code, int) else 0
+        log_writer = self.router.log_writer
+        if log_writer is None:
+            self.log_message('"%s" %s %s', self.requestline, str(status or code), str(size))
+            return
+        log_writer.log(access_level(status), '"%s" %s %s', self.requestline, status or code, size,
+                       routine=0 < status < 400)
+    
+    def log_message(self, format, *args):
+        """Queue a line on the log writer (formatted there), or print it"""
+        log_writer = self.router.log_writer
+        if log_writer is not None:
+            log_writer.info(format, *args)
+            return
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {format % args}")
+    
+    def handle(self):
+        """Serve the connection's requests, counting it as open meanwhile"""
+        self.router.connections.inc()
+        try:
+            super().handle()
+        finally:
+            self.router.connections.dec()
+    
+    def _dispatch(self, method: str):
+        """Read the request, route it and write the response"""
+        content_length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(content_length) if content_length else b""
+        headers = {name.lower(): value for name, value in self.headers.items()}
+        
+        status, response_headers, response_body = self.router.handle(method, self.path, headers, body)
+        
+        if isinstance(response_body, EventStream):
+            self._stream(status, response_headers, response_body)
+            return
+        
+        self.send_response(status)
+        for name, value in response_headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(response_body)))
+        if not getattr(self.server, 'keep_alive', False):
+            # One connection at a time (or a small pool): don't let one
+            # client hold on to it between heartbeats
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(response_body)
+    
+    def _stream(self, status: int, response_headers: Dict[str, str], stream: EventStream):
+        """Write headers, then stream chunks until the stream ends or the client goes away"""
+        # No Content-Length: the body ends when the connection closes
+        self.close_connection = True
+        self.send_response(status)
+        for name, value in response_headers.items():
+            self.send_header(name, value)
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for chunk in stream:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def do_GET(self):
+        """Handle GET requests - return current logs or PC info"""
+        self._dispatch('GET')
+    
+    def do_POST(self):
+        """Handle POST requests - receive logs from clients"""
+        self._dispatch('POST')
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        self._dispatch('OPTIONS')
 
 
-def create_handler(logger):
-    """Factory function to create handler with logger instance"""
+def create_handler(router):
+    """Factory function to create handler with router instance"""
     def handler(*args, **kwargs):
-        return LoggingServerHandler(logger, *args, **kwargs)
+        return LoggingServerHandler(router, *args, **kwargs)
     return handler
 
 
+class LoggingHTTPServer(HTTPServer):
+    """HTTP server with a listen backlog sized for a room full of PCs"""
+    request_queue_size = 128
+    # Serving one connection at a time, so close it after each response
+    keep_alive = False
+
+
+class ThreadingLoggingHTTPServer(ThreadingMixIn, LoggingHTTPServer):
+    """HTTP server that handles each connection on its own thread"""
+    daemon_threads = True
+    keep_alive = True
+    
+    def __init__(self, *args, **kwargs):
+        self.open_connections = set()
+        self.open_connections_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+    
+    def process_request(self, request, client_address):
+        """Track the connection so server_close can drop it"""
+        with self.open_connections_lock:
+            self.open_connections.add(request)
+        super().process_request(request, client_address)
+    
+    def shutdown_request(self, request):
+        """Forget the connection once its thread is done with it"""
+        with self.open_connections_lock:
+            self.open_connections.discard(request)
+        super().shutdown_request(request)
+    
+    def server_close(self):
+        """Close the socket and every kept-alive client connection"""
+        super().server_close()
+        with self.open_connections_lock:
+            connections = list(self.open_connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class WorkerPoolHTTPServer(LoggingHTTPServer):
+    """
+    HTTP server that hands connections to a fixed number of worker threads.
+    When all workers are busy and the queue is full, accepting new
+    connections waits, so a burst of clients can't spawn unbounded threads.
+    """
+    
+    def __init__(self, server_address, handler_class, workers: int = 8, queue_size: int = 64):
+        """
+        Initialize the server and start its workers.
+        
+        Args:
+            server_address: (host, port) tuple to bind to
+            handler_class: Request handler factory
+            workers: Number of worker threads
+            queue_size: Accepted connections that may wait for a free worker
+        """
+        super().__init__(server_address, handler_class)
+        self.connections = queue.Queue(maxsize=queue_size)
+        self.workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._worker, name=f"http-worker-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+    
+    def process_request(self, request, client_address):
+        """Queue an accepted connection for the workers"""
+        self.connections.put((request, client_address))
+    
+    def _worker(self):
+        """Serve queued connections until server_close sends a stop marker"""
+        while True:
+            item = self.connections.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+    
+    def server_close(self):
+        """Close the socket and stop the workers"""
+        super().server_close()
+        for _ in self.workers:
+            self.connections.put(None)
+
+
+SERVER_MODES = ('single', 'threaded', 'pool', 'asyncio')
+
+
 class LoggingServer:
     """Main server class"""
     
-    def __init__(self, host='0.0.0.0', port=8080, log_file='pc_logs.json'):
+    def __init__(self, host='0.0.0.0', port=8080, log_file='pc_logs.json', storage='json',
+                 mode='threaded', workers=8, flush_every=1, flush_interval_ms=0,
+                 history_file=None, compact_json=False, offline_after=3, heartbeat_interval=30,
+                 load_since=None, log_level='info', server_log=None, server_log_max_bytes=0,
+                 log_sample=1):
         """
         Initialize the logging server.
         
@@ -139,22 +693,89 @@ class LoggingServer:
             host: Host address to bind to (0.0.0.0 for all interfaces)
             port: Port number to listen on
             log_file: Path to JSON file for storing logs
+            storage: Storage mode for PCLogger ("json", "journal", "sqlite" or "memory")
+            mode: "single" handles one request at a time, "threaded" uses a
+                  thread per connection, "pool" uses a fixed worker pool,
+                  "asyncio" holds all connections on one event loop
+            workers: Number of worker threads in "pool" mode
+            flush_every: Save logs after this many updates (0 = not by count)
+            flush_interval_ms: Save pending updates this often (0 = not by time)
+            history_file: SQLite file for PC/app session history (None = no history)
+            compact_json: Serve /logs and /pc/<name> without indentation by default
+            offline_after: Mark a PC offline after this many missed heartbeat
+                           intervals (0 = only when the client says so)
+            heartbeat_interval: Interval assumed for clients that don't advertise one (seconds)
+            load_since: Only load PCs updated since this "YYYY-MM-DD HH:MM:SS"
+                        timestamp at startup (sqlite storage)
+            log_level: Lowest level of request and update lines shown
+                       ("debug", "info", "warning", "error")
+            server_log: Write request and update lines to this file instead
+                        of the console (None = console)
+            server_log_max_bytes: Rotate server_log at this size (0 = never)
+            log_sample: Show 1 in this many routine lines (successful
+                        requests, PC updates); errors are always shown
         """
+        if mode not in SERVER_MODES:
+            raise ValueError(f"Unknown server mode: {mode}")
         self.host = host
         self.port = port
-        self.logger = PCLogger(log_file)
+        self.mode = mode
+        self.workers = workers
+        # Request threads only queue log lines; a background thread writes them
+        self.log_writer = LogWriter(stream=None if server_log else sys.stdout, path=server_log,
+                                    level=log_level, sample_every=log_sample,
+                                    max_bytes=server_log_max_bytes)
+        self.logger = PCLogger(log_file, storage=storage,
+                               flush_every=flush_every, flush_interval_ms=flush_interval_ms,
+                               load_since=load_since, log_writer=self.log_writer)
+        self.history = None
+        if history_file:
+            self.history = HistoryStore(history_file)
+            self.history.attach(self.logger)
+        self.liveness = None
+        if offline_after:
+            self.liveness = HeartbeatMonitor(self.logger, missed_intervals=offline_after,
+                                             default_interval=heartbeat_interval)
+        self.router = RequestRouter(self.logger, self.history, compact_json=compact_json,
+                                    liveness=self.liveness, log_writer=self.log_writer)
+        self.router.metrics.callback("pc_logging_log_lines_dropped_total",
+                                     "Log lines dropped because the log queue was full",
+                                     lambda: {(): self.log_writer.dropped}, kind="counter")
+        # Each open stream would hold the only thread, or one of the pool's workers, for good
+        self.router.streaming = mode not in ('single', 'pool')
         self.server = None
         self.server_thread = None
+        self.ready = threading.Event()
+    
+    def _create_http_server(self):
+        """Create the HTTP server for the configured mode"""
+        address = (self.host, self.port)
+        if self.mode == 'asyncio':
+            return AsyncLoggingServer(address, self.router)
+        
+        handler = create_handler(self.router)
+        if self.mode == 'threaded':
+            return ThreadingLoggingHTTPServer(address, handler)
+        if self.mode == 'pool':
+            return WorkerPoolHTTPServer(address, handler, workers=self.workers)
+        return LoggingHTTPServer(address, handler)
     
     def start(self):
         """Start the HTTP server"""
-        handler = create_handler(self.logger)
-        self.server = HTTPServer((self.host, self.port), handler)
+        self.server = self._create_http_server()
+        # Pick up the real port when binding to port 0
+        self.port = self.server.server_address[1]
+        if self.liveness:
+            self.liveness.start()
+        self.ready.set()
         
         print("="*60)
         print("PC LOGGING SERVER")
         print("="*60)
         print(f"Server running on http://{self.host}:{self.port}")
+        print(f"Mode: {self.mode}" + (f" ({self.workers} workers)" if self.mode == 'pool' else ""))
+        if self.liveness:
+            print(f"PCs silent for {self.liveness.missed_intervals} heartbeat intervals are marked offline")
         print(f"Waiting for logs from gaming zone PCs...")
         print(f"Press Ctrl+C to stop the server")
         print("="*60)
@@ -169,24 +790,101 @@ class LoggingServer:
     def stop(self):
         """Stop the HTTP server"""
         if self.server:
+            # End /events streams first so their connections can finish
+            self.router.events.close()
             self.server.shutdown()
             self.server.server_close()
+            if self.liveness:
+                self.liveness.stop()
+            self.logger.close()
+            if self.history:
+                self.history.close()
+            self.log_writer.close()
             print("Server stopped.")
     
     def start_background(self):
         """Start server in background thread"""
         self.server_thread = threading.Thread(target=self.start, daemon=True)
         self.server_thread.start()
+        self.ready.wait(timeout=5)
         return self.server_thread
 
 
 if __name__ == "__main__":
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='PC Logging Server')
+    parser.add_argument('host', nargs='?', default='0.0.0.0',
+                       help='Host address to bind to (default: 0.0.0.0)')
+    parser.add_argument('port', nargs='?', type=int, default=8080,
+                       help='Port number to listen on (default: 8080)')
+    parser.add_argument('--log-file', default='pc_logs.json',
+                       help='Path to JSON log file (default: pc_logs.json)')
+    parser.add_argument('--storage', choices=STORAGE_TYPES, default='json',
+                       help='json: rewrite the log file on every update, '
+                            'journal: append updates and compact in background, '
+                            'sqlite: update only changed PCs in pc_logs.db, '
+                            'memory: keep nothing on disk (default: json)')
+    parser.add_argument('--recent-days', type=float, default=None, metavar='DAYS',
+                       help='With sqlite storage, only load PCs updated in the last DAYS days')
+    parser.add_argument('--mode', choices=SERVER_MODES, default='threaded',
+                       help='single: one request at a time, threaded: thread per connection, '
+                            'pool: fixed worker pool, asyncio: event loop for thousands of '
+                            'keep-alive connections (default: threaded)')
+    parser.add_argument('--workers', type=int, default=8,
+                       help='Worker threads in pool mode (default: 8)')
+    parser.add_argument('--flush-every', type=int, default=None,
+                       help='Save logs after this many updates, 0 = not by count '
+                            '(default: 1, or 0 when --flush-interval is set)')
+    parser.add_argument('--flush-interval', type=int, default=0, metavar='MS',
+                       help='Save pending updates every MS milliseconds, 0 = not by time (default: 0). '
+                            'With --flush-every 0 and no interval, logs are saved on shutdown only')
+    parser.add_argument('--history-db', default='pc_history.db',
+                       help='SQLite file for PC/app session history (default: pc_history.db)')
+    parser.add_argument('--no-history', action='store_true',
+                       help='Do not record session history')
+    parser.add_argument('--compact-json', action='store_true',
+                       help='Serve /logs and /pc/<name> without indentation (clients can '
+                            'still ask for either with ?compact=1 or ?compact=0)')
+    parser.add_argument('--offline-after', type=int, default=3, metavar='N',
+                       help='Mark a PC offline after N missed heartbeat intervals, '
+                            '0 = only when the client reports it (default: 3)')
+    parser.add_argument('--heartbeat-interval', type=float, default=30, metavar='SECONDS',
+                       help='Heartbeat interval assumed for clients that don\'t send one (default: 30)')
+    parser.add_argument('--log-level', choices=list(LOG_LEVELS), default='info',
+                       help='Lowest level of request/update lines to show (default: info)')
+    parser.add_argument('--log-sample', type=int, default=1, metavar='N',
+                       help='Show 1 in N successful request and PC update lines; '
+                            'errors are always shown (default: 1 = all)')
+    parser.add_argument('--server-log', metavar='FILE',
+                       help='Write request/update lines to FILE instead of the console')
+    parser.add_argument('--server-log-max-mb', type=float, default=0, metavar='MB',
+                       help='Rotate the --server-log file at this size, keeping 3 old files (default: 0 = never)')
+    
+    args = parser.parse_args()
+    
+    # An interval on its own means "save by time"; saving every update would make it pointless
+    if args.flush_every is None:
+        args.flush_every = 0 if args.flush_interval > 0 else 1
+    elif args.flush_every == 1 and args.flush_interval > 0:
+        print("[WARNING] --flush-interval has no effect with --flush-every 1 "
+              "(every update is saved right away)")
     
-    # Get configuration from command line or use defaults
-    host = sys.argv[1] if len(sys.argv) > 1 else '0.0.0.0'
-    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+    load_since = None
+    if args.recent_days is not None:
+        load_since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - args.recent_days * 86400))
     
-    server = LoggingServer(host=host, port=port)
+    server = LoggingServer(host=args.host, port=args.port,
+                           log_file=args.log_file, storage=args.storage,
+                           mode=args.mode, workers=args.workers,
+                           flush_every=args.flush_every, flush_interval_ms=args.flush_interval,
+                           history_file=None if args.no_history else args.history_db,
+                           compact_json=args.compact_json,
+                           offline_after=args.offline_after,
+                           heartbeat_interval=args.heartbeat_interval,
+                           load_since=load_since, log_level=args.log_level,
+                           server_log=args.server_log,
+                           server_log_max_bytes=int(args.server_log_max_mb * 1024 * 1024),
+                           log_sample=args.log_sample)
     server.start()
 
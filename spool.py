@@ -0,0 +1,193 @@
+"""
+Offline Heartbeat Spool
+Stores heartbeats on disk while the server is unreachable, so the client
+can replay them in order once it is back.
+"""
+
+import json
+import os
+from typing import Dict, List, Tuple
+
+SEGMENT_PREFIX = "spool-"
+SEGMENT_SUFFIX = ".jsonl"
+CURSOR_FILE = "cursor.json"
+
+
+class HeartbeatSpool:
+    """
+    Append-only, size-bounded queue of heartbeat records in segment files.
+
+    Records are JSON lines appended to the newest segment; a segment that
+    reaches segment_bytes is closed and a new one started. Reading goes
+    through a cursor (segment, byte offset) that is saved after every
+    commit, and fully read segments are deleted. When the spool grows past
+    max_bytes the oldest segments are dropped, since the newest heartbeats
+    matter most. Not thread-safe; the client uses it from its sender only.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024 * 1024,
+                 segment_bytes: int = 256 * 1024):
+        """
+        Open (or create) a spool directory.
+
+        Args:
+            directory: Directory for the segment files
+            max_bytes: Drop the oldest segments beyond this total size
+            segment_bytes: Start a new segment after this many bytes
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+            and name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)].isdigit())
+        self._sizes = {number: os.path.getsize(self._path(number)) for number in self._segments}
+        self._writer = None
+        self._cursor = self._load_cursor()
+
+    def _path(self, number: int) -> str:
+        """Path of a segment file"""
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        """Read position saved by the last commit (start of the oldest segment if none)"""
+        first = self._segments[0] if self._segments else 1
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE), 'r') as f:
+                data = json.load(f)
+            segment, offset = int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return first, 0
+        if segment not in self._sizes:
+            # That segment was dropped or finished; start at the oldest one left
+            return (first, 0) if self._segments else (max(1, segment), 0)
+        return segment, min(offset, self._sizes[segment])
+
+    def _save_cursor(self):
+        """Persist the read position atomically"""
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(path + ".tmp", 'w') as f:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, f)
+        os.replace(path + ".tmp", path)
+
+    @property
+    def pending_bytes(self) -> int:
+        """Bytes of spooled records not yet committed"""
+        segment, offset = self._cursor
+        return sum(size for number, size in self._sizes.items() if number >= segment) - offset
+
+    def __bool__(self) -> bool:
+        return self.pending_bytes > 0
+
+    def append(self, record: Dict):
+        """
+        Spool one record.
+
+        Args:
+            record: JSON-serializable heartbeat record
+        """
+        line = (json.dumps(record, separators=(',', ':')) + "\n").encode('utf-8')
+        if self._writer is None or self._sizes[self._segments[-1]] + len(line) > self.segment_bytes:
+            self._rotate()
+        self._writer.write(line)
+        self._writer.flush()
+        self._sizes[self._segments[-1]] += len(line)
+        self._enforce_limit()
+
+    def _rotate(self):
+        """Start appending to a new segment"""
+        if self._writer is not None:
+            self._writer.close()
+        elif self._segments and self._can_append(self._segments[-1]):
+            # Continue the newest segment left by a previous run
+            self._writer = open(self._path(self._segments[-1]), 'ab')
+            if self._sizes[self._segments[-1]] < self.segment_bytes:
+                return
+            self._writer.close()
+        number = self._segments[-1] + 1 if self._segments else max(1, self._cursor[0])
+        self._segments.append(number)
+        self._sizes[number] = 0
+        self._writer = open(self._path(number), 'ab')
+
+    def _can_append(self, number: int) -> bool:
+        """Check a segment ends with a complete line (a crash may have cut the last one)"""
+        size = self._sizes[number]
+        if size == 0:
+            return True
+        with open(self._path(number), 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) == b"\n"
+
+    def _enforce_limit(self):
+        """Drop the oldest segments (never the one being written) while over max_bytes"""
+        dropped = 0
+        while len(self._segments) > 1 and sum(self._sizes.values()) > self.max_bytes:
+            number = self._segments.pop(0)
+            dropped += self._sizes.pop(number)
+            os.remove(self._path(number))
+            if self._cursor[0] <= number:
+                self._cursor = (self._segments[0], 0)
+        if dropped:
+            self._save_cursor()
+            print(f"[WARNING] Offline spool is over {self.max_bytes} bytes, dropped {dropped} bytes of the oldest heartbeats")
+
+    def read(self, max_records: int) -> Tuple[List[Dict], Tuple[int, int]]:
+        """
+        Read the oldest uncommitted records without consuming them.
+
+        Args:
+            max_records: Most records to return
+
+        Returns:
+            (records, cursor): pass cursor to commit() once they are delivered;
+            unreadable lines (e.g. cut off by a crash) are skipped
+        """
+        records = []
+        segment, offset = self._cursor
+        for number in self._segments:
+            if number < segment:
+                continue
+            if number > segment:
+                segment, offset = number, 0
+            with open(self._path(number), 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # being written, or cut off by a crash
+                    offset += len(line)
+                    try:
+                        records.append(json.loads(line.decode('utf-8')))
+                    except ValueError:
+                        continue
+                    if len(records) >= max_records:
+                        return records, (segment, offset)
+        return records, (segment, offset)
+
+    def commit(self, cursor: Tuple[int, int]):
+        """
+        Consume everything before a cursor returned by read().
+
+        Args:
+            cursor: (segment, offset) position
+        """
+        self._cursor = cursor
+        # Delete fully read segments, keeping the one being written
+        while len(self._segments) > 1 and self._segments[0] < cursor[0]:
+            number = self._segments.pop(0)
+            self._sizes.pop(number)
+            os.remove(self._path(number))
+        if self._segments == [cursor[0]] and cursor[1] >= self._sizes[cursor[0]] and self._writer is None:
+            # Everything delivered and nothing open for writing: start clean
+            number = self._segments.pop()
+            self._sizes.pop(number)
+            os.remove(self._path(number))
+            self._cursor = (number + 1, 0)
+        self._save_cursor()
+
+    def close(self):
+        """Close the segment being written"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
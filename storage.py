@@ -0,0 +1,276 @@
+"""
+Storage Backends for PCLogger
+Each backend loads the logs at startup and persists the PCs that changed;
+PCLogger keeps the data in memory and decides when to save.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Callable, Dict, Optional
+
+from journal import LogJournal
+
+STORAGE_TYPES = ("json", "journal", "sqlite", "memory")
+
+
+class StorageBackend:
+    """
+    Base class for PCLogger storage.
+
+    Backends with incremental = True get only the changed PCs on every
+    save (write_pcs); the others get a full snapshot (write_snapshot).
+    PCLogger calls every write method with its flush lock held, so a
+    backend never sees two writes at once.
+    """
+
+    name = None
+    # write_pcs() persists single PCs, so a save costs O(changed PCs)
+    incremental = False
+    # load() can skip PCs not updated since a given time
+    partial_load = False
+    # Bytes written to disk so far (sqlite: row data handed to SQLite)
+    bytes_written = 0
+
+    def load(self, empty_structure: Callable[[], Dict], since: Optional[str] = None) -> Dict:
+        """
+        Load all stored logs.
+
+        Args:
+            empty_structure: Factory for an empty log structure
+            since: Only load PCs updated at or after this "YYYY-MM-DD HH:MM:SS"
+                   timestamp (ignored by backends without partial_load)
+
+        Returns:
+            Dictionary containing the logged data
+        """
+        raise NotImplementedError
+
+    def write_pcs(self, pcs: Dict[str, Dict]):
+        """
+        Persist the current state of some PCs (incremental backends only).
+
+        Args:
+            pcs: pc_name -> copy of its info
+        """
+        raise NotImplementedError
+
+    def write_snapshot(self, snapshot: Dict):
+        """
+        Persist the full logs.
+
+        Args:
+            snapshot: Copy of the logs dictionary
+        """
+        raise NotImplementedError
+
+    def needs_compaction(self) -> bool:
+        """Check if compact() should be called after the last write_pcs()"""
+        return False
+
+    def compact(self, snapshot: Dict):
+        """Fold incremental writes into a snapshot (may run in the background)"""
+        self.write_snapshot(snapshot)
+
+    def close(self):
+        """Finish pending work and release files"""
+
+
+class JsonFileStorage(StorageBackend):
+    """The whole log as one indented JSON file, rewritten atomically on every save"""
+
+    name = "json"
+
+    def __init__(self, log_file: str):
+        """
+        Args:
+            log_file: Path to the JSON file
+        """
+        self.log_file = log_file
+
+    def load(self, empty_structure: Callable[[], Dict], since: Optional[str] = None) -> Dict:
+        if not os.path.exists(self.log_file):
+            return empty_structure()
+        try:
+            with open(self.log_file, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            # Saves are atomic, so this is damage from outside; keep the
+            # file for inspection instead of overwriting it on next save
+            backup = self.log_file + ".corrupt"
+            os.replace(self.log_file, backup)
+            print(f"[WARNING] {self.log_file} is corrupted, moved to {backup} and starting fresh")
+            return empty_structure()
+
+    def write_snapshot(self, snapshot: Dict):
+        # Write to a temp file and rename it over the log file, so a crash
+        # mid-write leaves the previous complete file instead of a truncated one
+        tmp_file = self.log_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        self.bytes_written += os.path.getsize(tmp_file)
+        os.replace(tmp_file, self.log_file)
+
+
+class JournalStorage(StorageBackend):
+    """JSON snapshot plus an append-only journal of changed PCs (see journal.py)"""
+
+    name = "journal"
+    incremental = True
+
+    def __init__(self, log_file: str, compact_every: int = 1000):
+        """
+        Args:
+            log_file: Path to the JSON snapshot; the journal lives next to it
+            compact_every: Journal records before a background compaction
+        """
+        self.journal = LogJournal(log_file, compact_every=compact_every)
+
+    def load(self, empty_structure: Callable[[], Dict], since: Optional[str] = None) -> Dict:
+        return self.journal.load(empty_structure)
+
+    def write_pcs(self, pcs: Dict[str, Dict]):
+        records = []
+        for pc_name, info in pcs.items():
+            record = {"pc": pc_name}
+            record.update(info)
+            records.append(record)
+        self.journal.append(records)
+
+    def write_snapshot(self, snapshot: Dict):
+        self.journal.start_compaction(snapshot, background=False)
+
+    def needs_compaction(self) -> bool:
+        return self.journal.needs_compaction()
+
+    @property
+    def bytes_written(self) -> int:
+        return self.journal.bytes_written
+
+    def compact(self, snapshot: Dict):
+        self.journal.start_compaction(snapshot)
+
+    def close(self):
+        self.journal.close()
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    One row per PC in SQLite (WAL mode). A save updates only the rows of
+    the PCs that changed, and startup can load just the recently updated
+    ones through an index on last_updated.
+    """
+
+    name = "sqlite"
+    incremental = True
+    partial_load = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS pcs (
+        name TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        software TEXT NOT NULL,
+        last_updated TEXT
+    );
+    CREATE INDEX IF NOT EXISTS pcs_last_updated ON pcs (last_updated);
+    """
+
+    def __init__(self, db_file: str):
+        """
+        Args:
+            db_file: Path to the SQLite database file
+        """
+        self.db_file = db_file
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def load(self, empty_structure: Callable[[], Dict], since: Optional[str] = None) -> Dict:
+        logs = empty_structure()
+        # Rows are never deleted and updated in place, so rowid keeps first-seen order
+        sql = "SELECT name, status, software, last_updated FROM pcs"
+        params = ()
+        if since is not None:
+            sql += " WHERE last_updated >= ?"
+            params = (since,)
+        for name, status, software, last_updated in self._db.execute(sql + " ORDER BY rowid", params):
+            logs["pcs"][name] = {
+                "status": status,
+                "software": json.loads(software),
+                "last_updated": last_updated,
+            }
+        return logs
+
+    def write_pcs(self, pcs: Dict[str, Dict]):
+        with self._db:
+            for pc_name, info in pcs.items():
+                row = (info.get("status", "running"), json.dumps(info.get("software", [])),
+                       info.get("last_updated"), pc_name)
+                self.bytes_written += sum(len(value.encode('utf-8')) for value in row if value)
+                # UPDATE first, INSERT if new: works on SQLite versions without UPSERT
+                cursor = self._db.execute(
+                    "UPDATE pcs SET status = ?, software = ?, last_updated = ? WHERE name = ?", row)
+                if cursor.rowcount == 0:
+                    self._db.execute(
+                        "INSERT INTO pcs (status, software, last_updated, name) VALUES (?, ?, ?, ?)", row)
+
+    def write_snapshot(self, snapshot: Dict):
+        self.write_pcs(snapshot["pcs"])
+
+    def close(self):
+        self._db.close()
+
+
+class MemoryStorage(StorageBackend):
+    """Keeps everything in memory and writes nothing to disk (tests, benchmarks)"""
+
+    name = "memory"
+    incremental = True
+    partial_load = True
+
+    def __init__(self, initial: Optional[Dict] = None):
+        """
+        Args:
+            initial: Logs to start from (default: empty)
+        """
+        self.pcs = {name: dict(info) for name, info in (initial or {"pcs": {}})["pcs"].items()}
+        self.writes = 0  # number of PC records written, for tests
+
+    def load(self, empty_structure: Callable[[], Dict], since: Optional[str] = None) -> Dict:
+        logs = empty_structure()
+        for name, info in self.pcs.items():
+            if since is None or (info.get("last_updated") or "") >= since:
+                logs["pcs"][name] = dict(info)
+        return logs
+
+    def write_pcs(self, pcs: Dict[str, Dict]):
+        self.pcs.update(pcs)
+        self.writes += len(pcs)
+
+    def write_snapshot(self, snapshot: Dict):
+        self.write_pcs(snapshot["pcs"])
+
+
+def create_storage(storage: str, log_file: str) -> StorageBackend:
+    """
+    Create a storage backend by name.
+
+    Args:
+        storage: One of STORAGE_TYPES
+        log_file: Path to store logs in; for "sqlite" a ".json" extension
+                  becomes ".db" (pc_logs.json -> pc_logs.db)
+
+    Returns:
+        StorageBackend instance
+    """
+    if storage == "json":
+        return JsonFileStorage(log_file)
+    if storage == "journal":
+        return JournalStorage(log_file)
+    if storage == "sqlite":
+        root, ext = os.path.splitext(log_file)
+        return SQLiteStorage(root + ".db" if ext == ".json" else log_file)
+    if storage == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage mode: {storage}")